@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from werkzeug.utils import secure_filename
+
+from main import app as flask_app
+from app import db
+from models import User, ExtractionJob
+from extraction_jobs import new_job_id, get_job_upload_path
+from job_queue import run_in_thread
+from extraction_backends import get_extraction_backend, BackendConfigurationError, UPLOAD_BACKENDS
+from form_templates import FORM_TEMPLATES
+from resilience import CircuitOpenError
+from instrumentation import REQUEST_SECONDS, metrics_enabled
+
+logger = logging.getLogger(__name__)
+
+# Content types accepted as the raw request body. None of them can be sent by
+# a plain cross-site form, so browsers preflight such requests and the session
+# cookie can't be used for CSRF against this endpoint.
+ASYNC_UPLOAD_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'application/pdf': 'pdf',
+}
+
+# Extractions in flight in this worker; further requests wait for a slot
+_extraction_slots = asyncio.Semaphore(flask_app.config['ASYNC_EXTRACTION_CONCURRENCY'])
+
+
+def _session_user(cookies):
+    """Load the user logged in through the Flask session cookie, or None"""
+    cookie = cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return None
+
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        session = serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return None
+
+    user_id = session.get('_user_id')
+    return db.session.get(User, int(user_id)) if user_id else None
+
+
+async def _save_body(request, file_path, max_size):
+    """
+    Stream the request body to disk
+
+    Returns:
+        int: Bytes written, or None if the body is larger than max_size
+    """
+    size = 0
+    with open(file_path, 'wb') as f:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_size:
+                return None
+            # Writing one socket-sized chunk to local disk doesn't hold up the loop
+            f.write(chunk)
+    return size
+
+
+def _save_completed_job(job_id, user_id, template_type, extraction_mode, file_name, file_path, started_at,
+                        extracted_data):
+    # Stored like a finished background job, so /extraction-status/<job_id>
+    # hands the result to the review page
+    job = ExtractionJob(
+        id=job_id,
+        user_id=user_id,
+        template_type=template_type,
+        extraction_mode=extraction_mode,
+        file_name=file_name,
+        file_path=file_path,
+        status='completed',
+        started_at=started_at,
+        finished_at=datetime.utcnow()
+    )
+    job.set_result(extracted_data)
+    db.session.add(job)
+    db.session.commit()
+
+
+def _remove_file(file_path):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+async def _extract_form(request):
+    user = await run_in_thread(_session_user, request.cookies)
+    if user is None:
+        return JSONResponse({'error': 'Authentication required'}, status_code=401)
+
+    template_type = request.query_params.get('templateType')
+    if template_type not in FORM_TEMPLATES:
+        return JSONResponse({'error': f'Unknown template type: {template_type}'}, status_code=400)
+
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    extension = ASYNC_UPLOAD_TYPES.get(content_type)
+    if extension is None:
+        return JSONResponse(
+            {'error': 'Send the form as the request body with Content-Type image/jpeg, image/png or application/pdf'},
+            status_code=415
+        )
+
+    max_size = flask_app.config['MAX_UPLOAD_SIZE']
+    if int(request.headers.get('content-length') or 0) > max_size:
+        return JSONResponse({'error': 'File is too large'}, status_code=413)
+
+    extraction_mode = request.query_params.get('extractionMode')
+    if extraction_mode not in UPLOAD_BACKENDS:
+        extraction_mode = None
+
+    job_id = new_job_id()
+    file_name = secure_filename(request.query_params.get('fileName') or '') or f"upload.{extension}"
+    file_path = get_job_upload_path(job_id, file_name)
+    started_at = datetime.utcnow()
+
+    try:
+        size = await _save_body(request, file_path, max_size)
+        if size is None:
+            return JSONResponse({'error': 'File is too large'}, status_code=413)
+        if size == 0:
+            return JSONResponse({'error': 'No file provided'}, status_code=400)
+
+        backend = get_extraction_backend(flask_app, extraction_mode)
+        async with _extraction_slots:
+            extracted_data = await backend.extract_async(file_path, template_type)
+    except CircuitOpenError as e:
+        return JSONResponse({'error': str(e)}, status_code=503)
+    except BackendConfigurationError as e:
+        # The server is misconfigured, not the upload; reported like the backend health check
+        logger.error(f"Async extraction {job_id} failed, backend not configured: {str(e)}")
+        return JSONResponse({'error': f'Extraction is not available: {str(e)}'}, status_code=503)
+    except TimeoutError:
+        return JSONResponse({'error': 'Extraction timed out'}, status_code=504)
+    except ValueError as e:
+        # The upload itself can't be extracted, e.g. a PDF without pages
+        return JSONResponse({'error': str(e)}, status_code=422)
+    except Exception as e:
+        logger.error(f"Async extraction {job_id} failed: {str(e)}")
+        return JSONResponse({'error': f'Error extracting form data: {str(e)}'}, status_code=500)
+    finally:
+        # The upload is no longer needed once extraction has finished
+        await asyncio.to_thread(_remove_file, file_path)
+
+    await run_in_thread(
+        _save_completed_job, job_id, user.id, template_type, extraction_mode, file_name, file_path, started_at,
+        extracted_data
+    )
+    return JSONResponse({
+        'jobId': job_id,
+        'status': 'completed',
+        'templateType': template_type,
+        'fileName': file_name,
+        'extractedData': extracted_data,
+        'statusUrl': flask_app.url_map.bind('').build('extraction_status', {'job_id': job_id})
+    })
+
+
+async def extract_form(request):
+    """
+    Extract an uploaded form on the event loop and return the data
+
+    POST /api/async/extract?templateType=<template>[&fileName=...][&extractionMode=...]
+    with the image or PDF as the raw body. While Gemini works the request
+    holds only a coroutine, so one worker serves many extractions at once
+    (up to ASYNC_EXTRACTION_CONCURRENCY). The result is also stored as a
+    completed extraction job; its statusUrl opens the review page.
+    """
+    started = time.perf_counter()
+
+    # Blocking steps run on worker threads in app contexts of their own,
+    # this one only makes the app available to them
+    with flask_app.app_context():
+        response = await _extract_form(request)
+
+    if metrics_enabled():
+        REQUEST_SECONDS.observe(time.perf_counter() - started, 'async_extract_form', 'POST', str(response.status_code))
+    return response
+
+
+# Async extraction natively, every other route through the Flask app on a thread pool
+application = Starlette(routes=[
+    Route('/api/async/extract', extract_form, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,379 @@
+import os
+import time
+import logging
+import zipfile
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from werkzeug.utils import secure_filename
+
+from app import app, db
+from models import ExtractionBatch, ExtractionJob
+from extraction_jobs import new_job_id, get_job_upload_path
+from extraction_backends import get_extraction_backend
+from job_queue import submit_job
+from bulk_save import bulk_insert_forms
+
+logger = logging.getLogger(__name__)
+
+BATCH_FILE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'pdf'}
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls evenly to stay under an API quota
+    """
+
+    def __init__(self, calls_per_minute):
+        """
+        Args:
+            calls_per_minute (int): Maximum call rate, 0 disables limiting
+        """
+        self.interval = 60.0 / calls_per_minute if calls_per_minute else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the caller may make its next call"""
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_batch_rate_limiter(app):
+    """
+    Return the process-wide limiter for batch extractions
+
+    Args:
+        app (Flask): Application whose config sets the rate
+
+    Returns:
+        RateLimiter: Shared limiter, so concurrent batches split one quota
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(app.config['BATCH_RATE_LIMIT_PER_MINUTE'])
+        return _rate_limiter
+
+
+def _is_batch_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in BATCH_FILE_EXTENSIONS
+
+
+def _remove_files(stored):
+    for _, _, file_path in stored:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def _copy_limited(source, target, max_size):
+    """Copy a stream, failing once more than max_size bytes have come out of it"""
+    copied = 0
+    while True:
+        chunk = source.read(64 * 1024)
+        if not chunk:
+            return copied
+        copied += len(chunk)
+        if copied > max_size:
+            raise ValueError(f"A form in the archive is larger than {max_size // (1024 * 1024)} MB")
+        target.write(chunk)
+
+
+def _expand_upload(uploaded_file, job_id_factory, max_files, max_bytes):
+    """
+    Store one uploaded file, unpacking ZIP archives into their form files
+
+    Archive members are counted and their uncompressed sizes summed before
+    anything is written, so an archive that unpacks to more than the limits
+    is refused without touching the disk.
+
+    Args:
+        uploaded_file (FileStorage): File from the batch upload form
+        job_id_factory (callable): Returns a new job id per stored file
+        max_files (int): Forms the batch can still take
+        max_bytes (int): Uncompressed bytes the batch can still take
+
+    Returns:
+        tuple: (job_id, file_name, file_path) tuples for every stored form,
+            and the number of bytes unpacked from archives
+
+    Raises:
+        ValueError: If an archive holds too many forms or unpacks to too much data
+    """
+    filename = secure_filename(uploaded_file.filename)
+    stored = []
+    unpacked = 0
+
+    if filename.lower().endswith('.zip'):
+        with zipfile.ZipFile(uploaded_file.stream) as archive:
+            members = []
+            for member in archive.infolist():
+                member_name = secure_filename(os.path.basename(member.filename))
+                if member.is_dir() or member.filename.startswith('__MACOSX') or not _is_batch_file(member_name):
+                    continue
+                members.append((member, member_name))
+
+            if len(members) > max_files:
+                raise ValueError(f"A batch can contain at most {app.config['BATCH_MAX_FILES']} forms")
+            max_member_size = app.config['MAX_UPLOAD_SIZE']
+            if any(member.file_size > max_member_size for member, _ in members):
+                raise ValueError(f"A form in the archive is larger than {max_member_size // (1024 * 1024)} MB")
+            if sum(member.file_size for member, _ in members) > max_bytes:
+                raise ValueError(
+                    f"A batch can unpack to at most {app.config['BATCH_MAX_UNZIPPED_SIZE'] // (1024 * 1024)} MB"
+                )
+
+            try:
+                for member, member_name in members:
+                    job_id = job_id_factory()
+                    file_path = get_job_upload_path(job_id, member_name)
+                    stored.append((job_id, member_name, file_path))
+                    # The declared sizes were checked above; the copy is capped
+                    # too in case the archive understates them
+                    with archive.open(member) as source, open(file_path, 'wb') as target:
+                        unpacked += _copy_limited(source, target, min(member.file_size, max_member_size))
+            except Exception:
+                _remove_files(stored)
+                raise
+    elif _is_batch_file(filename):
+        if max_files < 1:
+            raise ValueError(f"A batch can contain at most {app.config['BATCH_MAX_FILES']} forms")
+        job_id = job_id_factory()
+        file_path = get_job_upload_path(job_id, filename)
+        uploaded_file.save(file_path)
+        stored.append((job_id, filename, file_path))
+
+    return stored, unpacked
+
+
+def create_batch(user_id, template_type, uploaded_files):
+    """
+    Store a batch of uploads and queue it for parallel extraction
+
+    Args:
+        user_id (int): Owner of the uploads
+        template_type (str): Type of form template shared by every file
+        uploaded_files (list): FileStorage objects, images/PDFs or ZIP archives
+
+    Returns:
+        ExtractionBatch: The queued batch, or None if no usable files were uploaded
+    """
+    stored = []
+    unpacked = 0
+    try:
+        for uploaded_file in uploaded_files:
+            files, size = _expand_upload(
+                uploaded_file,
+                new_job_id,
+                app.config['BATCH_MAX_FILES'] - len(stored),
+                app.config['BATCH_MAX_UNZIPPED_SIZE'] - unpacked
+            )
+            stored.extend(files)
+            unpacked += size
+    except Exception:
+        _remove_files(stored)
+        raise
+
+    if not stored:
+        return None
+
+    batch = ExtractionBatch(id=new_job_id(), user_id=user_id, template_type=template_type, total=len(stored))
+    db.session.add(batch)
+    db.session.add_all([
+        ExtractionJob(
+            id=job_id,
+            user_id=user_id,
+            batch_id=batch.id,
+            template_type=template_type,
+            file_name=file_name,
+            file_path=file_path,
+            status='queued'
+        )
+        for job_id, file_name, file_path in stored
+    ])
+    db.session.commit()
+
+    submit_job(app, run_batch, batch.id, pool='batches')
+    logger.info(f"Queued batch {batch.id} with {len(stored)} forms")
+    return batch
+
+
+def _flush_results(batch, finished):
+    """
+    Save a chunk of finished batch items in one transaction
+
+    Args:
+        batch (ExtractionBatch): Batch being processed
+        finished (list): (job, extracted_data or None, error or None) tuples
+    """
+    succeeded = [(job, extracted_data) for job, extracted_data, error in finished if error is None]
+    form_ids = bulk_insert_forms(
+        batch.user_id,
+        [(batch.template_type, job.file_name, extracted_data) for job, extracted_data in succeeded]
+    )
+
+    for (job, _), form_id in zip(succeeded, form_ids):
+        job.form_id = form_id
+
+    now = datetime.utcnow()
+    for job, _, error in finished:
+        job.status = 'failed' if error is not None else 'completed'
+        job.error = error
+        job.finished_at = now
+
+    batch.completed += len(succeeded)
+    batch.failed += len(finished) - len(succeeded)
+    db.session.commit()
+
+    # Uploads are kept until their result is saved, so a batch that stops
+    # midway can be extracted again from where it was last committed
+    for job, _, _ in finished:
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+
+
+def _finish_batch(batch, error):
+    """
+    Mark a batch as finished, failing the forms it never got to
+
+    Args:
+        batch (ExtractionBatch): Batch being processed
+        error (str): Error recorded on every form still queued
+    """
+    leftover = batch.jobs.filter_by(status='queued').all()
+    if leftover:
+        _flush_results(batch, [(job, None, error) for job in leftover])
+    batch.status = 'finished'
+    batch.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _extract_batch(batch, jobs, backend):
+    """Extract the given jobs of a batch, committing results in chunks"""
+    commit_size = app.config['BATCH_COMMIT_SIZE']
+    results = backend.extract_many(
+        [(job.file_path, batch.template_type) for job in jobs],
+        request_timeout=app.config['BATCH_CALL_TIMEOUT'],
+        max_workers=app.config['BATCH_CONCURRENCY'],
+        rate_limiter=get_batch_rate_limiter(app)
+    )
+
+    finished = []
+    with closing(results):
+        for index, extracted_data, error in results:
+            job = jobs[index]
+            if error is not None:
+                # Some exceptions carry no message; keep at least their type
+                error = str(error) or type(error).__name__
+                logger.error(f"Batch {batch.id} item {job.id} failed: {error}")
+            finished.append((job, extracted_data, error))
+
+            if len(finished) >= commit_size:
+                _flush_results(batch, finished)
+                finished = []
+
+    if finished:
+        _flush_results(batch, finished)
+
+
+def run_batch(batch_id):
+    """
+    Extract every queued form in a batch over a bounded thread pool
+
+    Args:
+        batch_id (str): Extraction batch id
+    """
+    claimed = ExtractionBatch.query.filter_by(id=batch_id, status='queued').update(
+        {'status': 'running', 'started_at': datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    if claimed != 1:
+        logger.info(f"Batch {batch_id} already claimed, skipping")
+        return
+
+    batch = db.session.get(ExtractionBatch, batch_id)
+    jobs = batch.jobs.filter_by(status='queued').all()
+
+    try:
+        backend = get_extraction_backend(app)
+    except Exception as e:
+        # Without a backend nothing in the batch can run, so fail it as a whole
+        logger.error(f"Batch {batch_id} could not start: {str(e)}")
+        _finish_batch(batch, str(e))
+        return
+
+    started = time.monotonic()
+    logger.info(f"Running batch {batch_id}: {len(jobs)} forms, concurrency {app.config['BATCH_CONCURRENCY']}")
+
+    # The batch is always finished, so its status page stops polling; forms
+    # whose results weren't committed when it stopped are failed
+    try:
+        _extract_batch(batch, jobs, backend)
+    except Exception:
+        logger.exception(f"Batch {batch_id} stopped before every form was extracted")
+        db.session.rollback()
+    finally:
+        _finish_batch(batch, "The batch stopped before this form was extracted")
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Batch {batch_id} finished in {elapsed:.1f}s: {batch.completed} saved, {batch.failed} failed")
+
+
+def _requeue_stale_batches():
+    """
+    Put batches back in the queue whose worker stopped while running them
+
+    A running batch that neither started nor committed a result within
+    JOB_TIMEOUT was left behind by a worker that was killed or restarted.
+    Requeued batches pick up the forms that are still queued. The update
+    is conditional, so a batch another worker has just reclaimed, which
+    gets a new start time, is left alone.
+
+    Returns:
+        int: Number of batches requeued
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=app.config['JOB_TIMEOUT'])
+    recent_progress = (
+        db.session.query(ExtractionJob.id)
+        .filter(ExtractionJob.batch_id == ExtractionBatch.id, ExtractionJob.finished_at > stale_before)
+        .exists()
+    )
+    requeued = ExtractionBatch.query.filter(
+        ExtractionBatch.status == 'running',
+        db.or_(ExtractionBatch.started_at.is_(None), ExtractionBatch.started_at <= stale_before),
+        ~recent_progress
+    ).update({'status': 'queued'}, synchronize_session=False)
+    db.session.commit()
+
+    if requeued:
+        logger.warning(f"Requeued {requeued} extraction batches that stopped running")
+    return requeued
+
+
+def resume_pending_batches():
+    """
+    Re-submit batches that were queued but never started, or whose worker
+    stopped while running them, e.g. because the worker was restarted.
+    """
+    _requeue_stale_batches()
+
+    pending_ids = [row.id for row in ExtractionBatch.query.filter_by(status='queued').with_entities(ExtractionBatch.id)]
+    for batch_id in pending_ids:
+        submit_job(app, run_batch, batch_id, pool='batches')
+
+    if pending_ids:
+        logger.info(f"Resumed {len(pending_ids)} pending extraction batches")
@@ -0,0 +1,146 @@
+"""
+Benchmark for saving many extracted forms
+
+Saves the same synthetic forms three ways and reports forms per second:
+
+- per-row: session.add() + commit() for every form, as /review-data saves one
+- add_all: one transaction through the ORM unit of work, flushed once
+- bulk: bulk_insert_forms(), multi-row INSERT ... RETURNING in one transaction
+
+Each variant runs on a freshly emptied table. Runs against a throwaway
+SQLite file unless --database-url points somewhere else; round trips cost
+much more on a networked PostgreSQL, so the gap there is wider.
+
+Usage:
+    python benchmarks/bench_bulk_save.py [--database-url sqlite:////tmp/bulk.db]
+        [--forms 500] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_USERNAME = 'bulksave'
+
+
+def make_forms(count, seed=0):
+    from form_templates import FORM_TEMPLATES
+
+    rng = random.Random(seed)
+    template_types = list(FORM_TEMPLATES)
+    forms = []
+    for i in range(count):
+        template_type = rng.choice(template_types)
+        extracted_data = {
+            section_name: {field_info['field']: f"value {rng.randrange(10 ** 6)}" for field_info in fields_info}
+            for section_name, fields_info in FORM_TEMPLATES[template_type].items()
+        }
+        forms.append((template_type, f"form_{i}.jpg", extracted_data))
+    return forms
+
+
+def save_per_row(user_id, forms):
+    from app import db
+    from models import ExtractedForm
+    from form_normalizer import normalize_form_data
+
+    for template_type, file_name, extracted_data in forms:
+        extracted_form = ExtractedForm(user_id=user_id, template_type=template_type, file_name=file_name)
+        extracted_form.set_data(normalize_form_data(template_type, extracted_data))
+        db.session.add(extracted_form)
+        db.session.commit()
+
+
+def save_add_all(user_id, forms):
+    from app import db
+    from models import ExtractedForm
+    from form_normalizer import normalize_form_data
+
+    extracted_forms = []
+    for template_type, file_name, extracted_data in forms:
+        extracted_form = ExtractedForm(user_id=user_id, template_type=template_type, file_name=file_name)
+        extracted_form.set_data(normalize_form_data(template_type, extracted_data))
+        extracted_forms.append(extracted_form)
+    db.session.add_all(extracted_forms)
+    # Flushed before the commit like batch extraction did, to get the ids
+    db.session.flush()
+    db.session.commit()
+
+
+def save_bulk(user_id, forms):
+    from app import db
+    from bulk_save import bulk_insert_forms
+
+    bulk_insert_forms(user_id, forms)
+    db.session.commit()
+
+
+VARIANTS = (('per-row', save_per_row), ('add_all', save_add_all), ('bulk', save_bulk))
+
+
+def get_user_id():
+    from app import db
+    from models import User
+
+    user = User.query.filter_by(username=BENCH_USERNAME).first()
+    if user is None:
+        user = User(username=BENCH_USERNAME, email=f"{BENCH_USERNAME}@example.com")
+        user.set_password(BENCH_USERNAME)
+        db.session.add(user)
+        db.session.commit()
+    return user.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Database to benchmark against (default: a temporary SQLite file)')
+    parser.add_argument('--forms', type=int, default=500, help='Forms saved per run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant, the best one is reported')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='formdigitizer_bulk_')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(work_dir, 'bulk.db')}"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from main import app
+    from app import db
+    from models import ExtractedForm
+
+    forms = make_forms(args.forms)
+    with app.app_context():
+        db.create_all()
+        user_id = get_user_id()
+
+        print(f"{'variant':<10} {'seconds':>10} {'forms/s':>10}")
+        baseline = None
+        for name, save in VARIANTS:
+            best = None
+            for _ in range(args.repeat):
+                ExtractedForm.query.filter_by(user_id=user_id).delete()
+                db.session.commit()
+
+                started = time.perf_counter()
+                save(user_id, forms)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            saved = ExtractedForm.query.filter_by(user_id=user_id).count()
+            if saved != len(forms):
+                sys.exit(f"{name} saved {saved} forms, expected {len(forms)}")
+
+            baseline = baseline or best
+            print(f"{name:<10} {best:>10.3f} {len(forms) / best:>10.0f}   {baseline / best:.1f}x per-row")
+
+        ExtractedForm.query.filter_by(user_id=user_id).delete()
+        db.session.commit()
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
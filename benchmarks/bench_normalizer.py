@@ -0,0 +1,95 @@
+"""
+Microbenchmark for template normalization of saved forms
+
+Compares the per-form loop the routes used to run over FORM_TEMPLATES with
+the precompiled FormNormalizer, on synthetic forms that have some fields
+missing and some extra.
+
+Usage:
+    python benchmarks/bench_normalizer.py [--forms 10000] [--repeat 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from form_templates import FORM_TEMPLATES  # noqa: E402
+from form_normalizer import normalize_form_data  # noqa: E402
+
+
+def legacy_normalize(template_type, form_data):
+    """The template merge as view_form/export_form/export_all_forms did it, minus logging"""
+    template = FORM_TEMPLATES.get(template_type, {})
+    complete_form_data = {}
+    for section_name, fields_info in template.items():
+        section_data = {}
+        for field_info in fields_info:
+            field_name = field_info["field"]
+            section_data[field_name] = ""
+        if section_name in form_data and isinstance(form_data[section_name], dict):
+            for field_name, value in form_data[section_name].items():
+                section_data[field_name] = value
+        complete_form_data[section_name] = section_data
+    return complete_form_data
+
+
+def make_forms(count, seed=0):
+    rng = random.Random(seed)
+    template_types = list(FORM_TEMPLATES)
+    forms = []
+    for i in range(count):
+        template_type = rng.choice(template_types)
+        form_data = {}
+        for section_name, fields_info in FORM_TEMPLATES[template_type].items():
+            if rng.random() < 0.1:
+                continue  # section missing entirely
+            section_data = {
+                field_info["field"]: f"value {i}"
+                for field_info in fields_info
+                if rng.random() < 0.8
+            }
+            if rng.random() < 0.2:
+                section_data["Notes"] = "extra field"
+            form_data[section_name] = section_data
+        forms.append((template_type, form_data))
+    return forms
+
+
+def best_time(func, forms, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for template_type, form_data in forms:
+            func(template_type, form_data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--forms', type=int, default=10000, help='number of synthetic forms')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per implementation, best is reported')
+    args = parser.parse_args()
+
+    forms = make_forms(args.forms)
+
+    # Both implementations must produce identical output, including key order
+    for template_type, form_data in forms:
+        expected = legacy_normalize(template_type, form_data)
+        actual = normalize_form_data(template_type, form_data)
+        assert actual == expected and list(map(list, actual.values())) == list(map(list, expected.values()))
+
+    legacy = best_time(legacy_normalize, forms, args.repeat)
+    compiled = best_time(normalize_form_data, forms, args.repeat)
+
+    print(f"{args.forms} forms, best of {args.repeat} runs")
+    print(f"  legacy loop:     {legacy * 1000:8.1f} ms total  {legacy / args.forms * 1e6:6.2f} us/form")
+    print(f"  FormNormalizer:  {compiled * 1000:8.1f} ms total  {compiled / args.forms * 1e6:6.2f} us/form")
+    print(f"  speedup:         {legacy / compiled:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
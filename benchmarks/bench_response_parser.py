@@ -0,0 +1,116 @@
+"""
+Microbenchmark for parsing Gemini responses
+
+Compares the regex-based parser the extractor used to run (fenced-block or
+greedy brace regex, then one re.search per field on failure) with the
+single-pass JSON decoder and line fallback, on a JSON mode response, a
+fenced response with trailing prose, and free-text and single-quoted
+responses that need the fallback.
+
+Usage:
+    python benchmarks/bench_response_parser.py [--template "Bank Account"] [--repeat 2000] [--padding 20000]
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gemini_form_extractor import GeminiFormExtractor  # noqa: E402
+from template_registry import get_compiled_template  # noqa: E402
+
+_LEGACY_JSON_BLOCK_PATTERN = re.compile(r'```json\s*([\s\S]*?)\s*```')
+_LEGACY_JSON_OBJECT_PATTERN = re.compile(r'({[\s\S]*})')
+
+
+def legacy_parse(response_text, compiled_template, response_patterns):
+    """The parser as _parse_gemini_response/_extract_with_regex_fallback had it, minus logging"""
+    result = compiled_template.new_result()
+    try:
+        json_match = _LEGACY_JSON_BLOCK_PATTERN.search(response_text)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            json_match = _LEGACY_JSON_OBJECT_PATTERN.search(response_text)
+            if not json_match:
+                return result
+            json_str = json_match.group(1)
+
+        extracted_data = json.loads(json_str)
+        for section_name, fields in compiled_template.sections:
+            if section_name in extracted_data:
+                section_data = extracted_data[section_name]
+                for field_name in fields:
+                    if field_name in section_data and section_data[field_name] != "NOT_FOUND":
+                        result[section_name][field_name] = section_data[field_name]
+    except Exception:
+        for section_name, field_name, pattern in response_patterns:
+            match = pattern.search(response_text)
+            if match:
+                value = match.group(1).strip()
+                if value != "NOT_FOUND":
+                    result[section_name][field_name] = value
+    return result
+
+
+def make_responses(compiled_template, padding):
+    data = {
+        section_name: {field_name: f"{field_name} value" for field_name in fields}
+        for section_name, fields in compiled_template.sections
+    }
+    prose = ("The form was partly illegible; values were read as written. " * (padding // 60 + 1))[:padding]
+    lines = "\n".join(
+        f"- **{field_name}:** {field_name} value"
+        for _, fields in compiled_template.sections
+        for field_name in fields
+    )
+    return {
+        'json mode': json.dumps(data),
+        'fenced + prose': f"Here is the data:\n```json\n{json.dumps(data, indent=2)}\n```\n{prose}",
+        'free text': f"{prose}\n{lines}\nLet me know if you need anything {{else}}.",
+        # Following the prompt's example format literally gives invalid JSON
+        'single quotes': json.dumps(data, indent=2).replace('"', "'"),
+    }
+
+
+def bench(func, response, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(response)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--template', default='Bank Account')
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--padding', type=int, default=20000, help='Characters of prose around the data')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    compiled_template = get_compiled_template(args.template)
+    response_patterns = tuple(
+        (section_name, field_name, re.compile(rf"{re.escape(field_name)}:\s*([^\n]+)"))
+        for section_name, fields in compiled_template.sections
+        for field_name in fields
+    )
+    extractor = GeminiFormExtractor.__new__(GeminiFormExtractor)
+    extractor.logger = logging.getLogger(__name__)
+
+    print(f"{'response':<16} {'legacy us':>10} {'new us':>10} {'legacy filled':>14} {'new filled':>11}")
+    for name, response in make_responses(compiled_template, args.padding).items():
+        legacy_result = legacy_parse(response, compiled_template, response_patterns)
+        new_result = extractor._parse_gemini_response(response, compiled_template)
+        legacy_us = bench(lambda text: legacy_parse(text, compiled_template, response_patterns), response, args.repeat)
+        new_us = bench(lambda text: extractor._parse_gemini_response(text, compiled_template), response, args.repeat)
+        legacy_filled = sum(bool(v) for fields in legacy_result.values() for v in fields.values())
+        new_filled = sum(bool(v) for fields in new_result.values() for v in fields.values())
+        print(f"{name:<16} {legacy_us:>10.1f} {new_us:>10.1f} {legacy_filled:>14} {new_filled:>11}")
+
+
+if __name__ == '__main__':
+    main()
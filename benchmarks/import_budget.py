@@ -0,0 +1,120 @@
+"""
+Import-time budget for worker boot
+
+Imports main.py (what gunicorn loads in every worker) in fresh interpreters
+with -X importtime and checks that:
+
+- the median total import time stays within --budget-ms,
+- none of the heavy, lazily loaded packages (Gemini SDK, openpyxl, pypdf,
+  alembic) are imported at boot,
+- importing the app doesn't touch the database.
+
+The slowest modules main imports directly are listed so a regression can be traced.
+Exits with code 1 when any check fails.
+
+Usage:
+    python benchmarks/import_budget.py [--budget-ms 800] [--runs 5] [--top 10]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only; importing any of them at boot is a regression
+DEFERRED_MODULES = ('google.generativeai', 'google.api_core', 'grpc', 'IPython', 'openpyxl', 'pypdf', 'alembic',
+                    'flask_migrate')
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output
+
+    Args:
+        stderr (str): Standard error of the interpreter
+
+    Returns:
+        list: (module, self microseconds, cumulative microseconds, nesting depth) tuples
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def direct_imports(imports, parent):
+    """
+    Returns:
+        list: (module, cumulative microseconds) of the modules `parent` imported itself
+    """
+    # Children are printed before their parent, one level deeper
+    children = []
+    for name, _, cumulative_us, depth in imports:
+        if depth == 0:
+            if name == parent:
+                return children
+            children = []
+        elif depth == 1:
+            children.append((name, cumulative_us))
+    return []
+
+
+def import_main(db_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", LOG_LEVEL='WARNING')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        sys.exit(f"Importing main failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=800, help='Allowed median import time of main')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest direct imports of main to list')
+    args = parser.parse_args()
+
+    failures = []
+    totals = []
+    with tempfile.TemporaryDirectory(prefix='formdigitizer_import_') as work_dir:
+        db_path = os.path.join(work_dir, 'untouched.db')
+        for _ in range(args.runs):
+            imports = import_main(db_path)
+            totals.append(next(cumulative_us for name, _, cumulative_us, _ in imports if name == 'main') / 1000)
+        if os.path.exists(db_path):
+            failures.append("importing main connected to the database")
+
+    loaded = {name for name, _, _, _ in imports}
+    for module in DEFERRED_MODULES:
+        if module in loaded:
+            failures.append(f"{module} is imported at boot")
+
+    slowest = sorted(direct_imports(imports, 'main'), key=lambda entry: entry[1], reverse=True)
+    print(f"{'imported by main':<40} {'cumulative ms':>14}")
+    for name, cumulative_us in slowest[:args.top]:
+        print(f"{name:<40} {cumulative_us / 1000:>14.1f}")
+
+    median = statistics.median(totals)
+    print(f"\nmain imported in {median:.0f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    if median > args.budget_ms:
+        failures.append(f"import time {median:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
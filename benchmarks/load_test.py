@@ -0,0 +1,362 @@
+"""
+End-to-end load test for the upload -> review -> save pipeline
+
+Concurrent virtual users drive login, template selection, /form-upload, the
+extraction status poll, /review-data, the dashboard and both export-all
+routes through Flask's test client, with extraction served by the stub
+backend so no API key or network is needed. For every dataset size the
+shared account is first topped up to that many saved forms, then the
+scenario runs and p50/p95/p99 latency, requests per second and peak RSS are
+reported per route.
+
+Requests run in-process, so the numbers measure the application's own cost
+(database, templates, serialization) under GIL contention rather than a
+WSGI server's. Pass --json to keep the results and --baseline to fail with
+exit code 1 when a route's p95 regresses past --tolerance.
+
+Usage:
+    python benchmarks/load_test.py [--database-url sqlite:////tmp/load.db]
+        [--dataset 100 10000 100000] [--users 8] [--iterations 20]
+        [--export-every 10] [--stub-latency-ms 50] [--json results.json]
+        [--baseline results.json] [--tolerance 0.25]
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import resource
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOAD_TEST_USERNAME = 'loadtest'
+LOAD_TEST_PASSWORD = 'loadtest-password'
+SEED_CHUNK_SIZE = 5000
+POLL_INTERVAL = 0.02
+
+# JPEG magic bytes, enough for the upload's type sniffing; the stub never decodes it
+JPEG_HEADER = b'\xff\xd8\xff\xe0'
+
+
+class UnexpectedResponse(Exception):
+    pass
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # ru_maxrss is the peak rather than the current size, in KB on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class LoadStats:
+    """Thread-safe latency, error and RSS samples per route"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok=True):
+        rss = current_rss()
+        with self._lock:
+            stats = self._routes.setdefault(route, {'latencies': [], 'errors': 0, 'peak_rss': 0})
+            stats['latencies'].append(seconds)
+            if not ok:
+                stats['errors'] += 1
+            stats['peak_rss'] = max(stats['peak_rss'], rss)
+
+    def summary(self, elapsed):
+        """
+        Args:
+            elapsed (float): Wall time of the run in seconds
+
+        Returns:
+            dict: Route -> count, errors, p50/p95/p99 in ms, rps and peak RSS in MB
+        """
+        summary = {}
+        for route, stats in self._routes.items():
+            latencies = sorted(stats['latencies'])
+            summary[route] = {
+                'count': len(latencies),
+                'errors': stats['errors'],
+                'p50Ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95Ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99Ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                'peakRssMb': round(stats['peak_rss'] / (1024 * 1024), 1)
+            }
+        return summary
+
+
+def timed(stats, route, client, method, url, expect, **kwargs):
+    """Issue one request, record its latency and check the status code"""
+    started = time.perf_counter()
+    response = getattr(client, method)(url, **kwargs)
+    # Reading the body is part of the cost, especially for the exports
+    response.get_data()
+    ok = response.status_code == expect
+    stats.record(route, time.perf_counter() - started, ok)
+    if not ok:
+        raise UnexpectedResponse(f"{method.upper()} {url} returned {response.status_code}, expected {expect}")
+    return response
+
+
+def wait_for(stats, route, client, url, done, timeout=300):
+    """Poll a JSON status API until done(payload) is true, recording the turnaround"""
+    started = time.perf_counter()
+    while True:
+        payload = timed(stats, f"GET {url.rsplit('/', 1)[0]}/<id>", client, 'get', url, 200).get_json()
+        if done(payload):
+            stats.record(route, time.perf_counter() - started, payload.get('status') != 'failed')
+            return payload
+        if time.perf_counter() - started > timeout:
+            raise UnexpectedResponse(f"{url} did not finish within {timeout}s")
+        time.sleep(POLL_INTERVAL)
+
+
+def review_form_data(compiled_template, marker):
+    """Build the /review-data POST body the review page would submit"""
+    return {
+        f"{section_name}_{field_name}".replace(" ", "_").replace("'", ""): f"{field_name} {marker}"
+        for section_name, fields in compiled_template.sections
+        for field_name in fields
+    }
+
+
+def run_user(app, user_index, args, stats, errors):
+    """Run one virtual user's iterations of the upload -> review -> save flow"""
+    from template_registry import get_compiled_template
+    from form_templates import FORM_TEMPLATES
+
+    template_types = list(FORM_TEMPLATES)
+    client = app.test_client()
+
+    try:
+        timed(stats, 'POST /login', client, 'post', '/login', 302,
+              data={'username': LOAD_TEST_USERNAME, 'password': LOAD_TEST_PASSWORD})
+    except UnexpectedResponse as e:
+        errors.append(str(e))
+        return
+
+    for iteration in range(args.iterations):
+        template_type = template_types[(user_index + iteration) % len(template_types)]
+        marker = uuid.uuid4().hex[:12]
+        try:
+            timed(stats, 'POST /template-selection', client, 'post', '/template-selection', 302,
+                  data={'template': template_type})
+
+            upload = (io.BytesIO(JPEG_HEADER + marker.encode()), f"load_{marker}.jpg")
+            response = timed(stats, 'POST /form-upload', client, 'post', '/form-upload', 302,
+                             data={'form_file': upload}, content_type='multipart/form-data')
+            job_id = response.location.rsplit('/', 1)[1]
+
+            wait_for(stats, 'extraction job', client, f"/api/extraction-jobs/{job_id}",
+                     lambda payload: payload['status'] in ('completed', 'failed'))
+            timed(stats, 'GET /extraction-status/<id>', client, 'get', f"/extraction-status/{job_id}", 302)
+            timed(stats, 'GET /review-data', client, 'get', '/review-data', 200)
+            timed(stats, 'POST /review-data', client, 'post', '/review-data', 302,
+                  data=review_form_data(get_compiled_template(template_type), marker))
+            timed(stats, 'GET /dashboard', client, 'get', '/dashboard', 200)
+
+            if args.export_every and (iteration + 1) % args.export_every == 0:
+                timed(stats, 'GET /export-all-forms/json', client, 'get', '/export-all-forms/json', 200)
+                response = timed(stats, 'GET /export-all-forms/excel', client, 'get', '/export-all-forms/excel', 302)
+                export_id = response.location.rsplit('/', 1)[1]
+                payload = wait_for(stats, 'excel export job', client, f"/api/export-jobs/{export_id}",
+                                   lambda payload: payload['downloadUrl'] or payload['status'] == 'failed')
+                if payload['downloadUrl']:
+                    timed(stats, 'GET /exports/<id>/download', client, 'get', payload['downloadUrl'], 200)
+        except UnexpectedResponse as e:
+            errors.append(str(e))
+
+
+def seed_forms(app, user_id, target):
+    """Top the load test account up to target saved forms with bulk inserts"""
+    from app import db
+    from models import ExtractedForm
+    from template_registry import get_compiled_template
+    from form_templates import FORM_TEMPLATES
+
+    with app.app_context():
+        existing = ExtractedForm.query.filter_by(user_id=user_id).count()
+        missing = target - existing
+        if missing <= 0:
+            return existing
+
+        rng = random.Random(existing)
+        compiled_templates = [get_compiled_template(template_type) for template_type in FORM_TEMPLATES]
+        started_at = datetime.utcnow() - timedelta(days=365)
+
+        for chunk_start in range(0, missing, SEED_CHUNK_SIZE):
+            rows = []
+            for offset in range(chunk_start, min(missing, chunk_start + SEED_CHUNK_SIZE)):
+                number = existing + offset
+                compiled_template = compiled_templates[number % len(compiled_templates)]
+                data = compiled_template.new_result()
+                for section_name, fields in compiled_template.sections:
+                    for field_name in fields:
+                        if rng.random() < 0.9:
+                            data[section_name][field_name] = f"{field_name} {number}"
+                rows.append({
+                    'user_id': user_id,
+                    'template_type': compiled_template.template_type,
+                    'file_name': f"seed_{number}.jpg",
+                    'extracted_data': data,
+                    'created_at': started_at + timedelta(seconds=number * 60)
+                })
+            db.session.execute(db.insert(ExtractedForm), rows)
+            db.session.commit()
+        return target
+
+
+def ensure_user(app):
+    """Create the shared load test account if needed and return its id"""
+    from app import db
+    from models import User
+
+    with app.app_context():
+        user = User.query.filter_by(username=LOAD_TEST_USERNAME).first()
+        if user is None:
+            user = User(username=LOAD_TEST_USERNAME, email=f"{LOAD_TEST_USERNAME}@example.com")
+            user.set_password(LOAD_TEST_PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+        return user.id
+
+
+def run_scenario(app, args):
+    """Run every virtual user to completion and return (summary, errors, elapsed)"""
+    stats = LoadStats()
+    errors = []
+    threads = [
+        threading.Thread(target=run_user, args=(app, user_index, args, stats, errors), name=f"load-user-{user_index}")
+        for user_index in range(args.users)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return stats.summary(elapsed), errors, elapsed
+
+
+def print_summary(dataset, summary, errors, elapsed):
+    total = sum(route['count'] for route in summary.values())
+    print(f"\nDataset {dataset} forms: {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+          f"{len(errors)} failed iterations")
+    print(f"{'route':<34} {'count':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8} {'RSS MB':>8}")
+    for route, row in sorted(summary.items()):
+        print(f"{route:<34} {row['count']:>6} {row['errors']:>4} {row['p50Ms']:>9.1f} {row['p95Ms']:>9.1f} "
+              f"{row['p99Ms']:>9.1f} {row['rps']:>8.1f} {row['peakRssMb']:>8.1f}")
+    for error in errors[:5]:
+        print(f"  ! {error}")
+
+
+def find_regressions(results, baseline, tolerance):
+    """List routes whose p95 grew by more than tolerance over the baseline"""
+    regressions = []
+    for dataset, routes in results.items():
+        for route, row in routes['routes'].items():
+            base_row = baseline.get(dataset, {}).get('routes', {}).get(route)
+            if base_row and base_row['p95Ms'] and row['p95Ms'] > base_row['p95Ms'] * (1 + tolerance):
+                regressions.append(
+                    f"{dataset} forms, {route}: p95 {row['p95Ms']:.1f} ms vs baseline {base_row['p95Ms']:.1f} ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='SQLAlchemy URL, defaults to a fresh SQLite file')
+    parser.add_argument('--dataset', type=int, nargs='+', default=[100], help='Saved form counts to run at')
+    parser.add_argument('--users', type=int, default=8, help='Concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=20, help='Uploads per virtual user')
+    parser.add_argument('--export-every', type=int, default=10, help='Run both exports every N iterations, 0 disables')
+    parser.add_argument('--stub-latency-ms', type=int, default=50)
+    parser.add_argument('--stub-jitter-ms', type=int, default=10)
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file from an earlier run to compare p95 against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 growth over the baseline')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='formdigitizer_load_')
+    # The app reads its configuration at import time, so set it up first
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(work_dir, 'load.db')}"
+    os.environ['EXTRACTION_BACKEND'] = 'stub'
+    os.environ['STUB_LATENCY_MS'] = str(args.stub_latency_ms)
+    os.environ['STUB_LATENCY_JITTER_MS'] = str(args.stub_jitter_ms)
+    os.environ['UPLOAD_FOLDER'] = os.path.join(work_dir, 'uploads')
+    os.environ['EXPORT_FOLDER'] = os.path.join(work_dir, 'exports')
+    os.environ.setdefault('JOB_QUEUE_WORKERS', str(max(4, args.users)))
+
+    from main import app
+    from app import db
+
+    logging.getLogger().setLevel(args.log_level)
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    # The app no longer creates tables on import; a scratch database only
+    # needs the current models, so skip the migration history
+    with app.app_context():
+        db.create_all()
+
+    try:
+        user_id = ensure_user(app)
+        results = {}
+        for dataset in sorted(args.dataset):
+            started = time.perf_counter()
+            seed_forms(app, user_id, dataset)
+            print(f"Seeded {dataset} forms in {time.perf_counter() - started:.1f}s")
+
+            summary, errors, elapsed = run_scenario(app, args)
+            print_summary(dataset, summary, errors, elapsed)
+            results[str(dataset)] = {
+                'users': args.users,
+                'iterations': args.iterations,
+                'elapsedSeconds': round(elapsed, 2),
+                'failedIterations': len(errors),
+                'routes': summary
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
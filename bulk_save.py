@@ -0,0 +1,104 @@
+import logging
+
+from app import db
+from models import ExtractedForm
+from form_templates import FORM_TEMPLATES
+from form_normalizer import normalize_form_data
+
+logger = logging.getLogger(__name__)
+
+# Length of ExtractedForm.file_name
+MAX_FILE_NAME_LENGTH = 256
+
+
+def _check_sections(index, extracted_data):
+    # Saved forms hold {section: {field: text}}; anything nested deeper
+    # can't be written to a worksheet cell and would break every export
+    for section_name, section_data in extracted_data.items():
+        if not isinstance(section_data, dict):
+            raise ValueError(f"forms[{index}]: section {section_name!r} must be an object")
+        for field_name, value in section_data.items():
+            if value is not None and not isinstance(value, str):
+                raise ValueError(
+                    f"forms[{index}]: {section_name!r} field {field_name!r} must be a string or null"
+                )
+
+
+def parse_bulk_forms(payload, max_forms):
+    """
+    Validate the body of a bulk save request
+
+    Args:
+        payload (dict): {"forms": [{"templateType", "fileName", "extractedData"}, ...]}
+        max_forms (int): Most forms one request may save
+
+    Returns:
+        list: (template_type, file_name, extracted_data) tuples
+
+    Raises:
+        ValueError: If the payload or one of its forms is invalid
+    """
+    forms = payload.get('forms') if isinstance(payload, dict) else None
+    if not isinstance(forms, list) or not forms:
+        raise ValueError("forms must be a non-empty list")
+    if len(forms) > max_forms:
+        raise ValueError(f"At most {max_forms} forms can be saved at once, got {len(forms)}")
+
+    parsed = []
+    for index, form in enumerate(forms):
+        if not isinstance(form, dict):
+            raise ValueError(f"forms[{index}] must be an object")
+
+        template_type = form.get('templateType')
+        if template_type not in FORM_TEMPLATES:
+            raise ValueError(f"forms[{index}]: unknown template type: {template_type}")
+
+        file_name = form.get('fileName')
+        if not isinstance(file_name, str) or not file_name or len(file_name) > MAX_FILE_NAME_LENGTH:
+            raise ValueError(f"forms[{index}]: fileName must be a string of 1 to {MAX_FILE_NAME_LENGTH} characters")
+
+        extracted_data = form.get('extractedData')
+        if not isinstance(extracted_data, dict):
+            raise ValueError(f"forms[{index}]: extractedData must be an object")
+        _check_sections(index, extracted_data)
+
+        parsed.append((template_type, file_name, extracted_data))
+    return parsed
+
+
+def bulk_insert_forms(user_id, forms):
+    """
+    Insert many extracted forms with multi-row INSERT statements
+
+    The rows are sent as INSERT ... VALUES (...), (...) RETURNING id, up to
+    1000 rows per statement, instead of one round trip per form through the
+    unit of work. Runs in the caller's transaction and doesn't commit, so the
+    forms are saved together with whatever else the caller changes.
+
+    Args:
+        user_id (int): Owner of the forms
+        forms (list): (template_type, file_name, extracted_data) tuples, the
+            data is normalized to its template before it is stored
+
+    Returns:
+        list: Ids of the new forms, in the order of `forms`
+    """
+    if not forms:
+        return []
+
+    rows = [
+        {
+            'user_id': user_id,
+            'template_type': template_type,
+            'file_name': file_name,
+            'extracted_data': normalize_form_data(template_type, extracted_data)
+        }
+        for template_type, file_name, extracted_data in forms
+    ]
+    result = db.session.execute(
+        db.insert(ExtractedForm).returning(ExtractedForm.id, sort_by_parameter_order=True),
+        rows
+    )
+    form_ids = result.scalars().all()
+    logger.debug("Inserted %d forms for user %s", len(form_ids), user_id)
+    return form_ids
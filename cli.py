@@ -0,0 +1,63 @@
+import os
+
+import click
+
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+class _LazyMigrateGroup(click.Group):
+    """
+    The `flask db` commands, with Flask-Migrate loaded on first use
+
+    Flask-Migrate imports alembic, which takes about half a second. Web
+    workers never run migrations, so only CLI invocations pay for it.
+    """
+
+    def __init__(self, app, db):
+        super().__init__('db', help="Perform database migrations.")
+        self.app = app
+        self.db = db
+
+    def load(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_group
+
+        if 'migrate' not in self.app.extensions:
+            # Also replaces this group with Flask-Migrate's own on app.cli
+            Migrate(self.app, self.db, directory=MIGRATIONS_DIRECTORY)
+        return db_group
+
+    def parse_args(self, ctx, args):
+        # Take over the real group's options (-d/--directory, -x) and the
+        # callback that hands them to its subcommands
+        db_group = self.load()
+        self.params = db_group.params
+        self.callback = db_group.callback
+        return super().parse_args(ctx, args)
+
+    def list_commands(self, ctx):
+        return self.load().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        return self.load().get_command(ctx, cmd_name)
+
+
+def register_cli(app, db):
+    """
+    Add the database commands to the app's `flask` CLI
+
+    Args:
+        app (Flask): Application to register the commands on
+        db (SQLAlchemy): Database whose migrations the commands manage
+    """
+    migrate_group = _LazyMigrateGroup(app, db)
+    app.cli.add_command(migrate_group)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create the database schema, or bring it up to date, by applying every migration."""
+        from flask_migrate import upgrade
+
+        migrate_group.load()
+        upgrade(directory=MIGRATIONS_DIRECTORY)
+        click.echo("Database schema is up to date")
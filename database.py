@@ -0,0 +1,246 @@
+import time
+import random
+import logging
+import functools
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import QueuePool
+
+from instrumentation import Counter, Gauge, register_metric
+
+logger = logging.getLogger(__name__)
+
+# Flask session key holding the time until which reads stay on the primary
+PRIMARY_PIN_KEY = '_db_primary_until'
+
+# Bind name -> pool, for the pool gauges
+_pools = {}
+
+
+def replica_bind_keys(replica_urls):
+    """
+    Returns:
+        list: SQLALCHEMY_BINDS keys for the given read replica URLs
+    """
+    return [f"replica_{index}" for index in range(len(replica_urls))]
+
+
+def engine_options(config):
+    """
+    Engine options for SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* settings
+
+    Replica binds share them. Queue settings are left out for in-memory
+    SQLite, which runs on a single static connection.
+
+    Args:
+        config (dict): App config with SQLALCHEMY_DATABASE_URI and the DB_POOL_* settings
+
+    Returns:
+        dict: Keyword arguments for create_engine()
+    """
+    options = {'pool_recycle': config['DB_POOL_RECYCLE']}
+    if config['DB_POOL_PING_AFTER'] == 0:
+        options['pool_pre_ping'] = True
+
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+        options['pool_size'] = config['DB_POOL_SIZE']
+        options['max_overflow'] = config['DB_MAX_OVERFLOW']
+        options['pool_timeout'] = config['DB_POOL_TIMEOUT']
+        # Reuse the most recently returned connection, so connections beyond
+        # the steady load sit idle until recycled instead of all going stale
+        options['pool_use_lifo'] = True
+    return options
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a read replica inside use_replica()
+
+    Only plain SELECTs outside of a flush are routed; writes, SELECT ... FOR
+    UPDATE and raw SQL always go to the primary. Objects loaded from a
+    replica can be changed and committed as usual.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica_bind')
+        if (
+            replica is not None
+            and bind is None
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _after_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+def _do_orm_execute(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+def _after_commit(session):
+    # Reads stay on the primary for a while after the user's own writes, so
+    # a redirect right after saving doesn't hit a replica that lags behind
+    if session.info.pop('wrote', False) and has_request_context() and current_app.config['DB_REPLICA_BINDS']:
+        flask_session[PRIMARY_PIN_KEY] = time.time() + current_app.config['DB_REPLICA_PIN_SECONDS']
+
+
+def _after_rollback(session):
+    session.info.pop('wrote', None)
+
+
+event.listen(RoutingSession, 'after_flush', _after_flush)
+event.listen(RoutingSession, 'do_orm_execute', _do_orm_execute)
+event.listen(RoutingSession, 'after_commit', _after_commit)
+event.listen(RoutingSession, 'after_rollback', _after_rollback)
+
+
+def _pinned_to_primary():
+    return has_request_context() and flask_session.get(PRIMARY_PIN_KEY, 0) > time.time()
+
+
+@contextmanager
+def use_replica():
+    """
+    Send the block's SELECTs to a read replica
+
+    A no-op when no replica is configured or the current user wrote within
+    the last DB_REPLICA_PIN_SECONDS. One replica is picked at random and kept
+    for the rest of the session, so reads in a request see one snapshot.
+    """
+    replicas = current_app.config['DB_REPLICA_BINDS']
+    if not replicas or _pinned_to_primary():
+        yield
+        return
+
+    session = current_app.extensions['sqlalchemy'].session()
+    previous = session.info.get('replica_bind')
+    session.info['replica_bind'] = previous or random.choice(replicas)
+    try:
+        yield
+    finally:
+        if previous is None:
+            session.info.pop('replica_bind', None)
+
+
+def reads_from_replica(view):
+    """Decorator that runs a read-only view inside use_replica()"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+POOL_PINGS = register_metric(Counter(
+    'formdigitizer_db_pool_pings_total',
+    'Liveness checks of connections that sat idle in the pool',
+    ('bind', 'result')
+))
+POOL_CONNECTS = register_metric(Counter(
+    'formdigitizer_db_pool_connects_total',
+    'New database connections opened by the pool',
+    ('bind',)
+))
+
+
+def _collect_pool_connections():
+    for bind, pool in _pools.items():
+        if isinstance(pool, QueuePool):
+            yield (bind, 'checked_out'), pool.checkedout()
+            yield (bind, 'idle'), pool.checkedin()
+            yield (bind, 'overflow'), max(pool.overflow(), 0)
+
+
+def _collect_pool_sizes():
+    for bind, pool in _pools.items():
+        if isinstance(pool, QueuePool):
+            yield (bind,), pool.size()
+
+
+register_metric(Gauge(
+    'formdigitizer_db_pool_connections',
+    'Connections held by the pool, by state',
+    ('bind', 'state'),
+    _collect_pool_connections
+))
+register_metric(Gauge(
+    'formdigitizer_db_pool_size',
+    'Configured number of connections the pool keeps open',
+    ('bind',),
+    _collect_pool_sizes
+))
+
+
+def _watch_pool(engine, bind, ping_after):
+    """
+    Count connects and ping connections that were idle for ping_after seconds
+
+    Unlike pool_pre_ping, a connection in steady use is handed out without a
+    round trip; only one that sat in the pool long enough for the server or a
+    firewall to drop it is checked. A failed ping raises DisconnectionError,
+    on which the pool discards the connection and checks out another.
+    """
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        POOL_CONNECTS.inc(bind)
+
+    if ping_after <= 0:
+        return
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        if dbapi_connection is not None:
+            connection_record.info['idle_since'] = time.monotonic()
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.pop('idle_since', None)
+        if idle_since is None or time.monotonic() - idle_since < ping_after:
+            return
+
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        except Exception as e:
+            POOL_PINGS.inc(bind, 'failed')
+            logger.warning(f"Dropping dead {bind} connection that was idle for {time.monotonic() - idle_since:.1f}s: {e}")
+            raise DisconnectionError() from e
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        POOL_PINGS.inc(bind, 'ok')
+
+
+def init_database(app, db):
+    """
+    Attach liveness checks and pool metrics to every engine of the app
+
+    Args:
+        app (Flask): Application whose engines were created by db.init_app()
+        db (SQLAlchemy): Database extension
+    """
+    with app.app_context():
+        engines = db.engines
+
+    for key, engine in engines.items():
+        bind = key or 'primary'
+        _watch_pool(engine, bind, app.config['DB_POOL_PING_AFTER'])
+        _pools[bind] = engine.pool
+
+    if app.config['DB_REPLICA_BINDS']:
+        logger.info(f"Routing reads to {len(app.config['DB_REPLICA_BINDS'])} read replica(s)")
@@ -0,0 +1,94 @@
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME_TYPE = 'application/pdf'
+EXCEL_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+DEFAULT_MIME_TYPE = 'image/jpeg'
+
+# Magic numbers of the formats users upload, checked against the file header
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'%PDF-', PDF_MIME_TYPE),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+]
+
+
+def sniff_mime_type(data):
+    """
+    Detect the MIME type of a file from its leading bytes
+
+    Args:
+        data (bytes): At least the first 16 bytes of the file
+
+    Returns:
+        str: Detected MIME type, DEFAULT_MIME_TYPE if unrecognised
+    """
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+
+    if data[4:8] == b'ftyp' and data[8:12] in (b'heic', b'heix', b'mif1', b'msf1'):
+        return 'image/heic'
+
+    return DEFAULT_MIME_TYPE
+
+
+def sniff_file_mime_type(file_path):
+    """
+    Detect the MIME type of a file on disk without reading all of it
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        str: Detected MIME type
+    """
+    with open(file_path, 'rb') as f:
+        return sniff_mime_type(f.read(16))
+
+
+def iter_pdf_pages(file_path):
+    """
+    Yield each page of a PDF as its own single-page PDF document
+
+    Pages are read from the file and written out one at a time, so only the
+    page being yielded is held in memory. Without pypdf the whole document
+    is yielded as a single part.
+
+    Args:
+        file_path (str): Path to the PDF file
+
+    Yields:
+        bytes: Single-page PDF documents in page order
+
+    Raises:
+        ValueError: If the PDF has no pages, before anything is yielded
+    """
+    # Imported on first use, pypdf adds about 0.1 s to every worker's boot
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:  # pypdf is optional, PDFs are sent whole without it
+        logger.warning("pypdf is not installed, sending PDF as a single document")
+        with open(file_path, 'rb') as f:
+            yield f.read()
+        return
+
+    with open(file_path, 'rb') as f:
+        reader = PdfReader(f)
+        if not reader.pages:
+            raise ValueError("PDF has no pages")
+        for page in reader.pages:
+            writer = PdfWriter()
+            writer.add_page(page)
+            output = io.BytesIO()
+            writer.write(output)
+            yield output.getvalue()
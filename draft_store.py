@@ -0,0 +1,85 @@
+import uuid
+import logging
+from datetime import datetime, timedelta
+
+from app import app, db
+from models import ExtractionDraft
+
+logger = logging.getLogger(__name__)
+
+
+def save_draft(user_id, template_type, file_name, extracted_data, draft_id=None):
+    """
+    Store extracted data awaiting review on the server
+
+    Only the returned id goes into the session, which keeps the signed
+    session cookie small no matter how large the extraction is.
+
+    Args:
+        user_id (int): Owner of the draft
+        template_type (str): Type of form template
+        file_name (str): Original upload file name
+        extracted_data (dict): Extracted data organized by sections
+        draft_id (str, optional): Id to store the draft under, e.g. the
+            extraction job's, so the same extraction always maps to one draft
+
+    Returns:
+        str: Draft id to keep in the session
+    """
+    sweep_expired_drafts()
+
+    if draft_id is not None and load_draft(draft_id, user_id) is not None:
+        return draft_id
+
+    draft = ExtractionDraft(
+        id=draft_id or uuid.uuid4().hex,
+        user_id=user_id,
+        template_type=template_type,
+        file_name=file_name,
+        expires_at=datetime.utcnow() + timedelta(seconds=app.config['DRAFT_TTL'])
+    )
+    draft.set_data(extracted_data)
+    db.session.add(draft)
+    db.session.commit()
+    return draft.id
+
+
+def load_draft(draft_id, user_id):
+    """
+    Load a draft for review
+
+    Args:
+        draft_id (str): Id from save_draft()
+        user_id (int): Current user, drafts of other users are never returned
+
+    Returns:
+        ExtractionDraft or None: The draft, or None if missing or expired
+    """
+    if not draft_id:
+        return None
+
+    draft = db.session.get(ExtractionDraft, draft_id)
+    if draft is None or draft.user_id != user_id or draft.expires_at <= datetime.utcnow():
+        return None
+    return draft
+
+
+def delete_draft(draft_id):
+    """
+    Remove a draft once it has been saved or abandoned
+
+    Args:
+        draft_id (str): Id from save_draft()
+    """
+    ExtractionDraft.query.filter_by(id=draft_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def sweep_expired_drafts():
+    """Delete drafts that were never saved before their expiry"""
+    removed = ExtractionDraft.query.filter(ExtractionDraft.expires_at <= datetime.utcnow()).delete(
+        synchronize_session=False
+    )
+    if removed:
+        logger.info(f"Removed {removed} expired extraction drafts")
+    db.session.commit()
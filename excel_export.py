@@ -0,0 +1,191 @@
+import os
+import logging
+from datetime import datetime
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from app import db
+from models import ExtractedForm
+from form_normalizer import get_normalizer
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the database per round trip while streaming forms
+EXPORT_FETCH_SIZE = 500
+
+_TITLE_FONT = Font(size=16, bold=True)
+_HEADING_FONT = Font(size=14, bold=True)
+_BOLD_FONT = Font(bold=True)
+_HEADER_FILL = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
+
+
+def _safe_sheet_name(name):
+    return name.replace('/', '-').replace('\\', '-')
+
+
+def _styled(sheet, value, font=None, fill=None):
+    cell = WriteOnlyCell(sheet, value=value)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    return cell
+
+
+def _header_row(sheet, headers):
+    return [_styled(sheet, header, _BOLD_FONT, _HEADER_FILL) for header in headers]
+
+
+def _set_widths(sheet, widths):
+    for column, width in enumerate(widths, start=1):
+        sheet.column_dimensions[get_column_letter(column)].width = width
+
+
+def _form_filter(user_id, max_form_id):
+    criteria = [ExtractedForm.user_id == user_id]
+    if max_form_id is not None:
+        criteria.append(ExtractedForm.id <= max_form_id)
+    return criteria
+
+
+def _iter_form_rows(user_id, template_type, max_form_id):
+    """Stream (id, file_name, created_at, extracted_data) rows for one template, newest first"""
+    statement = (
+        db.select(ExtractedForm.id, ExtractedForm.file_name, ExtractedForm.created_at, ExtractedForm.extracted_data)
+        .where(*_form_filter(user_id, max_form_id), ExtractedForm.template_type == template_type)
+        .order_by(ExtractedForm.created_at.desc(), ExtractedForm.id.desc())
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    return db.session.execute(statement)
+
+
+class _TemplateSheets:
+    """
+    The write-only sheets of one template type, filled a form at a time
+
+    Columns come from the template definition rather than from a scan of
+    every saved form, so the headers can be written before the first form
+    is read.
+    """
+
+    def __init__(self, workbook, template_type):
+        self.normalizer = get_normalizer(template_type)
+        # The per-section tables use sorted columns
+        self.sections = [(section_name, sorted(fields)) for section_name, fields in self.normalizer.sections]
+
+        self.summary = workbook.create_sheet(title=_safe_sheet_name(f"{template_type[:25]}_Summary"[:31]))
+        _set_widths(self.summary, [10, 30, 20])
+        self.summary.append([_styled(self.summary, f"{template_type} Forms Summary", _HEADING_FONT)])
+        self.summary.append([])
+        self.summary.append(_header_row(self.summary, ["Form ID", "File Name", "Created Date"]))
+
+        self.details = workbook.create_sheet(title=_safe_sheet_name(f"{template_type[:20]}_Details"[:31]))
+        _set_widths(self.details, [30, 50])
+        self.details.append([_styled(self.details, f"{template_type} - All Forms Data", _HEADING_FONT)])
+        self.details.append([])
+
+        self.section_sheets = []
+        for section_name, fields in self.sections:
+            sheet_name = f"{_safe_sheet_name(template_type[:12])}-{_safe_sheet_name(section_name[:12])}"[:31]
+            section_sheet = workbook.create_sheet(title=sheet_name)
+            _set_widths(section_sheet, [10, 25, 20] + [min(30, max(15, len(field) * 1.2)) for field in fields])
+            section_sheet.append([_styled(section_sheet, f"{template_type} - {section_name}", _HEADING_FONT)])
+            section_sheet.append([])
+            section_sheet.append(_header_row(section_sheet, ["Form ID", "File Name", "Created Date"] + fields))
+            self.section_sheets.append(section_sheet)
+
+        headers = [f"{section_name} - {field}" for section_name, fields in self.sections for field in fields]
+        self.consolidated = workbook.create_sheet(title=_safe_sheet_name(template_type[:25]))
+        _set_widths(self.consolidated, [10, 25, 20] + [min(20, max(15, len(header) * 0.8)) for header in headers])
+        self.consolidated.append([_styled(self.consolidated, f"{template_type} - All Data", _HEADING_FONT)])
+        self.consolidated.append([])
+        self.consolidated.append(_header_row(self.consolidated, ["Form ID", "File Name", "Created Date"] + headers))
+
+    def add_form(self, form_id, file_name, created_at, form_data):
+        """Append one saved form to every sheet of its template"""
+        created = created_at.strftime('%Y-%m-%d %H:%M:%S')
+
+        self.summary.append([form_id, file_name, created])
+
+        self.details.append([
+            _styled(self.details, f"Form ID: {form_id}", _BOLD_FONT),
+            f"File: {file_name}",
+            f"Date: {created}"
+        ])
+        self.details.append([])
+
+        complete_form_data = self.normalizer.normalize(form_data)
+
+        consolidated_values = []
+        for (section_name, fields), section_sheet in zip(self.sections, self.section_sheets):
+            section_data = complete_form_data[section_name]
+
+            values = [section_data[field] for field in fields]
+            section_sheet.append([form_id, file_name, created] + values)
+            consolidated_values.extend(values)
+
+            # The details sheet also lists saved fields the template doesn't define
+            self.details.append([_styled(self.details, section_name, _BOLD_FONT)])
+            self.details.append([_styled(self.details, "Field", _BOLD_FONT), _styled(self.details, "Value", _BOLD_FONT)])
+            for field, value in section_data.items():
+                self.details.append([field, value or ''])
+            self.details.append([])
+
+        self.details.append([])
+        self.details.append([])
+
+        self.consolidated.append([form_id, file_name, created] + consolidated_values)
+
+
+@timed('export_generation')
+def write_forms_workbook(user_id, username, file_path, max_form_id=None):
+    """
+    Write every saved form of a user to an Excel workbook on disk
+
+    The workbook is built in openpyxl's write-only mode and forms are read
+    with yield_per, so memory use stays flat however many forms the user
+    has: rows go straight to the sheets' temporary files and are only
+    zipped into the workbook by the final save.
+
+    Args:
+        user_id (int): Owner of the forms
+        username (str): Shown on the summary sheet
+        file_path (str): Destination .xlsx path
+        max_form_id (int, optional): Leave out forms saved after this one
+
+    Returns:
+        int: Number of forms written
+    """
+    form_counts = (
+        db.session.query(ExtractedForm.template_type, db.func.count(ExtractedForm.id))
+        .filter(*_form_filter(user_id, max_form_id))
+        .group_by(ExtractedForm.template_type)
+        .order_by(db.func.max(ExtractedForm.created_at).desc())
+        .all()
+    )
+
+    workbook = openpyxl.Workbook(write_only=True)
+
+    summary_sheet = workbook.create_sheet(title='Summary')
+    summary_sheet.append([_styled(summary_sheet, "FormOCR - All Forms Export", _TITLE_FONT)])
+    summary_sheet.append(["User:", username])
+    summary_sheet.append(["Export Date:", datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
+    summary_sheet.append([])
+    summary_sheet.append([_styled(summary_sheet, "Templates Included:", _BOLD_FONT)])
+    for idx, (template_type, form_count) in enumerate(form_counts):
+        summary_sheet.append([f"{idx + 1}. {template_type} ({form_count} forms)"])
+
+    total = 0
+    for template_type, _ in form_counts:
+        sheets = _TemplateSheets(workbook, template_type)
+        for form_id, file_name, created_at, form_data in _iter_form_rows(user_id, template_type, max_form_id):
+            sheets.add_form(form_id, file_name, created_at, form_data)
+            total += 1
+
+    workbook.save(file_path)
+    logger.info(f"Exported {total} forms for user {user_id} to {file_path} ({os.path.getsize(file_path)} bytes)")
+    return total
@@ -0,0 +1,212 @@
+import os
+import uuid
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from app import app, db
+from models import ExportJob, ExtractedForm, User
+from job_queue import submit_job
+from database import use_replica
+
+logger = logging.getLogger(__name__)
+
+
+def get_export_path(job_id):
+    """
+    Build the path where a finished export is kept until it expires
+
+    Args:
+        job_id (str): Export job id
+
+    Returns:
+        str: Absolute path inside the configured export folder
+    """
+    export_folder = app.config['EXPORT_FOLDER']
+    os.makedirs(export_folder, exist_ok=True)
+    return os.path.join(export_folder, f"{job_id}.xlsx")
+
+
+def _fail_stale_exports():
+    """
+    Fail export jobs whose worker stopped while running them
+
+    An export still running after JOB_TIMEOUT was left behind by a worker
+    that was killed or restarted, and would otherwise be handed out to every
+    request for the same forms until it expired.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=app.config['JOB_TIMEOUT'])
+    failed = ExportJob.query.filter(
+        ExportJob.status == 'running',
+        ExportJob.started_at <= stale_before
+    ).update(
+        {'status': 'failed', 'error': 'The export stopped before it finished', 'finished_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+    if failed:
+        logger.warning(f"Failed {failed} export jobs that stopped running")
+
+
+def _is_reusable(job, now):
+    """Check whether an existing job can serve a new request for the same forms"""
+    if job.status in ('queued', 'running'):
+        return True
+    return job.expires_at is not None and job.expires_at > now and os.path.exists(job.file_path)
+
+
+def request_export(user_id):
+    """
+    Return an export job covering all of a user's forms, queuing one if needed
+
+    An export is identified by the user's newest form id and form count, so
+    a finished or in-progress export is handed out again until a form is
+    added or deleted.
+
+    Args:
+        user_id (int): Owner of the forms
+
+    Returns:
+        ExportJob: Reused or newly queued job, or None if the user has no forms
+    """
+    max_form_id, form_count = (
+        db.session.query(db.func.max(ExtractedForm.id), db.func.count(ExtractedForm.id))
+        .filter(ExtractedForm.user_id == user_id)
+        .one()
+    )
+    if not form_count:
+        return None
+
+    sweep_expired_exports()
+    _fail_stale_exports()
+
+    now = datetime.utcnow()
+    candidates = (
+        ExportJob.query
+        .filter_by(user_id=user_id, max_form_id=max_form_id, form_count=form_count)
+        .filter(ExportJob.status != 'failed')
+        .order_by(ExportJob.created_at.desc())
+    )
+    for job in candidates:
+        if _is_reusable(job, now):
+            logger.info(f"Reusing export job {job.id} for user {user_id} ({job.status})")
+            return job
+
+    job = ExportJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        max_form_id=max_form_id,
+        form_count=form_count,
+        status='queued'
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    submit_job(app, run_export_job, job.id)
+    logger.info(f"Queued export job {job.id} for user {user_id}: {form_count} forms up to id {max_form_id}")
+    return job
+
+
+def _claim_job(job_id):
+    """
+    Atomically move an export job from queued to running
+
+    Returns:
+        bool: True if this worker now owns the job
+    """
+    claimed = ExportJob.query.filter_by(id=job_id, status='queued').update(
+        {'status': 'running', 'started_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def _replica_has_forms(job):
+    """Whether the read replica already has every form the export covers"""
+    with use_replica():
+        replica_max_form_id = (
+            db.session.query(db.func.max(ExtractedForm.id))
+            .filter(ExtractedForm.user_id == job.user_id)
+            .scalar()
+        )
+    return replica_max_form_id is not None and replica_max_form_id >= job.max_form_id
+
+
+def run_export_job(job_id):
+    """
+    Build the workbook for a queued export job
+
+    Args:
+        job_id (str): Export job id
+    """
+    if not _claim_job(job_id):
+        logger.info(f"Export job {job_id} already claimed, skipping")
+        return
+
+    # openpyxl is only loaded by workers that actually build a workbook
+    from excel_export import write_forms_workbook
+
+    job = db.session.get(ExportJob, job_id)
+    user = db.session.get(User, job.user_id)
+    file_path = get_export_path(job_id)
+
+    try:
+        # Forms saved after the job was queued belong to the next export
+        with use_replica() if _replica_has_forms(job) else nullcontext():
+            write_forms_workbook(job.user_id, user.username, file_path, max_form_id=job.max_form_id)
+        job.file_path = file_path
+        job.status = 'completed'
+        job.expires_at = datetime.utcnow() + timedelta(seconds=app.config['EXPORT_TTL'])
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed")
+        job.status = 'failed'
+        # Some exceptions carry no message; keep at least their type
+        job.error = str(e) or e.__class__.__name__
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    finally:
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def sweep_expired_exports():
+    """
+    Delete expired export files and jobs, along with failed or abandoned
+    jobs older than the export TTL.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=app.config['EXPORT_TTL'])
+
+    expired = ExportJob.query.filter(
+        db.or_(
+            ExportJob.expires_at <= now,
+            db.and_(ExportJob.status != 'completed', ExportJob.created_at <= stale_before)
+        )
+    ).all()
+    if not expired:
+        return
+
+    for job in expired:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        db.session.delete(job)
+    db.session.commit()
+    logger.info(f"Removed {len(expired)} expired export jobs")
+
+
+def resume_pending_exports():
+    """
+    Re-submit export jobs that were queued but never started, e.g. because
+    the worker that accepted the request was restarted. Jobs whose worker
+    stopped while running them are failed, the next request queues a new one.
+    """
+    _fail_stale_exports()
+
+    pending_ids = [row.id for row in ExportJob.query.filter_by(status='queued').with_entities(ExportJob.id)]
+    for job_id in pending_ids:
+        submit_job(app, run_export_job, job_id)
+
+    if pending_ids:
+        logger.info(f"Resumed {len(pending_ids)} pending export jobs")
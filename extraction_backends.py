@@ -0,0 +1,332 @@
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app import db
+from gemini_form_extractor import get_form_extractor
+from extraction_cache import get_extraction_cache
+from image_preprocessing import get_image_preprocessor
+from local_ocr_extractor import get_local_extractor, LocalFirstExtractor, pytesseract
+from template_registry import get_compiled_template
+from resilience import get_model_call_policy
+from job_queue import run_in_thread
+
+logger = logging.getLogger(__name__)
+
+BACKEND_GEMINI = 'gemini'
+BACKEND_LOCAL = 'local'
+BACKEND_LOCAL_FIRST = 'local_first'
+BACKEND_STUB = 'stub'
+
+# Backends users may pick per upload; the stub is only selectable through config
+UPLOAD_BACKENDS = (BACKEND_GEMINI, BACKEND_LOCAL, BACKEND_LOCAL_FIRST)
+
+
+class BackendConfigurationError(ValueError):
+    """Raised when the server's configuration doesn't allow using a backend"""
+
+
+class ExtractionBackend:
+    """
+    Interface every extraction engine implements
+
+    Subclasses implement extract() and health_check(); extract_many() runs
+    extract() over a thread pool and works for any backend. Backends with an
+    async client also override extract_async().
+    """
+
+    name = None
+
+    def __init__(self, app):
+        """
+        Args:
+            app (Flask): Application whose config drives the backend
+        """
+        self.app = app
+
+    def extract(self, file_path, template_type, request_timeout=None, rate_limiter=None):
+        """
+        Extract one form
+
+        Args:
+            file_path (str): Path to the uploaded form file
+            template_type (str): Type of form template
+            request_timeout (float, optional): Seconds to allow the extraction
+            rate_limiter (RateLimiter, optional): Acquired before every model
+                call; backends that call no model ignore it
+
+        Returns:
+            dict: Extracted data organized by sections
+        """
+        raise NotImplementedError
+
+    async def extract_async(self, file_path, template_type, request_timeout=None):
+        """
+        Extract one form without blocking the event loop
+
+        Backends without an async client run extract() on a worker thread
+        with its own app context and database session.
+
+        Args:
+            file_path (str): Path to the uploaded form file
+            template_type (str): Type of form template
+            request_timeout (float, optional): Seconds to allow the extraction
+
+        Returns:
+            dict: Extracted data organized by sections
+        """
+        return await run_in_thread(self.extract, file_path, template_type, request_timeout)
+
+    def extract_many(self, items, request_timeout=None, max_workers=4, rate_limiter=None):
+        """
+        Extract several forms concurrently, yielding results as they finish
+
+        Args:
+            items (list): (file_path, template_type) pairs
+            request_timeout (float, optional): Seconds to allow each extraction
+            max_workers (int): Number of extractions run in parallel
+            rate_limiter (RateLimiter, optional): Acquired before every model call,
+                so a PDF takes one slot per page
+
+        Yields:
+            tuple: (index into items, extracted data or None, exception or None)
+        """
+        def run(file_path, template_type):
+            with self.app.app_context():
+                try:
+                    return self.extract(
+                        file_path, template_type, request_timeout=request_timeout, rate_limiter=rate_limiter
+                    )
+                finally:
+                    db.session.remove()
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{self.name}-extract") as pool:
+            futures = {pool.submit(run, file_path, template_type): index for index, (file_path, template_type) in enumerate(items)}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        yield futures[future], future.result(), None
+                    except Exception as e:
+                        yield futures[future], None, e
+            finally:
+                # If the caller stops early, don't start the extractions still waiting
+                for future in futures:
+                    future.cancel()
+
+    def health_check(self):
+        """
+        Check whether the backend can currently serve extractions
+
+        Returns:
+            dict: {'backend': name, 'healthy': bool, 'detail': str}
+        """
+        raise NotImplementedError
+
+    def _health(self, healthy, detail):
+        return {'backend': self.name, 'healthy': healthy, 'detail': detail}
+
+
+class GeminiBackend(ExtractionBackend):
+    """Remote extraction with Gemini, sharing the process-wide client"""
+
+    name = BACKEND_GEMINI
+
+    def get_extractor(self):
+        """
+        Returns:
+            GeminiFormExtractor: Shared extractor wired up with the app's cache and preprocessing
+
+        Raises:
+            BackendConfigurationError: If GOOGLE_API_KEY is not set
+        """
+        if not self.app.config['GOOGLE_API_KEY']:
+            raise BackendConfigurationError("GOOGLE_API_KEY is not configured")
+        return get_form_extractor(
+            api_key=self.app.config['GOOGLE_API_KEY'],
+            model_name=self.app.config['GEMINI_MODEL'],
+            cache=get_extraction_cache(self.app),
+            preprocessor=get_image_preprocessor(self.app),
+            pdf_page_concurrency=self.app.config['PDF_PAGE_CONCURRENCY'],
+            call_policy=get_model_call_policy(self.app),
+            json_mode=self.app.config['GEMINI_JSON_MODE']
+        )
+
+    def extract(self, file_path, template_type, request_timeout=None, rate_limiter=None):
+        return self.get_extractor().extract_form_data(
+            file_path, template_type, request_timeout=request_timeout, rate_limiter=rate_limiter
+        )
+
+    async def extract_async(self, file_path, template_type, request_timeout=None):
+        # The first call builds the client (and imports the SDK), keep that off the loop
+        extractor = await asyncio.to_thread(self.get_extractor)
+        return await extractor.extract_form_data_async(file_path, template_type, request_timeout=request_timeout)
+
+    def health_check(self):
+        if not self.app.config['GOOGLE_API_KEY']:
+            return self._health(False, "GOOGLE_API_KEY is not configured")
+
+        breaker = get_model_call_policy(self.app).breaker
+        if breaker.state == 'open':
+            return self._health(False, "Circuit breaker is open after repeated Gemini errors")
+
+        try:
+            self.get_extractor().check_model(timeout=10)
+        except Exception as e:
+            return self._health(False, f"Gemini model lookup failed: {str(e)}")
+        return self._health(True, f"Model {self.app.config['GEMINI_MODEL']} reachable")
+
+
+class LocalOCRBackend(ExtractionBackend):
+    """Offline extraction with Tesseract and the template regexes"""
+
+    name = BACKEND_LOCAL
+
+    def extract(self, file_path, template_type, request_timeout=None, rate_limiter=None):
+        return get_local_extractor(self.app).extract_form_data(file_path, template_type, request_timeout)
+
+    def health_check(self):
+        if pytesseract is None:
+            return self._health(False, "pytesseract is not installed")
+
+        try:
+            version = pytesseract.get_tesseract_version()
+        except Exception as e:
+            return self._health(False, f"Tesseract is not available: {str(e)}")
+        return self._health(True, f"Tesseract {version}")
+
+
+class LocalFirstBackend(ExtractionBackend):
+    """Local extraction first, Gemini only for the fields it couldn't fill"""
+
+    name = BACKEND_LOCAL_FIRST
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.gemini = GeminiBackend(app)
+        self.local = LocalOCRBackend(app)
+
+    def extract(self, file_path, template_type, request_timeout=None, rate_limiter=None):
+        try:
+            local_extractor = get_local_extractor(self.app)
+        except RuntimeError as e:
+            logger.warning(f"Local extraction unavailable, using Gemini only: {str(e)}")
+            return self.gemini.extract(
+                file_path, template_type, request_timeout=request_timeout, rate_limiter=rate_limiter
+            )
+
+        extractor = LocalFirstExtractor(
+            local_extractor,
+            self.gemini.get_extractor,
+            min_fill_ratio=self.app.config['LOCAL_FIRST_MIN_FILL_RATIO']
+        )
+        return extractor.extract_form_data(file_path, template_type, request_timeout, rate_limiter=rate_limiter)
+
+    def health_check(self):
+        # Gemini alone can serve every request, the local pass only saves calls
+        gemini_health = self.gemini.health_check()
+        local_health = self.local.health_check()
+        return self._health(
+            gemini_health['healthy'],
+            f"gemini: {gemini_health['detail']}; local: {local_health['detail']}"
+        )
+
+
+class StubBackend(ExtractionBackend):
+    """
+    Deterministic stand-in for load testing without an API key or network
+
+    Returns every template field filled with a value derived from the file
+    contents, after a synthetic latency. The same file always yields the
+    same data; STUB_FAILURE_RATE makes a share of calls fail instead.
+    """
+
+    name = BACKEND_STUB
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.latency = app.config.get('STUB_LATENCY_MS', 500) / 1000.0
+        self.jitter = app.config.get('STUB_LATENCY_JITTER_MS', 0) / 1000.0
+        self.failure_rate = app.config.get('STUB_FAILURE_RATE', 0.0)
+
+    def extract(self, file_path, template_type, request_timeout=None, rate_limiter=None):
+        # Stands in for one model call
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        delay = self._draw_delay()
+        if request_timeout and delay > request_timeout:
+            time.sleep(request_timeout)
+            raise TimeoutError(f"Stub extraction timed out after {request_timeout}s")
+        time.sleep(delay)
+        return self._fake_result(file_path, template_type)
+
+    async def extract_async(self, file_path, template_type, request_timeout=None):
+        # Waits like a real async client, so one event loop can hold many calls
+        delay = self._draw_delay()
+        if request_timeout and delay > request_timeout:
+            await asyncio.sleep(request_timeout)
+            raise TimeoutError(f"Stub extraction timed out after {request_timeout}s")
+        await asyncio.sleep(delay)
+        return self._fake_result(file_path, template_type)
+
+    def _draw_delay(self):
+        # Latency and failures are drawn per call, so replaying one file in a
+        # load test still sees the configured spread and failure rate
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def _fake_result(self, file_path, template_type):
+        compiled_template = get_compiled_template(template_type)
+
+        with open(file_path, 'rb') as f:
+            digest = hashlib.file_digest(f, 'sha256').hexdigest()
+
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Stub extraction failed (synthetic failure)")
+
+        result = compiled_template.new_result()
+        for section_name, fields in compiled_template.sections:
+            for field_name in fields:
+                result[section_name][field_name] = f"{field_name} {digest[:8]}"
+        return result
+
+    def health_check(self):
+        return self._health(True, f"Stub backend, {self.latency * 1000:.0f} ms latency")
+
+
+BACKENDS = {
+    backend_class.name: backend_class
+    for backend_class in (GeminiBackend, LocalOCRBackend, LocalFirstBackend, StubBackend)
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_extraction_backend(app, name=None):
+    """
+    Return the process-wide instance of an extraction backend
+
+    Args:
+        app (Flask): Application whose config drives the backend
+        name (str, optional): gemini, local, local_first or stub, defaults to EXTRACTION_BACKEND
+
+    Returns:
+        ExtractionBackend: Shared backend instance
+
+    Raises:
+        BackendConfigurationError: If the backend name is unknown
+    """
+    name = name or app.config['EXTRACTION_BACKEND']
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise BackendConfigurationError(f"Unknown extraction backend: {name}")
+
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            logger.info(f"Using {name} extraction backend")
+            backend = _backends[name] = backend_class(app)
+        return backend
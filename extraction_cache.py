@@ -0,0 +1,225 @@
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from app import db
+from models import ExtractionCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Two-level cache of extraction results keyed on the uploaded content
+
+    An in-memory LRU sits in front of the ExtractionCacheEntry table so that
+    repeated uploads in the same worker don't touch the database, while the
+    table shares results between workers and survives restarts.
+    """
+
+    def __init__(self, ttl_seconds=7 * 24 * 3600, max_entries=10000, memory_entries=256, evict_every=100):
+        """
+        Args:
+            ttl_seconds (int): How long a cached result stays valid
+            max_entries (int): Maximum number of rows kept in the database
+            memory_entries (int): Maximum number of results kept in memory
+            evict_every (int): Writes between two eviction passes in this worker
+        """
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.evict_every = max(1, evict_every)
+        self._writes_since_evict = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(file_digest, template_type, prompt, model_name, json_mode, preprocessing):
+        """
+        Build the content-addressed cache key
+
+        Everything that changes what the model is sent or asked for is part
+        of the key, so a configuration change never serves results produced
+        under the old one.
+
+        Args:
+            file_digest (bytes): sha256 digest of the raw uploaded file
+            template_type (str): Type of form template
+            prompt (str): Extraction prompt sent to the model
+            model_name (str): Gemini model answering the request
+            json_mode (str): Response schema in JSON mode, "" for free text
+            preprocessing (str): Fingerprint of the image preprocessing settings, "" when off
+
+        Returns:
+            str: Hex sha256 digest
+        """
+        digest = hashlib.sha256()
+        digest.update(file_digest)
+        for part in (template_type, prompt, model_name, json_mode, preprocessing):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached extraction result
+
+        Args:
+            key (str): Key from make_key()
+
+        Returns:
+            dict or None: A fresh copy of the cached result, or None on a miss
+        """
+        now = datetime.utcnow()
+
+        result_json = None
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if cached[1] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    result_json = cached[0]
+                else:
+                    del self._memory[key]
+
+        if result_json is not None:
+            self._log_lookup("memory hit", key)
+            return json.loads(result_json)
+
+        entry = db.session.get(ExtractionCacheEntry, key)
+        if entry is not None and entry.expires_at > now:
+            self._remember(key, entry.result_data, entry.expires_at)
+            with self._lock:
+                self.db_hits += 1
+            self._log_lookup("database hit", key)
+            return json.loads(entry.result_data)
+
+        with self._lock:
+            self.misses += 1
+        self._log_lookup("miss", key)
+        return None
+
+    def set(self, key, template_type, result):
+        """
+        Store an extraction result, evicting expired or excess entries every evict_every writes
+
+        Args:
+            key (str): Key from make_key()
+            template_type (str): Type of form template
+            result (dict): Extracted data organized by sections
+        """
+        result_json = json.dumps(result)
+        expires_at = datetime.utcnow() + self.ttl
+        self._remember(key, result_json, expires_at)
+
+        try:
+            db.session.merge(ExtractionCacheEntry(
+                key=key,
+                template_type=template_type,
+                result_data=result_json,
+                created_at=datetime.utcnow(),
+                expires_at=expires_at
+            ))
+            db.session.commit()
+            if self._due_for_eviction():
+                self._evict()
+        except Exception as e:
+            # A failed cache write must never fail the extraction itself
+            db.session.rollback()
+            logger.error(f"Error storing extraction cache entry: {str(e)}")
+
+    def stats(self):
+        """
+        Return hit/miss counters for this worker
+
+        Returns:
+            dict: Counters and overall hit rate
+        """
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                'memoryHits': self.memory_hits,
+                'databaseHits': self.db_hits,
+                'misses': self.misses,
+                'hitRate': hits / lookups if lookups else 0.0,
+                'memoryEntries': len(self._memory)
+            }
+
+    def _remember(self, key, result_json, expires_at):
+        with self._lock:
+            self._memory[key] = (result_json, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _due_for_eviction(self):
+        # Counting the table on every write costs more than the write itself;
+        # the table may run up to evict_every rows per worker over max_entries
+        with self._lock:
+            self._writes_since_evict += 1
+            if self._writes_since_evict < self.evict_every:
+                return False
+            self._writes_since_evict = 0
+            return True
+
+    def _evict(self):
+        ExtractionCacheEntry.query.filter(ExtractionCacheEntry.expires_at <= datetime.utcnow()).delete(
+            synchronize_session=False
+        )
+
+        excess = ExtractionCacheEntry.query.count() - self.max_entries
+        if excess > 0:
+            oldest_keys = (
+                db.session.query(ExtractionCacheEntry.key)
+                .order_by(ExtractionCacheEntry.created_at)
+                .limit(excess)
+                .subquery()
+            )
+            ExtractionCacheEntry.query.filter(ExtractionCacheEntry.key.in_(db.select(oldest_keys.c.key))).delete(
+                synchronize_session=False
+            )
+
+        db.session.commit()
+
+    def _log_lookup(self, outcome, key):
+        stats = self.stats()
+        logger.info(f"Extraction cache {outcome} for {key[:12]} (hit rate {stats['hitRate']:.1%})")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache(app):
+    """
+    Return the process-wide extraction cache, or None if caching is disabled
+
+    Args:
+        app (Flask): Application whose config sizes the cache
+
+    Returns:
+        ExtractionCache or None: Shared cache instance
+    """
+    global _cache
+
+    if not app.config.get("EXTRACTION_CACHE_ENABLED", True):
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache(
+                ttl_seconds=app.config.get("EXTRACTION_CACHE_TTL", 7 * 24 * 3600),
+                max_entries=app.config.get("EXTRACTION_CACHE_MAX_ENTRIES", 10000),
+                memory_entries=app.config.get("EXTRACTION_CACHE_MEMORY_ENTRIES", 256)
+            )
+        return _cache
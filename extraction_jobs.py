@@ -0,0 +1,164 @@
+import os
+import uuid
+import logging
+from datetime import datetime, timedelta
+
+from app import app, db
+from models import ExtractionJob
+from extraction_backends import get_extraction_backend
+from job_queue import submit_job
+from instrumentation import stage_timer
+
+logger = logging.getLogger(__name__)
+
+
+def new_job_id():
+    """
+    Generate an identifier for a new extraction job
+
+    Returns:
+        str: Random hex job id
+    """
+    return uuid.uuid4().hex
+
+
+def get_job_upload_path(job_id, filename):
+    """
+    Build the path where an upload is kept until its job has run
+
+    Args:
+        job_id (str): Extraction job id
+        filename (str): Sanitized original file name
+
+    Returns:
+        str: Absolute path inside the configured upload folder
+    """
+    upload_folder = app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_folder, exist_ok=True)
+    return os.path.join(upload_folder, f"{job_id}_{filename}")
+
+
+def enqueue_extraction_job(job_id, user_id, template_type, file_name, file_path, extraction_mode=None):
+    """
+    Persist an extraction job and hand it to the background worker pool
+
+    Args:
+        job_id (str): Id from new_job_id()
+        user_id (int): Owner of the upload
+        template_type (str): Type of form template
+        file_name (str): Original file name shown to the user
+        file_path (str): Stored upload to extract from
+        extraction_mode (str, optional): Backend for this upload, defaults to EXTRACTION_BACKEND
+
+    Returns:
+        ExtractionJob: The queued job
+    """
+    job = ExtractionJob(
+        id=job_id,
+        user_id=user_id,
+        template_type=template_type,
+        extraction_mode=extraction_mode,
+        file_name=file_name,
+        file_path=file_path,
+        status='queued'
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    submit_job(app, run_extraction_job, job_id)
+    logger.info(f"Queued extraction job {job_id} for {file_name}")
+    return job
+
+
+def _claim_job(job_id):
+    """
+    Atomically move a job from queued to running
+
+    Several gunicorn workers may try to run the same job (for example after a
+    restart), so the status transition doubles as a lock.
+
+    Returns:
+        bool: True if this worker now owns the job
+    """
+    claimed = ExtractionJob.query.filter_by(id=job_id, status='queued').update(
+        {'status': 'running', 'started_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def run_extraction_job(job_id):
+    """
+    Run a queued extraction job and store its result
+
+    Args:
+        job_id (str): Extraction job id
+    """
+    if not _claim_job(job_id):
+        logger.info(f"Extraction job {job_id} already claimed, skipping")
+        return
+
+    job = db.session.get(ExtractionJob, job_id)
+    logger.info(f"Running extraction job {job_id} with template {job.template_type}")
+
+    try:
+        backend = get_extraction_backend(app, job.extraction_mode)
+        with stage_timer('extraction'):
+            extracted_data = backend.extract(job.file_path, job.template_type)
+        job.set_result(extracted_data)
+        job.status = 'completed'
+    except Exception as e:
+        logger.error(f"Extraction job {job_id} failed: {str(e)}")
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+        # The upload is no longer needed once the job has finished
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+
+
+def _requeue_stale_jobs():
+    """
+    Put jobs back in the queue whose worker stopped while running them
+
+    A job still running after JOB_TIMEOUT was left behind by a worker that
+    was killed or restarted. Each one is moved back with a conditional
+    update, so only one resuming worker takes it over.
+
+    Returns:
+        int: Number of jobs requeued
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=app.config['JOB_TIMEOUT'])
+    requeued = ExtractionJob.query.filter(
+        ExtractionJob.status == 'running',
+        ExtractionJob.batch_id.is_(None),
+        ExtractionJob.started_at <= stale_before
+    ).update({'status': 'queued', 'started_at': None}, synchronize_session=False)
+    db.session.commit()
+
+    if requeued:
+        logger.warning(f"Requeued {requeued} extraction jobs that stopped running")
+    return requeued
+
+
+def resume_pending_jobs():
+    """
+    Re-submit jobs that were queued but never picked up, or whose worker
+    stopped while running them, e.g. because the worker was restarted.
+    Batch items are resumed by their batch instead.
+    """
+    _requeue_stale_jobs()
+
+    pending_ids = [
+        row.id for row in
+        ExtractionJob.query.filter_by(status='queued', batch_id=None).with_entities(ExtractionJob.id)
+    ]
+    for job_id in pending_ids:
+        submit_job(app, run_extraction_job, job_id)
+
+    if pending_ids:
+        logger.info(f"Resumed {len(pending_ids)} pending extraction jobs")
@@ -0,0 +1,138 @@
+import base64
+import logging
+from datetime import datetime
+
+from sqlalchemy import type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import defer
+
+from app import db
+from models import ExtractedForm
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(extracted_form):
+    """
+    Build an opaque pagination cursor pointing just after a form
+
+    Args:
+        extracted_form (ExtractedForm): Last form on the current page
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    raw = f"{extracted_form.created_at.isoformat()}|{extracted_form.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor from encode_cursor()
+
+    Args:
+        cursor (str): Cursor string from the request
+
+    Returns:
+        tuple: (created_at, id), or None if the cursor is invalid
+    """
+    try:
+        created_at, form_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(form_id)
+    except Exception:
+        logger.warning(f"Ignoring invalid pagination cursor: {cursor!r}")
+        return None
+
+
+def _paginate(query, cursor, limit):
+    """Apply (created_at, id) keyset pagination to a form query, newest first"""
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        query = query.filter(db.tuple_(ExtractedForm.created_at, ExtractedForm.id) < position)
+
+    forms = query.order_by(ExtractedForm.created_at.desc(), ExtractedForm.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(forms) > limit:
+        forms = forms[:limit]
+        next_cursor = encode_cursor(forms[-1])
+
+    return forms, next_cursor
+
+
+def list_user_forms(user_id, cursor=None, limit=20):
+    """
+    Return one page of a user's forms, newest first, without their data
+
+    Uses keyset pagination on (created_at, id), which the composite
+    (user_id, created_at, id) index answers directly, so every page costs
+    the same however deep into the listing it is. The extracted_data
+    column is deferred because list views never show it.
+
+    Args:
+        user_id (int): Owner of the forms
+        cursor (str, optional): Cursor from a previous page
+        limit (int): Page size
+
+    Returns:
+        tuple: (list of ExtractedForm, cursor for the next page or None)
+    """
+    query = (
+        ExtractedForm.query
+        .options(defer(ExtractedForm.extracted_data))
+        .filter(ExtractedForm.user_id == user_id)
+    )
+
+    return _paginate(query, cursor, limit)
+
+
+def count_user_forms(user_id, template_type=None):
+    """
+    Count a user's saved forms
+
+    Args:
+        user_id (int): Owner of the forms
+        template_type (str, optional): Only count forms of this template
+
+    Returns:
+        int: Number of forms
+    """
+    query = db.session.query(db.func.count(ExtractedForm.id)).filter(ExtractedForm.user_id == user_id)
+    if template_type:
+        query = query.filter(ExtractedForm.template_type == template_type)
+    return query.scalar()
+
+
+def search_user_forms(user_id, section, field, value, template_type=None, cursor=None, limit=20):
+    """
+    Find a user's forms whose extracted field has an exact value
+
+    On PostgreSQL this is a JSONB containment test (extracted_data @>
+    {section: {field: value}}), which the GIN index on extracted_data
+    answers without reading every row. Other databases compare the
+    JSON-extracted field instead.
+
+    Args:
+        user_id (int): Owner of the forms
+        section (str): Section name, e.g. "Personal Details"
+        field (str): Field name within the section, e.g. "Nationality"
+        value (str): Value the field must equal
+        template_type (str, optional): Only search forms of this template
+        cursor (str, optional): Cursor from a previous page
+        limit (int): Page size
+
+    Returns:
+        tuple: (list of ExtractedForm, cursor for the next page or None)
+    """
+    query = ExtractedForm.query.filter(ExtractedForm.user_id == user_id)
+
+    if template_type:
+        query = query.filter(ExtractedForm.template_type == template_type)
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        data = type_coerce(ExtractedForm.extracted_data, JSONB)
+        query = query.filter(data.contains({section: {field: value}}))
+    else:
+        query = query.filter(ExtractedForm.extracted_data[(section, field)].as_string() == value)
+
+    return _paginate(query, cursor, limit)
@@ -0,0 +1,94 @@
+import logging
+
+from template_registry import get_compiled_template
+from form_templates import FORM_TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+
+class FormNormalizer:
+    """
+    Merges saved form data into the full field structure of one template
+
+    Sections, field order and the empty defaults are worked out once when
+    the normalizer is built, so normalizing a form is a dict copy and an
+    update per section instead of a walk over the template definition.
+    """
+
+    __slots__ = ('template_type', 'sections', '_defaults')
+
+    def __init__(self, template_type, sections):
+        """
+        Args:
+            template_type (str): Type of form template
+            sections (tuple): (section name, tuple of field names) pairs, as
+                held by CompiledTemplate.sections
+        """
+        self.template_type = template_type
+        self.sections = sections
+        self._defaults = tuple(
+            (section_name, dict.fromkeys(fields, "")) for section_name, fields in self.sections
+        )
+
+    def normalize(self, form_data):
+        """
+        Fill in every template field, overlaying the saved values
+
+        Template fields come first in template order with "" for anything
+        missing; saved fields the template doesn't define are kept after
+        them. Sections that aren't part of the template are dropped.
+
+        Args:
+            form_data (dict): Saved data organized by sections
+
+        Returns:
+            dict: Complete data organized by the template's sections
+        """
+        if not isinstance(form_data, dict):
+            form_data = {}
+
+        complete_form_data = {}
+        for section_name, defaults in self._defaults:
+            section_data = defaults.copy()
+            saved_section = form_data.get(section_name)
+            if isinstance(saved_section, dict):
+                section_data.update(saved_section)
+            complete_form_data[section_name] = section_data
+        return complete_form_data
+
+
+_NORMALIZERS = {
+    template_type: FormNormalizer(template_type, get_compiled_template(template_type).sections)
+    for template_type in FORM_TEMPLATES
+}
+
+
+def get_normalizer(template_type):
+    """
+    Return the precompiled normalizer for a template type
+
+    Args:
+        template_type (str): Type of form template
+
+    Returns:
+        FormNormalizer: Normalizer, one with no sections for unknown templates
+    """
+    normalizer = _NORMALIZERS.get(template_type)
+    if normalizer is None:
+        logger.warning(f"No template defined for {template_type}, form data will be empty")
+        normalizer = FormNormalizer(template_type, ())
+    return normalizer
+
+
+def normalize_form_data(template_type, form_data):
+    """
+    Merge saved form data into the full structure of its template
+
+    Args:
+        template_type (str): Type of form template
+        form_data (dict): Saved data organized by sections
+
+    Returns:
+        dict: Complete data organized by the template's sections
+    """
+    return get_normalizer(template_type).normalize(form_data)
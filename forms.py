@@ -1,9 +1,10 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileRequired, FileAllowed
+from flask_wtf.file import FileField, FileRequired, FileAllowed, MultipleFileField
 from wtforms import StringField, PasswordField, SubmitField, SelectField, BooleanField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError
 from flask import request
 from models import User
+from upload_storage import has_camera_upload
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -41,13 +42,32 @@ class FormUploadForm(FlaskForm):
                           validators=[
                               FileAllowed(['jpg', 'jpeg', 'png', 'pdf'], 'Images and PDF only!')
                           ])
+    extraction_mode = SelectField('Extraction Engine',
+                                  choices=[('', 'Default'),
+                                          ('gemini', 'Gemini (handwritten forms)'),
+                                          ('local', 'Local OCR (typed forms, offline)'),
+                                          ('local_first', 'Local OCR, Gemini for missing fields')],
+                                  default='')
     submit = SubmitField('Upload and Extract')
     
     def validate_form_file(self, field):
         # Skip validation if camera image is being used
-        if 'camera_image' in request.form and request.form['camera_image']:
+        if has_camera_upload(request):
             return
             
         # Otherwise enforce file required
         if not field.data:
             raise ValidationError('Please select a file or use the camera.')
+
+class BatchUploadForm(FlaskForm):
+    template = SelectField('Select Form Template', 
+                           choices=[('Biodata', 'Biodata'), 
+                                   ('Admission', 'Admission Form'), 
+                                   ('Bank Account', 'Bank Account Opening Form')],
+                           validators=[DataRequired()])
+    form_files = MultipleFileField('Upload Handwritten Forms', 
+                                   validators=[
+                                       FileRequired('Please select at least one file.'),
+                                       FileAllowed(['jpg', 'jpeg', 'png', 'pdf', 'zip'], 'Images, PDF and ZIP only!')
+                                   ])
+    submit = SubmitField('Upload and Extract All')
@@ -1,22 +1,93 @@
 import os
-import re
-import base64
+import json
+import asyncio
+import hashlib
 import logging
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, Any
 
-import google.generativeai as genai
-from form_templates import FORM_TEMPLATES
+from template_registry import get_compiled_template
+from instrumentation import timed, stage_timer, Counter, register_metric
+from logging_config import payload_logger
+from document_types import PDF_MIME_TYPE, sniff_mime_type, sniff_file_mime_type, iter_pdf_pages
+
+DEFAULT_MODEL_NAME = 'gemini-1.5-flash'
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Bullets, quotes and bold markers trimmed from "Field Name: value" lines in the fallback parser
+_LABEL_TRIM_CHARS = ' \t>-*"\'`'
+_VALUE_TRIM_CHARS = ' \t*"\'`'
+
+RESPONSE_PARSES = register_metric(Counter(
+    'formdigitizer_response_parses_total',
+    'Gemini responses parsed as JSON or through the line fallback',
+    ('result',)
+))
+
+
+def _decode_json_object(text):
+    """
+    Decode the first JSON object in a model response
+    
+    JSON mode responses are the bare object and decode in one call. For
+    free-text responses, with or without a ```json fence, decoding starts at
+    each "{" in turn and stops at the end of the first complete object, so
+    nothing after it is scanned.
+    
+    Args:
+        text (str): Response text
+        
+    Returns:
+        dict or None: The decoded object, or None if the text has none
+    """
+    stripped = text.strip()
+    if stripped.startswith('{'):
+        try:
+            value = json.loads(stripped)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+    
+    position = text.find('{')
+    while position != -1:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(text, position)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+        position = text.find('{', position + 1)
+    return None
 
 class GeminiFormExtractor:
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache=None, model_name=DEFAULT_MODEL_NAME, preprocessor=None, pdf_page_concurrency=4,
+                 call_policy=None, json_mode=True):
         """
         Initialize the Gemini API client
         
+        Prefer get_form_extractor() over constructing this directly, so the
+        client and its connection are shared across requests.
+        
         Args:
             api_key (str): Google Gemini API key
+            cache (ExtractionCache, optional): Result cache consulted before calling Gemini
+            model_name (str): Gemini model to use for extraction
+            preprocessor (ImagePreprocessor, optional): Shrinks images before they are sent
+            pdf_page_concurrency (int): Number of PDF pages extracted in parallel
+            call_policy (ModelCallPolicy, optional): Deadlines, retries, circuit
+                breaker and hedging for each Gemini call
+            json_mode (bool): Ask Gemini for JSON matching the template's response schema
         """
         self.logger = logging.getLogger(__name__)
+        self.cache = cache
+        self.preprocessor = preprocessor
+        self.pdf_page_concurrency = pdf_page_concurrency
+        self.call_policy = call_policy
+        self.json_mode = json_mode
         
         # Validate API key
         if not api_key or not isinstance(api_key, str):
@@ -25,231 +96,506 @@ class GeminiFormExtractor:
             
         self.logger.info("Initializing Gemini API client")
         self.api_key = api_key
+        self.model_name = model_name
         
+        # The SDK takes about a second to import, so workers only load it
+        # once the first extractor is built
+        import google.generativeai as genai
+
         try:
             # Configure the Gemini API
             genai.configure(api_key=api_key)
-            self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-            self.logger.info("Gemini API client initialized successfully with gemini-1.5-flash model")
+            self.gemini_model = genai.GenerativeModel(model_name)
+            self.logger.info(f"Gemini API client initialized successfully with {model_name} model")
         except Exception as e:
             self.logger.error(f"Failed to initialize Gemini API client: {str(e)}")
             raise
-    
-    def extract_form_data(self, file_path, template_type):
+
+    def check_model(self, timeout=10):
+        """
+        Look up the configured model, confirming the key and network work
+
+        Args:
+            timeout (float): Seconds to wait for the API
+
+        Returns:
+            Model metadata returned by the API
+        """
+        import google.generativeai as genai
+
+        return genai.get_model(f"models/{self.model_name}", request_options={"timeout": timeout})
+
+    def extract_form_data(self, file_path, template_type, request_timeout=None, rate_limiter=None):
         """
         Extract data from a form using Google's Gemini API
         
         Args:
             file_path (str): Path to the uploaded form file
             template_type (str): Type of form template (Biodata, Admission, Bank Account)
+            request_timeout (float, optional): Seconds to wait for the Gemini call
+            rate_limiter (RateLimiter, optional): Acquired before every Gemini
+                call, once per page for PDFs; cache hits don't take a slot
             
         Returns:
             dict: Extracted and mapped form data organized by sections
         """
-        if not os.path.exists(file_path):
-            self.logger.error(f"File not found: {file_path}")
-            raise FileNotFoundError(f"The file {file_path} does not exist")
-        
-        # Validate template type
-        if template_type not in FORM_TEMPLATES:
-            self.logger.error(f"Invalid template type: {template_type}")
-            raise ValueError(f"Invalid template type: {template_type}")
-        
-        self.logger.info(f"Extracting data from {file_path} using template: {template_type}")
+        compiled_template, mime_type, cache_key, cached_data = self._start_extraction(file_path, template_type)
+        if cached_data is not None:
+            return cached_data
         
         try:
-            # Read the form file and encode as base64
-            with open(file_path, "rb") as f:
-                image_bytes = f.read()
+            if mime_type == PDF_MIME_TYPE:
+                extracted_data = self._extract_pdf_pages(file_path, compiled_template, request_timeout, rate_limiter)
+            else:
+                image_bytes, mime_type = self._read_image(file_path, mime_type)
                 
-            self.logger.info(f"File read successfully, size: {len(image_bytes)} bytes")
-            
-            # Get the fields we need to extract from the template
-            template = FORM_TEMPLATES.get(template_type)
-            fields_to_extract = self._get_fields_from_template(template)
+                # Send the image to Gemini for analysis
+                self.logger.info("Sending image to Gemini API for analysis")
+                response = self._analyze_image_with_gemini(
+                    image_bytes, compiled_template.prompt, request_timeout, mime_type, compiled_template.response_schema,
+                    rate_limiter
+                )
+                self.logger.info("Analysis completed successfully")
+                
+                # Parse the Gemini response and map to template fields
+                extracted_data = self._parse_gemini_response(response, compiled_template)
             
-            # Create a prompt that instructs Gemini to extract specific fields
-            prompt = self._create_extraction_prompt(template_type, fields_to_extract)
+            self._finish_extraction(cache_key, template_type, extracted_data)
+            return extracted_data
             
-            # Send the image to Gemini for analysis
-            self.logger.info("Sending image to Gemini API for analysis")
-            response = self._analyze_image_with_gemini(image_bytes, prompt)
-            self.logger.info("Analysis completed successfully")
+        except Exception as e:
+            self.logger.error(f"Error extracting form data: {str(e)}")
+            raise
+    
+    async def extract_form_data_async(self, file_path, template_type, request_timeout=None):
+        """
+        Extract data from a form without blocking the event loop
+        
+        Gemini is called through the SDK's async API, so one event loop can
+        wait on many calls at once. File reads, image preprocessing and cache
+        lookups run on worker threads with their own database sessions.
+        
+        Args:
+            file_path (str): Path to the uploaded form file
+            template_type (str): Type of form template (Biodata, Admission, Bank Account)
+            request_timeout (float, optional): Seconds to wait for the Gemini call
             
-            # Parse the Gemini response and map to template fields
-            extracted_data = self._parse_gemini_response(response, template_type)
-            self.logger.info("Extraction completed successfully")
+        Returns:
+            dict: Extracted and mapped form data organized by sections
+        """
+        # job_queue imports the Flask app; loading it lazily keeps this module
+        # usable on its own, e.g. by the benchmarks
+        from job_queue import run_in_thread
+        
+        compiled_template, mime_type, cache_key, cached_data = await run_in_thread(
+            self._start_extraction, file_path, template_type
+        )
+        if cached_data is not None:
+            return cached_data
+        
+        try:
+            if mime_type == PDF_MIME_TYPE:
+                extracted_data = await self._extract_pdf_pages_async(file_path, compiled_template, request_timeout)
+            else:
+                image_bytes, mime_type = await asyncio.to_thread(self._read_image, file_path, mime_type)
+                response = await self._analyze_image_with_gemini_async(
+                    image_bytes, compiled_template.prompt, request_timeout, mime_type, compiled_template.response_schema
+                )
+                extracted_data = self._parse_gemini_response(response, compiled_template)
             
+            await run_in_thread(self._finish_extraction, cache_key, template_type, extracted_data)
             return extracted_data
             
         except Exception as e:
             self.logger.error(f"Error extracting form data: {str(e)}")
             raise
     
-    def _get_fields_from_template(self, template):
+    def _start_extraction(self, file_path, template_type):
         """
-        Extract all field names from the template structure
+        Validate the request and look up an earlier result for the same file
         
         Args:
-            template (dict): Form template structure
+            file_path (str): Path to the uploaded form file
+            template_type (str): Type of form template
             
         Returns:
-            dict: Dictionary of section names and their fields
+            tuple: (compiled template, detected MIME type, cache key or None, cached data or None)
         """
-        fields_dict = {}
+        if not os.path.exists(file_path):
+            self.logger.error(f"File not found: {file_path}")
+            raise FileNotFoundError(f"The file {file_path} does not exist")
         
-        for section_name, fields in template.items():
-            section_fields = []
-            for field_info in fields:
-                section_fields.append(field_info["field"])
-            fields_dict[section_name] = section_fields
-            
-        return fields_dict
+        # Validate template type; the compiled template carries the prompt and field index
+        try:
+            compiled_template = get_compiled_template(template_type)
+        except ValueError:
+            self.logger.error(f"Invalid template type: {template_type}")
+            raise
+        
+        self.logger.info(f"Extracting data from {file_path} using template: {template_type}")
+        
+        # Detect the real file type instead of trusting the extension
+        mime_type = sniff_file_mime_type(file_path)
+        self.logger.info(f"Detected {mime_type}, size: {os.path.getsize(file_path)} bytes")
+        
+        # Reuse the result of an identical earlier upload if we have one
+        cache_key = None
+        cached_data = None
+        if self.cache is not None:
+            with open(file_path, "rb") as f:
+                file_digest = hashlib.file_digest(f, 'sha256').digest()
+            cache_key = self.cache.make_key(
+                file_digest,
+                template_type,
+                compiled_template.prompt,
+                self.model_name,
+                json.dumps(compiled_template.response_schema, sort_keys=True) if self.json_mode else "",
+                self.preprocessor.fingerprint() if self.preprocessor is not None else ""
+            )
+            cached_data = self.cache.get(cache_key)
+            if cached_data is not None:
+                self.logger.info("Using cached extraction result, skipping Gemini call")
+        
+        return compiled_template, mime_type, cache_key, cached_data
+    
+    def _read_image(self, file_path, mime_type):
+        """
+        Read an image upload, shrinking it first when preprocessing is on
+        
+        Either way only one copy of the image is read into memory.
+        
+        Returns:
+            tuple: (image bytes, MIME type of those bytes)
+        """
+        if self.preprocessor is not None:
+            image_bytes = self.preprocessor.process_file(file_path)
+            return image_bytes, sniff_mime_type(image_bytes[:16])
+        
+        with open(file_path, "rb") as f:
+            return f.read(), mime_type
+    
+    def _finish_extraction(self, cache_key, template_type, extracted_data):
+        self.logger.info("Extraction completed successfully")
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, template_type, extracted_data)
     
-    def _create_extraction_prompt(self, template_type, fields_to_extract):
+    def _extract_pdf_pages(self, file_path, compiled_template, request_timeout=None, rate_limiter=None):
         """
-        Create a prompt for Gemini to extract specific fields from the form
+        Extract a multi-page PDF page by page and merge the results
+        
+        Pages are sent to Gemini concurrently, but only pdf_page_concurrency
+        pages are split out of the document at any time so large PDFs are
+        never held in memory as a whole.
         
         Args:
-            template_type (str): Type of form template
-            fields_to_extract (dict): Dictionary of section names and their fields
+            file_path (str): Path to the PDF file
+            compiled_template (CompiledTemplate): Template with the prompt to send
+            request_timeout (float, optional): Seconds to wait for each Gemini call
+            rate_limiter (RateLimiter, optional): Acquired before each page's Gemini call
             
         Returns:
-            str: Prompt for Gemini
+            dict: Extracted data merged across pages, organized by sections
         """
-        prompt = f"Extract information from this {template_type} form. "
-        prompt += "For each of the following fields, provide the exact value as written in the form. "
-        prompt += "If a field is not found, respond with 'NOT_FOUND' for that field.\n\n"
+        def extract_page(page_bytes):
+            response = self._analyze_image_with_gemini(
+                page_bytes, compiled_template.prompt, request_timeout, PDF_MIME_TYPE, compiled_template.response_schema,
+                rate_limiter
+            )
+            return self._parse_gemini_response(response, compiled_template)
         
-        for section, fields in fields_to_extract.items():
-            prompt += f"Section: {section}\n"
-            for field in fields:
-                prompt += f"- {field}\n"
-            prompt += "\n"
+        page_results = {}
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.pdf_page_concurrency, thread_name_prefix="pdf-page") as pool:
+            for page_number, page_bytes in enumerate(iter_pdf_pages(file_path)):
+                if len(pending) >= self.pdf_page_concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page_results[pending.pop(future)] = future.result()
+                
+                self.logger.info(f"Sending PDF page {page_number + 1} to Gemini API for analysis")
+                pending[pool.submit(extract_page, page_bytes)] = page_number
             
-        prompt += "Format your response as JSON with sections as the top-level keys and field names as nested keys."
-        prompt += "Example format: { 'Section Name': { 'Field Name': 'Value' } }"
+            for future in pending:
+                page_results[pending[future]] = future.result()
+        
+        self.logger.info(f"Analysis of {len(page_results)} PDF pages completed successfully")
+        return self._merge_page_results([page_results[page] for page in sorted(page_results)])
+    
+    async def _extract_pdf_pages_async(self, file_path, compiled_template, request_timeout=None):
+        """
+        Async counterpart of _extract_pdf_pages
+        
+        Pages are split on a worker thread one at a time, and no more than
+        pdf_page_concurrency of them are split out or in flight at once.
+        
+        Returns:
+            dict: Extracted data merged across pages, organized by sections
+        """
+        slots = asyncio.Semaphore(self.pdf_page_concurrency)
+        
+        async def extract_page(page_bytes):
+            try:
+                response = await self._analyze_image_with_gemini_async(
+                    page_bytes, compiled_template.prompt, request_timeout, PDF_MIME_TYPE,
+                    compiled_template.response_schema
+                )
+                return self._parse_gemini_response(response, compiled_template)
+            finally:
+                slots.release()
+        
+        pages = iter_pdf_pages(file_path)
+        tasks = []
+        try:
+            while True:
+                await slots.acquire()
+                page_bytes = await asyncio.to_thread(next, pages, None)
+                if page_bytes is None:
+                    break
+                self.logger.info(f"Sending PDF page {len(tasks) + 1} to Gemini API for analysis")
+                tasks.append(asyncio.ensure_future(extract_page(page_bytes)))
+            page_results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        self.logger.info(f"Analysis of {len(page_results)} PDF pages completed successfully")
+        return self._merge_page_results(page_results)
+    
+    def _merge_page_results(self, page_results):
+        """
+        Combine per-page extractions into one result
+        
+        A field is filled from the first page that has a value for it, so a
+        form split over several pages ends up as one complete record.
         
-        return prompt
+        Args:
+            page_results (list): Extracted data for each page, in page order
+            
+        Returns:
+            dict: Merged data organized by sections
+        """
+        if not page_results:
+            raise ValueError("PDF has no pages")
+        merged = page_results[0]
+        for page_data in page_results[1:]:
+            for section_name, fields in page_data.items():
+                for field_name, value in fields.items():
+                    if value and not merged[section_name].get(field_name):
+                        merged[section_name][field_name] = value
+        return merged
     
-    def _analyze_image_with_gemini(self, image_bytes, prompt):
+    def _analyze_image_with_gemini(self, image_bytes, prompt, request_timeout=None, mime_type="image/jpeg",
+                                   response_schema=None, rate_limiter=None):
         """
         Send the image to Gemini for analysis
         
         Args:
             image_bytes (bytes): Image file bytes
             prompt (str): Instruction prompt for Gemini
+            request_timeout (float, optional): Seconds to wait before giving up,
+                across all retries when a call policy is set
+            mime_type (str): MIME type of the image or document bytes
+            response_schema (dict, optional): Schema the JSON answer must follow,
+                used when JSON mode is on
+            rate_limiter (RateLimiter, optional): Acquired before the call, so
+                waiting for a slot doesn't count against its deadline
             
         Returns:
             str: Gemini's response
         """
-        try:
-            # Create the image parts for the Gemini API
-            image_parts = [
-                {
-                    "mime_type": "image/jpeg",  # Assuming JPEG, adjust if needed
-                    "data": base64.b64encode(image_bytes).decode('utf-8')
-                }
-            ]
-            
-            # Generate content with the image and prompt
-            response = self.gemini_model.generate_content([prompt, *image_parts])
+        contents, generation_config = self._build_request(image_bytes, prompt, mime_type, response_schema)
+        
+        # Generate content with the image and prompt
+        def generate(timeout):
+            request_options = {"timeout": timeout} if timeout else None
+            response = self.gemini_model.generate_content(
+                contents,
+                generation_config=generation_config,
+                request_options=request_options
+            )
             
             # Extract the text response
             return response.text
-            
+        
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        
+        try:
+            with stage_timer('gemini_call'):
+                if self.call_policy is None:
+                    return generate(request_timeout)
+                return self.call_policy.call(generate, deadline=request_timeout)
+        except Exception as e:
+            self.logger.error(f"Error analyzing image with Gemini: {str(e)}")
+            raise
+    
+    async def _analyze_image_with_gemini_async(self, image_bytes, prompt, request_timeout=None,
+                                               mime_type="image/jpeg", response_schema=None):
+        """
+        Async counterpart of _analyze_image_with_gemini, using generate_content_async
+        
+        Returns:
+            str: Gemini's response
+        """
+        contents, generation_config = self._build_request(image_bytes, prompt, mime_type, response_schema)
+        
+        async def generate(timeout):
+            request_options = {"timeout": timeout} if timeout else None
+            response = await self.gemini_model.generate_content_async(
+                contents,
+                generation_config=generation_config,
+                request_options=request_options
+            )
+            return response.text
+        
+        try:
+            with stage_timer('gemini_call'):
+                if self.call_policy is None:
+                    return await generate(request_timeout)
+                return await self.call_policy.call_async(generate, deadline=request_timeout)
         except Exception as e:
             self.logger.error(f"Error analyzing image with Gemini: {str(e)}")
             raise
     
-    def _parse_gemini_response(self, response_text, template_type):
+    def _build_request(self, image_bytes, prompt, mime_type, response_schema):
+        """
+        Returns:
+            tuple: (contents, generation config or None) for generate_content
+        """
+        # Create the image parts for the Gemini API. The SDK takes raw bytes
+        # and handles the wire encoding itself, so no base64 copy is made here.
+        image_parts = [
+            {
+                "mime_type": mime_type,
+                "data": image_bytes
+            }
+        ]
+        
+        # Constrain the answer to the template's schema so it parses as JSON
+        generation_config = None
+        if self.json_mode and response_schema is not None:
+            generation_config = {"response_mime_type": "application/json", "response_schema": response_schema}
+        
+        return [prompt, *image_parts], generation_config
+    
+    @timed('parse_response')
+    def _parse_gemini_response(self, response_text, compiled_template):
         """
         Parse the Gemini response and map to template structure
         
         Args:
             response_text (str): Response from Gemini API
-            template_type (str): Type of form template
+            compiled_template (CompiledTemplate): Template the response should follow
             
         Returns:
             dict: Extracted and mapped form data organized by sections
         """
-        self.logger.info("Parsing Gemini response")
-        self.logger.debug(f"Raw response: {response_text}")
+        payload_logger.info("Raw response: %s", response_text, extra={'route': 'gemini_response'})
         
         # Initialize the result with the template structure (empty values)
-        template = FORM_TEMPLATES.get(template_type)
-        result = {}
+        result = compiled_template.new_result()
         
-        for section_name, fields in template.items():
-            section_data = {}
-            for field_info in fields:
-                field_name = field_info["field"]
-                section_data[field_name] = ""
-            result[section_name] = section_data
+        extracted_data = _decode_json_object(response_text)
+        if extracted_data is None:
+            self.logger.warning("Could not find JSON in Gemini response, reading field lines instead")
+            RESPONSE_PARSES.inc('fallback')
+            return self._extract_with_line_fallback(response_text, result, compiled_template)
         
-        try:
-            # Try to extract JSON from the response
-            import json
-            import re
-            
-            # Look for JSON in the response
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # If no JSON code block, try to find raw JSON
-                json_match = re.search(r'({[\s\S]*})', response_text)
-                if json_match:
-                    json_str = json_match.group(1)
-                else:
-                    self.logger.warning("Could not find JSON in Gemini response")
-                    return result
-            
-            # Parse the JSON
-            extracted_data = json.loads(json_str)
-            
-            # Map the extracted data to our template structure
-            for section_name, fields in result.items():
-                if section_name in extracted_data:
-                    section_data = extracted_data[section_name]
-                    for field_name in fields:
-                        if field_name in section_data:
-                            value = section_data[field_name]
-                            # Don't use NOT_FOUND values
-                            if value != "NOT_FOUND":
-                                result[section_name][field_name] = value
-            
-        except Exception as e:
-            self.logger.error(f"Error parsing Gemini response: {str(e)}")
-            self.logger.debug(f"Response was: {response_text}")
-            
-            # Try regex fallback for key-value extraction
-            self._extract_with_regex_fallback(response_text, result)
+        RESPONSE_PARSES.inc('json')
+        
+        # Map the extracted data to our template structure
+        for section_name, fields in compiled_template.sections:
+            section_data = extracted_data.get(section_name)
+            if isinstance(section_data, dict):
+                for field_name in fields:
+                    if field_name in section_data:
+                        value = section_data[field_name]
+                        # Don't use NOT_FOUND values
+                        if value != "NOT_FOUND":
+                            result[section_name][field_name] = value
         
         return result
     
-    def _extract_with_regex_fallback(self, response_text, result):
+    def _extract_with_line_fallback(self, response_text, result, compiled_template):
         """
-        Fallback method to extract data using regex if JSON parsing fails
+        Fallback that reads "Field Name: value" lines when the response has no JSON
+        
+        The response is scanned once; each line's label is looked up among
+        the template's field names, and the first value found for a field wins.
         
         Args:
             response_text (str): Response from Gemini API
             result (dict): Template structure to populate
+            compiled_template (CompiledTemplate): Template with the field name index
             
         Returns:
             dict: Updated result dictionary
         """
-        self.logger.info("Using regex fallback for extraction")
-        
-        # Look for patterns like "Field Name: Value" in the response
-        for section_name, fields in result.items():
-            for field_name in fields:
-                # Create a pattern that looks for the field name followed by a value
-                pattern = rf"{re.escape(field_name)}:\s*([^\n]+)"
-                match = re.search(pattern, response_text)
-                if match:
-                    value = match.group(1).strip()
-                    if value != "NOT_FOUND":
-                        result[section_name][field_name] = value
-                        
-        return result
\ No newline at end of file
+        for line in response_text.splitlines():
+            # The label ends at the first colon, so times like 10:30 stay in the value
+            label, colon, value = line.partition(':')
+            if not colon:
+                continue
+            
+            targets = compiled_template.response_fields.get(label.strip(_LABEL_TRIM_CHARS))
+            if not targets:
+                continue
+            
+            value = value.strip().rstrip(',').strip(_VALUE_TRIM_CHARS)
+            if not value or value == "NOT_FOUND":
+                continue
+            
+            for section_name, field_name in targets:
+                if not result[section_name][field_name]:
+                    result[section_name][field_name] = value
+        
+        return result
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+def get_form_extractor(api_key, model_name=DEFAULT_MODEL_NAME, cache=None, preprocessor=None, pdf_page_concurrency=4,
+                       call_policy=None, json_mode=True):
+    """
+    Return the extractor shared by every request in this worker process
+    
+    genai.configure() replaces the SDK's global client, so building an
+    extractor per request throws away the open gRPC channel and pays for a
+    new TLS handshake each time. The shared instance is created on first use
+    and only rebuilt when the API key or model name changes.
+    
+    Args:
+        api_key (str): Google Gemini API key
+        model_name (str): Gemini model to use for extraction
+        cache (ExtractionCache, optional): Result cache consulted before calling Gemini
+        preprocessor (ImagePreprocessor, optional): Shrinks images before they are sent
+        pdf_page_concurrency (int): Number of PDF pages extracted in parallel
+        call_policy (ModelCallPolicy, optional): Deadlines, retries, circuit
+            breaker and hedging for each Gemini call
+        json_mode (bool): Ask Gemini for JSON matching the template's response schema
+        
+    Returns:
+        GeminiFormExtractor: Shared extractor instance
+    """
+    global _extractor
+    
+    with _extractor_lock:
+        if _extractor is None or _extractor.api_key != api_key or _extractor.model_name != model_name:
+            _extractor = GeminiFormExtractor(
+                api_key=api_key,
+                cache=cache,
+                model_name=model_name,
+                preprocessor=preprocessor,
+                pdf_page_concurrency=pdf_page_concurrency,
+                call_policy=call_policy,
+                json_mode=json_mode
+            )
+        else:
+            _extractor.cache = cache
+            _extractor.preprocessor = preprocessor
+            _extractor.pdf_page_concurrency = pdf_page_concurrency
+            _extractor.call_policy = call_policy
+            _extractor.json_mode = json_mode
+        return _extractor
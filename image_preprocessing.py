@@ -0,0 +1,220 @@
+import io
+import os
+import time
+import logging
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional, images are sent unmodified without it
+    Image = None
+    ImageOps = None
+
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePreprocessor:
+    """
+    Shrinks scans and photos before they are sent to the model
+
+    Phone photos and PNG scans are often several megabytes, most of which is
+    resolution and colour the model doesn't need to read handwriting. Every
+    step is optional and anything Pillow can't open (e.g. PDFs) is passed
+    through untouched.
+    """
+
+    def __init__(self, max_dimension=2000, jpeg_quality=80, grayscale=True, autocrop=False, deskew=False):
+        """
+        Args:
+            max_dimension (int): Longest side in pixels after downscaling, 0 to keep size
+            jpeg_quality (int): JPEG quality used for re-encoding (1-95)
+            grayscale (bool): Convert to grayscale
+            autocrop (bool): Crop to the bounding box of the form content
+            deskew (bool): Straighten small rotations of the page
+        """
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self.grayscale = grayscale
+        self.autocrop = autocrop
+        self.deskew = deskew
+
+    def fingerprint(self):
+        """
+        Returns:
+            str: The settings that affect the output, for cache keys
+        """
+        return (f"max_dimension={self.max_dimension},jpeg_quality={self.jpeg_quality},grayscale={self.grayscale},"
+                f"autocrop={self.autocrop},deskew={self.deskew}")
+
+    def process(self, image_bytes):
+        """
+        Run the preprocessing pipeline on an uploaded image
+
+        Args:
+            image_bytes (bytes): Original file bytes
+
+        Returns:
+            bytes: JPEG bytes of the processed image, or the original bytes if
+            the file isn't an image or processing wouldn't make it smaller
+        """
+        processed_bytes = self._process(io.BytesIO(image_bytes), len(image_bytes))
+        return image_bytes if processed_bytes is None else processed_bytes
+
+    def process_file(self, file_path):
+        """
+        Run the preprocessing pipeline on an image stored on disk
+
+        Pillow decodes straight from the file, so the original bytes are only
+        read into memory when they end up being sent unchanged.
+
+        Args:
+            file_path (str): Path to the uploaded image
+
+        Returns:
+            bytes: JPEG bytes of the processed image, or the original file bytes
+        """
+        processed_bytes = self._process(file_path, os.path.getsize(file_path))
+        if processed_bytes is None:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        return processed_bytes
+
+    @timed('preprocessing')
+    def _process(self, source, original_length):
+        """
+        Returns:
+            bytes or None: Processed JPEG bytes, or None to keep the original
+        """
+        if Image is None:
+            return None
+
+        started = time.perf_counter()
+
+        try:
+            image = Image.open(source)
+            image.load()
+        except Exception:
+            logger.debug("Upload is not an image Pillow can read, skipping preprocessing")
+            return None
+
+        original_size = image.size
+
+        # Phone cameras store rotation in EXIF instead of rotating the pixels
+        image = ImageOps.exif_transpose(image)
+
+        if self.grayscale:
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        # Downscale first so the remaining steps work on fewer pixels
+        if self.max_dimension and max(image.size) > self.max_dimension:
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+        if self.deskew:
+            image = self._deskew(image)
+
+        if self.autocrop:
+            image = self._crop_to_content(image)
+
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        processed_bytes = output.getvalue()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if len(processed_bytes) >= original_length:
+            logger.info(f"Preprocessing kept original image ({original_length} bytes, {elapsed_ms:.0f} ms)")
+            return None
+
+        saved = original_length - len(processed_bytes)
+        logger.info(
+            f"Preprocessed image {original_size[0]}x{original_size[1]} -> {image.size[0]}x{image.size[1]}: "
+            f"{original_length} -> {len(processed_bytes)} bytes ({saved} saved) in {elapsed_ms:.0f} ms"
+        )
+        return processed_bytes
+
+    def _crop_to_content(self, image, margin=10):
+        """Crop away the empty background around the form"""
+        gray = image if image.mode == 'L' else image.convert('L')
+
+        # Anything noticeably darker than the paper counts as content
+        mask = gray.point(lambda value: 255 if value < 200 else 0)
+        bbox = mask.getbbox()
+        if not bbox:
+            return image
+
+        left, top, right, bottom = bbox
+        return image.crop((
+            max(left - margin, 0),
+            max(top - margin, 0),
+            min(right + margin, image.width),
+            min(bottom + margin, image.height)
+        ))
+
+    def _deskew(self, image, max_angle=5.0, step=0.5):
+        """
+        Rotate the page so text lines are horizontal
+
+        Text rows produce the sharpest horizontal projection profile (rows of
+        ink alternating with blank rows) when the page is level, so the angle
+        with the highest row-mean variance on a small thumbnail wins.
+        """
+        gray = image if image.mode == 'L' else image.convert('L')
+        thumbnail = ImageOps.invert(gray)
+        thumbnail.thumbnail((400, 400))
+
+        best_angle = 0.0
+        best_score = -1.0
+        angle = -max_angle
+        while angle <= max_angle:
+            rotated = thumbnail.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+            row_means = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+            mean = sum(row_means) / len(row_means)
+            score = sum((value - mean) ** 2 for value in row_means)
+            if score > best_score:
+                best_angle, best_score = angle, score
+            angle += step
+
+        if not best_angle:
+            return image
+
+        logger.debug("Deskewing image by %.1f degrees", best_angle)
+        fill = 255 if image.mode == 'L' else (255, 255, 255)
+        return image.rotate(best_angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+
+_preprocessor = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_image_preprocessor(app):
+    """
+    Return the process-wide image preprocessor, or None if it is disabled
+
+    Args:
+        app (Flask): Application whose config drives the pipeline
+
+    Returns:
+        ImagePreprocessor or None: Shared preprocessor instance
+    """
+    global _preprocessor
+
+    if not app.config.get("PREPROCESS_ENABLED", True):
+        return None
+
+    if Image is None:
+        logger.warning("Pillow is not installed, images will be sent without preprocessing")
+        return None
+
+    with _preprocessor_lock:
+        if _preprocessor is None:
+            _preprocessor = ImagePreprocessor(
+                max_dimension=app.config.get("PREPROCESS_MAX_DIMENSION", 2000),
+                jpeg_quality=app.config.get("PREPROCESS_JPEG_QUALITY", 80),
+                grayscale=app.config.get("PREPROCESS_GRAYSCALE", True),
+                autocrop=app.config.get("PREPROCESS_AUTOCROP", False),
+                deskew=app.config.get("PREPROCESS_DESKEW", False)
+            )
+        return _preprocessor
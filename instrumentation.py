@@ -0,0 +1,293 @@
+import time
+import bisect
+import logging
+import threading
+import functools
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the upper buckets cover slow Gemini calls and large exports
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = [*zip(label_names, label_values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in the Prometheus text format"""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with labels, rendered in the Prometheus text format"""
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        # Counts are kept per bucket and summed when rendered, so an
+        # observation is one bisect and three additions
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for upper_bound, bucket_count in zip((*self.buckets, '+Inf'), bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.label_names, label_values, (('le', upper_bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge with labels whose values are read when rendered, in the Prometheus text format"""
+
+    def __init__(self, name, documentation, label_names, collect):
+        """
+        Args:
+            collect (callable): Returns (label values tuple, value) pairs for the current state
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self.collect()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'formdigitizer_request_duration_seconds',
+    'Time spent handling HTTP requests',
+    ('endpoint', 'method', 'status')
+)
+STAGE_SECONDS = Histogram(
+    'formdigitizer_stage_duration_seconds',
+    'Time spent in pipeline stages such as file save, Gemini calls and DB commits',
+    ('stage',)
+)
+STAGE_ERRORS = Counter(
+    'formdigitizer_stage_errors_total',
+    'Pipeline stages that raised an exception',
+    ('stage',)
+)
+
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, STAGE_ERRORS]
+
+
+def register_metric(metric):
+    """
+    Add a metric defined elsewhere to the /metrics output
+
+    Args:
+        metric (Counter, Histogram or Gauge): Metric to expose
+
+    Returns:
+        The metric, so it can be registered where it is defined
+    """
+    METRICS.append(metric)
+    return metric
+
+
+_enabled = False
+_server_timing = False
+
+
+def _record_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage)
+    if _server_timing and has_request_context():
+        g.setdefault('server_timings', []).append((stage, seconds))
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _record_stage(self.stage, time.perf_counter() - self.started)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.stage)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage_timer(stage):
+    """
+    Time a block of code as a pipeline stage
+
+    Args:
+        stage (str): Stage name used as the metric label and Server-Timing entry
+
+    Returns:
+        Context manager; a shared no-op when instrumentation is disabled
+    """
+    return _StageTimer(stage) if _enabled else _NULL_TIMER
+
+
+def timed(stage):
+    """
+    Decorator that times every call of a function as a pipeline stage
+
+    Args:
+        stage (str): Stage name used as the metric label and Server-Timing entry
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _StageTimer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_commit(session):
+    session.info['commit_started'] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop('commit_started', None)
+    if started is not None:
+        _record_stage('db_commit', time.perf_counter() - started)
+
+
+def _after_rollback(session):
+    if session.info.pop('commit_started', None) is not None:
+        STAGE_ERRORS.inc('db_commit')
+
+
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+def _finish_request_timer(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+
+    elapsed = time.perf_counter() - started
+    endpoint = request.url_rule.endpoint if request.url_rule is not None else 'unmatched'
+    REQUEST_SECONDS.observe(elapsed, endpoint, request.method, str(response.status_code))
+
+    if _server_timing:
+        timings = g.pop('server_timings', [])
+        response.headers['Server-Timing'] = ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in (*timings, ('total', elapsed))
+        )
+    return response
+
+
+def init_instrumentation(app):
+    """
+    Turn on request and stage timing according to the app config
+
+    With METRICS_ENABLED off nothing is registered and stage timers are
+    shared no-ops, so instrumented code pays one flag check.
+
+    Args:
+        app (Flask): Application to instrument
+    """
+    global _enabled, _server_timing
+
+    if not app.config.get('METRICS_ENABLED'):
+        return
+
+    _enabled = True
+    _server_timing = bool(app.config.get('SERVER_TIMING_ENABLED'))
+
+    app.before_request(_start_request_timer)
+    app.after_request(_finish_request_timer)
+
+    # Every commit in the app goes through a Session, so time them all there
+    event.listen(Session, 'before_commit', _before_commit)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+
+    logger.info(f"Instrumentation enabled (Server-Timing {'on' if _server_timing else 'off'})")
+
+
+def metrics_enabled():
+    return _enabled
+
+
+def render_metrics():
+    """
+    Render every metric of this process in the Prometheus text format
+
+    Returns:
+        str: Exposition text for a /metrics response
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Worker pools by name, with the config key that sizes each. Batch
+# coordinators get their own, so a few large batches don't take the workers
+# that single extractions and exports need.
+POOL_SIZE_SETTINGS = {
+    'jobs': ('JOB_QUEUE_WORKERS', 4),
+    'batches': ('BATCH_COORDINATORS', 2),
+}
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(app, pool='jobs'):
+    """
+    Return a process-wide worker pool, creating it on first use
+
+    The pool is created lazily so that gunicorn workers each get their own
+    threads after forking instead of inheriting a dead pool from the master.
+
+    Args:
+        app (Flask): Application whose config sizes the pool
+        pool (str): Pool name, a key of POOL_SIZE_SETTINGS
+
+    Returns:
+        ThreadPoolExecutor: Shared background worker pool
+    """
+    with _executor_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            setting, default = POOL_SIZE_SETTINGS[pool]
+            max_workers = app.config.get(setting, default)
+            logger.info(f"Starting background {pool} pool with {max_workers} workers")
+            executor = _executors[pool] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"{pool}-worker"
+            )
+        return executor
+
+
+def submit_job(app, func, *args, pool='jobs', **kwargs):
+    """
+    Run a function on a background worker pool inside an app context
+
+    Args:
+        app (Flask): Application to push a context for
+        func (callable): Job function
+        *args: Positional arguments for the job function
+        pool (str): Worker pool to run on, see POOL_SIZE_SETTINGS
+        **kwargs: Keyword arguments for the job function
+
+    Returns:
+        Future: Future for the submitted job
+    """
+    def run():
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.exception(f"Background job {func.__name__} failed: {str(e)}")
+                raise
+            finally:
+                db.session.remove()
+
+    return get_executor(app, pool).submit(run)
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """
+    Run a blocking function on a worker thread from async code
+
+    When called in an app context, the thread pushes a context of its own,
+    so it gets its own database session and returns the connection to the
+    pool when done instead of holding it while the caller awaits a model
+    call.
+
+    Args:
+        func (callable): Blocking function
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+
+    Returns:
+        The function's return value
+    """
+    if not has_app_context():
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    return await asyncio.to_thread(run)
@@ -0,0 +1,230 @@
+import logging
+import threading
+
+try:
+    import pytesseract
+except ImportError:  # pytesseract is optional, local extraction is unavailable without it
+    pytesseract = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+from template_registry import get_compiled_template
+from document_types import PDF_MIME_TYPE, sniff_file_mime_type
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+def extract_fields_from_text(text, compiled_template):
+    """
+    Apply a template's field regexes to plain form text
+
+    Args:
+        text (str): Text read from the form
+        compiled_template (CompiledTemplate): Template with the compiled field patterns
+
+    Returns:
+        dict: Extracted data organized by sections, "" for fields not found
+    """
+    result = compiled_template.new_result()
+    for (section_name, field_name), pattern in compiled_template.field_patterns.items():
+        match = _best_match(pattern, text)
+        if match:
+            # Many patterns allow whitespace, which in OCR output runs on into
+            # the next line's label, so keep the first line of the match
+            value = match.group(1).strip()
+            result[section_name][field_name] = value.splitlines()[0].strip() if value else value
+    return result
+
+
+def _best_match(pattern, text):
+    """
+    Prefer a match whose label is followed by a colon
+
+    Template patterns make the colon optional, so a label like "State" also
+    matches inside "State Bank of India"; a "State:" match is the real field.
+    """
+    first_match = None
+    for match in pattern.finditer(text):
+        if ':' in text[match.start():match.start(1)]:
+            return match
+        if first_match is None:
+            first_match = match
+    return first_match
+
+
+def count_filled_fields(extracted_data):
+    """
+    Count the fields that have a value
+
+    Args:
+        extracted_data (dict): Extracted data organized by sections
+
+    Returns:
+        tuple: (filled fields, total fields)
+    """
+    filled = total = 0
+    for fields in extracted_data.values():
+        for value in fields.values():
+            total += 1
+            if value:
+                filled += 1
+    return filled, total
+
+
+class LocalOCRExtractor:
+    """
+    Offline extractor: Tesseract OCR plus the template field regexes
+
+    Typed PDFs are read from their text layer with pypdf and skip OCR
+    entirely. Works well on clean typed forms; handwriting is better left
+    to Gemini.
+    """
+
+    def __init__(self, lang='eng', tesseract_cmd=None):
+        """
+        Args:
+            lang (str): Tesseract language code(s), e.g. "eng" or "eng+hin"
+            tesseract_cmd (str, optional): Path to the tesseract binary if it isn't on PATH
+        """
+        if pytesseract is None or Image is None:
+            raise RuntimeError("Local extraction requires the pytesseract and Pillow packages")
+
+        self.lang = lang
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    def extract_form_data(self, file_path, template_type, request_timeout=None):
+        """
+        Extract form data without calling a remote model
+
+        Args:
+            file_path (str): Path to the uploaded form file
+            template_type (str): Type of form template
+            request_timeout (float, optional): Seconds to allow Tesseract per page
+
+        Returns:
+            dict: Extracted data organized by sections
+        """
+        compiled_template = get_compiled_template(template_type)
+        text = self.read_text(file_path, request_timeout)
+        extracted_data = extract_fields_from_text(text, compiled_template)
+
+        filled, total = count_filled_fields(extracted_data)
+        logger.info(f"Local extraction filled {filled}/{total} {template_type} fields from {len(text)} characters")
+        return extracted_data
+
+    @timed('local_ocr')
+    def read_text(self, file_path, request_timeout=None):
+        """
+        Read the text of a form image or PDF
+
+        Args:
+            file_path (str): Path to the uploaded form file
+            request_timeout (float, optional): Seconds to allow Tesseract per page
+
+        Returns:
+            str: Recognized text
+        """
+        if sniff_file_mime_type(file_path) == PDF_MIME_TYPE:
+            try:
+                from pypdf import PdfReader
+            except ImportError:
+                raise RuntimeError("Local extraction of PDFs requires the pypdf package") from None
+            with open(file_path, 'rb') as f:
+                text = "\n".join(page.extract_text() or "" for page in PdfReader(f).pages)
+            if text.strip():
+                return text
+            raise ValueError("PDF has no text layer, scanned PDFs need Gemini extraction")
+
+        with Image.open(file_path) as image:
+            image = ImageOps.exif_transpose(image).convert('L')
+            return pytesseract.image_to_string(image, lang=self.lang, timeout=request_timeout or 0)
+
+
+class LocalFirstExtractor:
+    """
+    Runs local extraction first and only calls Gemini when fields are missing
+
+    Values found locally are kept; Gemini only fills the fields that are
+    still empty. The Gemini extractor is only built once a form needs it,
+    so forms filled locally work without an API key or the Gemini SDK.
+    """
+
+    def __init__(self, local_extractor, get_remote_extractor, min_fill_ratio=1.0):
+        """
+        Args:
+            local_extractor (LocalOCRExtractor): Offline first pass
+            get_remote_extractor (callable): Returns the GeminiFormExtractor
+                that fills missing fields, called only when escalating
+            min_fill_ratio (float): Share of fields the local pass must fill to skip Gemini
+        """
+        self.local_extractor = local_extractor
+        self.get_remote_extractor = get_remote_extractor
+        self.min_fill_ratio = min_fill_ratio
+
+    def extract_form_data(self, file_path, template_type, request_timeout=None, rate_limiter=None):
+        """
+        Extract form data locally, escalating to Gemini for missing fields
+
+        Args:
+            file_path (str): Path to the uploaded form file
+            template_type (str): Type of form template
+            request_timeout (float, optional): Seconds to wait for each engine
+            rate_limiter (RateLimiter, optional): Acquired before every Gemini call
+
+        Returns:
+            dict: Extracted data organized by sections
+        """
+        try:
+            local_data = self.local_extractor.extract_form_data(file_path, template_type, request_timeout)
+        except Exception as e:
+            logger.warning(f"Local extraction failed, escalating to Gemini: {str(e)}")
+            return self.get_remote_extractor().extract_form_data(
+                file_path, template_type, request_timeout=request_timeout, rate_limiter=rate_limiter
+            )
+
+        filled, total = count_filled_fields(local_data)
+        if total and filled / total >= self.min_fill_ratio:
+            logger.info(f"Local extraction filled {filled}/{total} fields, skipping Gemini")
+            return local_data
+
+        logger.info(f"Local extraction filled {filled}/{total} fields, escalating to Gemini for the rest")
+        remote_data = self.get_remote_extractor().extract_form_data(
+            file_path, template_type, request_timeout=request_timeout, rate_limiter=rate_limiter
+        )
+        for section_name, fields in local_data.items():
+            remote_fields = remote_data.get(section_name, {})
+            for field_name, value in fields.items():
+                if not value and remote_fields.get(field_name):
+                    fields[field_name] = remote_fields[field_name]
+        return local_data
+
+
+_local_extractor = None
+_local_extractor_lock = threading.Lock()
+
+
+def get_local_extractor(app):
+    """
+    Return the process-wide local OCR extractor
+
+    Args:
+        app (Flask): Application whose config sets up Tesseract
+
+    Returns:
+        LocalOCRExtractor: Shared extractor instance
+    """
+    global _local_extractor
+
+    with _local_extractor_lock:
+        if _local_extractor is None:
+            _local_extractor = LocalOCRExtractor(
+                lang=app.config.get("LOCAL_OCR_LANG", "eng"),
+                tesseract_cmd=app.config.get("TESSERACT_CMD")
+            )
+        return _local_extractor
@@ -0,0 +1,152 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Logger for verbose payload dumps (form fields, raw responses). They are
+# logged at INFO so they reach production logs, where only a sample of the
+# records per route is kept, see PayloadSamplingFilter
+payload_logger = logging.getLogger('formdigitizer.payload')
+
+LOG_PROFILES = {
+    'development': {
+        'level': 'DEBUG',
+        'format': '%(levelname)s:%(name)s:%(message)s',
+        'payload_sample_rate': 1.0,
+        'use_queue': False,
+    },
+    'production': {
+        'level': 'INFO',
+        'format': '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s',
+        'payload_sample_rate': 0.01,
+        'use_queue': True,
+    },
+}
+
+# Chatty third-party loggers held at WARNING in production
+_QUIET_LOGGERS = ('urllib3', 'PIL', 'google', 'grpc', 'werkzeug')
+
+_configured = False
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class PayloadSamplingFilter(logging.Filter):
+    """
+    Keeps one in every N payload records per route
+
+    The route comes from the record's `route` attribute (pass it with
+    extra={'route': ...}) and defaults to the calling function. Counting
+    instead of drawing random numbers keeps the first record of every route
+    and makes the sampling reproducible.
+    """
+
+    def __init__(self, sample_rate):
+        """
+        Args:
+            sample_rate (float): Share of records to keep, 0 drops all, 1 keeps all
+        """
+        super().__init__()
+        self.sample_every = round(1 / sample_rate) if sample_rate > 0 else 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.sample_every <= 1:
+            return self.sample_every == 1
+
+        route = getattr(record, 'route', record.funcName)
+        with self._lock:
+            count = self._counts.get(route, 0)
+            self._counts[route] = count + 1
+        return count % self.sample_every == 0
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread
+
+    The stock prepare() runs the full Formatter in the logging thread so the
+    record can be pickled. Records here never leave the process, so only the
+    message is merged with its arguments (they could change after the call);
+    timestamps and tracebacks are formatted by the listener.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _start_listener(handler):
+    """Send records through a queue so the request thread never waits on log I/O"""
+    global _listener
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    return _InProcessQueueHandler(log_queue)
+
+
+def _restart_listener_after_fork():
+    # The listener thread doesn't survive fork(), so e.g. gunicorn --preload
+    # workers start their own on the same queue
+    global _listener
+
+    if _listener is not None:
+        _listener = QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def _stop_listener():
+    # Flush whatever is still queued when the process exits
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging(app):
+    """
+    Set up the root logger from the app's logging profile
+
+    LOG_PROFILE picks the defaults: "development" logs DEBUG lines and every
+    payload synchronously to stderr. "production" logs INFO with
+    timestamps, keeps 1% of payload dumps per route and writes through a
+    background queue listener. LOG_LEVEL and LOG_PAYLOAD_SAMPLE_RATE
+    override the profile. Calling this again only updates the levels.
+
+    Args:
+        app (Flask): Application whose config holds the logging settings
+    """
+    global _configured
+
+    profile_name = app.config.get('LOG_PROFILE') or 'development'
+    profile = LOG_PROFILES.get(profile_name)
+    if profile is None:
+        raise ValueError(f"Unknown log profile: {profile_name}")
+
+    level = (app.config.get('LOG_LEVEL') or profile['level']).upper()
+    sample_rate = app.config.get('LOG_PAYLOAD_SAMPLE_RATE')
+    if sample_rate is None:
+        sample_rate = profile['payload_sample_rate']
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    with _listener_lock:
+        if not _configured:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter(profile['format']))
+            root.handlers[:] = [_start_listener(handler) if profile['use_queue'] else handler]
+
+            if profile['use_queue']:
+                os.register_at_fork(after_in_child=_restart_listener_after_fork)
+                atexit.register(_stop_listener)
+            _configured = True
+
+    payload_logger.filters[:] = [PayloadSamplingFilter(sample_rate)]
+
+    if profile_name == 'production':
+        for name in _QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
@@ -1,14 +1,44 @@
 import os
 import logging
+import threading
 from app import app
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Logging is configured in app.py from LOG_PROFILE
 logger = logging.getLogger(__name__)
 
 # Import routes to register them
 from routes import *
 
+# Pick up extraction and export jobs that were queued before this worker started
+from extraction_jobs import resume_pending_jobs
+from batch_extraction import resume_pending_batches
+from export_jobs import resume_pending_exports
+from job_queue import submit_job
+
+_resume_lock = threading.Lock()
+_resumed = False
+
+
+def _resume_pending_work():
+    resume_pending_jobs()
+    resume_pending_batches()
+    resume_pending_exports()
+
+
+@app.before_request
+def resume_pending_work():
+    # Done on the worker's first request and in the background, so booting a
+    # worker neither waits on nor queries the database
+    global _resumed
+
+    if _resumed:
+        return
+    with _resume_lock:
+        if _resumed:
+            return
+        _resumed = True
+    submit_job(app, _resume_pending_work)
+
 # The secret key is already configured in app.py, no need to set it again here
 # which could potentially overwrite the working configuration
 
@@ -0,0 +1,106 @@
+"""background job, batch, draft and extraction cache tables
+
+Revision ID: 0001b_background_tables
+Revises: 0001_initial_schema
+Create Date: 2026-10-18 02:33:35.520496
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001b_background_tables'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() before migrations were added
+    # already have some of these tables, depending on the version that
+    # created them. Those are kept as they are.
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'extraction_cache_entry' not in existing:
+        op.create_table('extraction_cache_entry',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('template_type', sa.String(length=64), nullable=False),
+        sa.Column('result_data', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+        )
+        with op.batch_alter_table('extraction_cache_entry', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_extraction_cache_entry_created_at'), ['created_at'], unique=False)
+            batch_op.create_index(batch_op.f('ix_extraction_cache_entry_expires_at'), ['expires_at'], unique=False)
+
+    if 'extraction_batch' not in existing:
+        op.create_table('extraction_batch',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('template_type', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'extraction_draft' not in existing:
+        op.create_table('extraction_draft',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('template_type', sa.String(length=64), nullable=False),
+        sa.Column('file_name', sa.String(length=256), nullable=False),
+        sa.Column('extracted_data', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('extraction_draft', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_extraction_draft_expires_at'), ['expires_at'], unique=False)
+
+    if 'extraction_job' not in existing:
+        op.create_table('extraction_job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('batch_id', sa.String(length=32), nullable=True),
+        sa.Column('form_id', sa.Integer(), nullable=True),
+        sa.Column('template_type', sa.String(length=64), nullable=False),
+        sa.Column('file_name', sa.String(length=256), nullable=False),
+        sa.Column('file_path', sa.String(length=512), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('result_data', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['batch_id'], ['extraction_batch.id'], ),
+        sa.ForeignKeyConstraint(['form_id'], ['extracted_form.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('extraction_job', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_extraction_job_batch_id'), ['batch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('extraction_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_extraction_job_batch_id'))
+
+    op.drop_table('extraction_job')
+    with op.batch_alter_table('extraction_draft', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_extraction_draft_expires_at'))
+
+    op.drop_table('extraction_draft')
+    op.drop_table('extraction_batch')
+    with op.batch_alter_table('extraction_cache_entry', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_extraction_cache_entry_expires_at'))
+        batch_op.drop_index(batch_op.f('ix_extraction_cache_entry_created_at'))
+
+    op.drop_table('extraction_cache_entry')
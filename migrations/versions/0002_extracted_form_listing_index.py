@@ -0,0 +1,26 @@
+"""composite index for per-user form listings
+
+Revision ID: 0002_form_listing_index
+Revises: 0001b_background_tables
+Create Date: 2026-10-18 02:40:12.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_form_listing_index'
+down_revision = '0001b_background_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('extracted_form', schema=None) as batch_op:
+        batch_op.create_index('ix_extracted_form_user_created', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('extracted_form', schema=None) as batch_op:
+        batch_op.drop_index('ix_extracted_form_user_created')
@@ -0,0 +1,59 @@
+"""store extracted form data as JSONB with a GIN index
+
+Revision ID: 0003_extracted_form_jsonb
+Revises: 0002_form_listing_index
+Create Date: 2026-10-18 03:05:41.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_extracted_form_jsonb'
+down_revision = '0002_form_listing_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        # JSON is stored as text elsewhere, so existing rows carry over unchanged
+        with op.batch_alter_table('extracted_form', schema=None) as batch_op:
+            batch_op.alter_column('extracted_data', existing_type=sa.Text(), type_=sa.JSON(), existing_nullable=False)
+        return
+
+    op.alter_column(
+        'extracted_form',
+        'extracted_data',
+        existing_type=sa.Text(),
+        type_=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using='extracted_data::jsonb'
+    )
+    op.create_index(
+        'ix_extracted_form_data',
+        'extracted_form',
+        ['extracted_data'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'extracted_data': 'jsonb_path_ops'}
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('extracted_form', schema=None) as batch_op:
+            batch_op.alter_column('extracted_data', existing_type=sa.JSON(), type_=sa.Text(), existing_nullable=False)
+        return
+
+    op.drop_index('ix_extracted_form_data', table_name='extracted_form', postgresql_using='gin')
+    op.alter_column(
+        'extracted_form',
+        'extracted_data',
+        existing_type=postgresql.JSONB(),
+        type_=sa.Text(),
+        existing_nullable=False,
+        postgresql_using='extracted_data::text'
+    )
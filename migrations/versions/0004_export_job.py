@@ -0,0 +1,45 @@
+"""background export jobs
+
+Revision ID: 0004_export_job
+Revises: 0003_extracted_form_jsonb
+Create Date: 2026-10-18 03:31:07.264810
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_export_job'
+down_revision = '0003_extracted_form_jsonb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('export_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('max_form_id', sa.Integer(), nullable=True),
+    sa.Column('form_count', sa.Integer(), nullable=False),
+    sa.Column('file_path', sa.String(length=512), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('export_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_export_job_expires_at'), ['expires_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_export_job_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('export_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_export_job_user_id'))
+        batch_op.drop_index(batch_op.f('ix_export_job_expires_at'))
+
+    op.drop_table('export_job')
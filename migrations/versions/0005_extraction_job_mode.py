@@ -0,0 +1,26 @@
+"""per-upload extraction mode
+
+Revision ID: 0005_extraction_job_mode
+Revises: 0004_export_job
+Create Date: 2026-10-18 04:02:55.904316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_extraction_job_mode'
+down_revision = '0004_export_job'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('extraction_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('extraction_mode', sa.String(length=16), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('extraction_job', schema=None) as batch_op:
+        batch_op.drop_column('extraction_mode')
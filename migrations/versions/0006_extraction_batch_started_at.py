@@ -0,0 +1,26 @@
+"""start time of extraction batches
+
+Revision ID: 0006_extraction_batch_started_at
+Revises: 0005_extraction_job_mode
+Create Date: 2026-10-18 05:12:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_extraction_batch_started_at'
+down_revision = '0005_extraction_job_mode'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('extraction_batch', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('extraction_batch', schema=None) as batch_op:
+        batch_op.drop_column('started_at')
@@ -2,6 +2,7 @@ from datetime import datetime
 from app import db, login_manager
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import JSONB
 import json
 
 @login_manager.user_loader
@@ -22,15 +23,97 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
 
 class ExtractedForm(db.Model):
+    __table_args__ = (
+        # Serves the per-user "newest first" listings and their keyset pagination
+        db.Index('ix_extracted_form_user_created', 'user_id', 'created_at', 'id'),
+        # Serves field lookups (extracted_data @> {...}) in form searches, PostgreSQL only
+        db.Index(
+            'ix_extracted_form_data',
+            'extracted_data',
+            postgresql_using='gin',
+            postgresql_ops={'extracted_data': 'jsonb_path_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     template_type = db.Column(db.String(64), nullable=False)  # Biodata, Admission, or Bank Account
     file_name = db.Column(db.String(256), nullable=False)
+    extracted_data = db.Column(db.JSON().with_variant(JSONB, 'postgresql'), nullable=False)  # JSONB on PostgreSQL, JSON text elsewhere
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def set_data(self, data_dict):
+        self.extracted_data = data_dict
+        
+    def get_data(self):
+        return self.extracted_data
+
+class ExtractionBatch(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    template_type = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running or finished
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    jobs = db.relationship('ExtractionJob', backref='batch', lazy='dynamic')
+
+class ExtractionJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    batch_id = db.Column(db.String(32), db.ForeignKey('extraction_batch.id'), index=True)  # Set for batch uploads
+    form_id = db.Column(db.Integer, db.ForeignKey('extracted_form.id', ondelete='SET NULL'))  # Saved form for batch uploads
+    template_type = db.Column(db.String(64), nullable=False)
+    extraction_mode = db.Column(db.String(16))  # gemini, local or local_first; None uses EXTRACTION_BACKEND
+    file_name = db.Column(db.String(256), nullable=False)
+    file_path = db.Column(db.String(512), nullable=False)  # Stored upload awaiting extraction
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, completed or failed
+    result_data = db.Column(db.Text)  # Store as JSON string
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def set_result(self, data_dict):
+        self.result_data = json.dumps(data_dict)
+        
+    def get_result(self):
+        return json.loads(self.result_data) if self.result_data else None
+
+class ExtractionCacheEntry(db.Model):
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of file bytes, template and prompt
+    template_type = db.Column(db.String(64), nullable=False)
+    result_data = db.Column(db.Text, nullable=False)  # Store as JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class ExtractionDraft(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, referenced from the session
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    template_type = db.Column(db.String(64), nullable=False)
+    file_name = db.Column(db.String(256), nullable=False)
     extracted_data = db.Column(db.Text, nullable=False)  # Store as JSON string
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     
     def set_data(self, data_dict):
         self.extracted_data = json.dumps(data_dict)
         
     def get_data(self):
         return json.loads(self.extracted_data)
+
+class ExportJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, completed or failed
+    max_form_id = db.Column(db.Integer)  # Newest form covered, identifies an unchanged export
+    form_count = db.Column(db.Integer, nullable=False, default=0)
+    file_path = db.Column(db.String(512))  # Finished workbook in EXPORT_FOLDER
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, index=True)  # Set when the artifact is written
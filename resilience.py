@@ -0,0 +1,446 @@
+import sys
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from instrumentation import Counter, register_metric
+
+logger = logging.getLogger(__name__)
+
+MODEL_CALLS = register_metric(Counter(
+    'formdigitizer_model_calls_total',
+    'Model call attempts by outcome',
+    ('outcome',)
+))
+MODEL_RETRIES = register_metric(Counter(
+    'formdigitizer_model_retries_total',
+    'Model calls retried after a transient error'
+))
+MODEL_HEDGES = register_metric(Counter(
+    'formdigitizer_model_hedges_total',
+    'Hedged model calls launched, and how many of them answered first',
+    ('result',)
+))
+CIRCUIT_TRANSITIONS = register_metric(Counter(
+    'formdigitizer_circuit_transitions_total',
+    'Circuit breaker state changes',
+    ('circuit', 'state')
+))
+CIRCUIT_REJECTIONS = register_metric(Counter(
+    'formdigitizer_circuit_rejections_total',
+    'Calls failed fast because the circuit was open',
+    ('circuit',)
+))
+
+_TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+_google_transient_errors = None
+
+
+def _get_google_transient_errors():
+    # google.api_core (and grpc with it) is only looked up once the Gemini SDK
+    # has loaded it; until then no Google API error can have been raised
+    global _google_transient_errors
+
+    if _google_transient_errors is None:
+        google_exceptions = sys.modules.get('google.api_core.exceptions')
+        if google_exceptions is None:
+            return ()
+        _google_transient_errors = (
+            google_exceptions.TooManyRequests,
+            google_exceptions.InternalServerError,
+            google_exceptions.BadGateway,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.GatewayTimeout,
+            google_exceptions.DeadlineExceeded,
+        )
+    return _google_transient_errors
+
+
+def is_transient_error(error):
+    """
+    Check whether an error is worth retrying
+
+    Args:
+        error (Exception): Error raised by a model call
+
+    Returns:
+        bool: True for rate limiting, upstream 5xx errors, timeouts and dropped connections
+    """
+    return isinstance(error, _TRANSIENT_ERRORS + _get_google_transient_errors())
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Fails fast once the recent error rate of a dependency crosses a threshold
+
+    Outcomes of the last `window` calls are kept. When at least `min_calls`
+    of them are known and the failure share reaches `failure_rate`, the
+    circuit opens and calls are rejected for `reset_timeout` seconds. After
+    that a single trial call is let through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=10, reset_timeout=30.0):
+        """
+        Args:
+            name (str): Circuit name used in logs and metrics
+            failure_rate (float): Failure share that opens the circuit
+            window (int): Number of recent calls considered
+            min_calls (int): Calls needed in the window before the circuit can open
+            reset_timeout (float): Seconds to stay open before a trial call
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+        log = logger.warning if state == 'open' else logger.info
+        log(f"Circuit {self.name} is now {state}")
+
+    def allow(self):
+        """
+        Returns:
+            bool: True if a call may go ahead now
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return True
+
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._transition('half_open')
+
+            # Half open: only one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """
+        Give up a half-open trial without an outcome, e.g. when the call was cancelled
+
+        The circuit stays half open and the next call becomes the trial.
+        """
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+                self._outcomes.clear()
+                self._transition('closed')
+            else:
+                self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+                self._opened_at = time.monotonic()
+                self._transition('open')
+                return
+
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._opened_at = time.monotonic()
+                self._outcomes.clear()
+                self._transition('open')
+
+
+class ModelCallPolicy:
+    """
+    Deadline, retry, circuit breaker and hedging around one kind of model call
+
+    Every attempt gets its own timeout, capped by what is left of the
+    overall deadline. Transient errors are retried with exponential backoff
+    and full jitter while the deadline allows. With hedge_delay set, an
+    attempt that hasn't answered by then gets a second identical request and
+    the first answer wins. Hedged attempts only run on idle hedge workers,
+    never queued behind others; when none is free the attempt runs on the
+    caller's thread without a hedge, as if hedging were off.
+    """
+
+    def __init__(self, breaker, attempt_timeout=60.0, deadline=180.0, max_attempts=3,
+                 base_delay=1.0, max_delay=20.0, hedge_delay=0.0, hedge_workers=16):
+        """
+        Args:
+            breaker (CircuitBreaker): Breaker shared by every call to the dependency
+            attempt_timeout (float): Seconds allowed per attempt
+            deadline (float): Seconds allowed across all attempts when the caller sets none
+            max_attempts (int): Attempts per call, including the first
+            base_delay (float): Backoff before the first retry, doubled for each later one
+            max_delay (float): Upper bound of the backoff
+            hedge_delay (float): Seconds before a hedged request is sent, 0 disables hedging
+            hedge_workers (int): Threads available to run hedged attempts; calls
+                beyond that run unhedged on their own thread
+        """
+        self.breaker = breaker
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_delay = hedge_delay
+        self._hedge_pool = (
+            ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="model-hedge") if hedge_delay else None
+        )
+        # Idle workers of the hedge pool
+        self._hedge_slots = threading.Semaphore(hedge_workers)
+
+    def call(self, func, deadline=None):
+        """
+        Run a model call under the policy
+
+        Args:
+            func (callable): Takes the attempt timeout in seconds and returns the result
+            deadline (float, optional): Seconds allowed across all attempts,
+                defaults to the policy's deadline
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            Exception: The last error once attempts or time run out
+        """
+        give_up_at = time.monotonic() + (deadline or self.deadline)
+
+        for attempt in range(1, self.max_attempts + 1):
+            timeout = self._start_attempt(give_up_at)
+            try:
+                result = self._attempt(func, timeout)
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt, give_up_at))
+                continue
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+
+            self._record_success()
+            return result
+
+    async def call_async(self, func, deadline=None):
+        """
+        Run a model call under the policy without blocking the event loop
+
+        Same limits as call(), sharing the circuit breaker. Each attempt is
+        also cancelled once its timeout passes, and a hedged request
+        cancels the slower one when it completes.
+
+        Args:
+            func (callable): Coroutine function taking the attempt timeout in seconds
+            deadline (float, optional): Seconds allowed across all attempts,
+                defaults to the policy's deadline
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            Exception: The last error once attempts or time run out
+        """
+        give_up_at = time.monotonic() + (deadline or self.deadline)
+
+        for attempt in range(1, self.max_attempts + 1):
+            timeout = self._start_attempt(give_up_at)
+            try:
+                result = await self._attempt_async(func, timeout)
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, give_up_at))
+                continue
+            except BaseException:
+                # Cancelled (a sibling PDF page failed, the client went away):
+                # no outcome, but a half-open trial must not stay taken
+                self.breaker.release_trial()
+                raise
+
+            self._record_success()
+            return result
+
+    def _start_attempt(self, give_up_at):
+        """
+        Returns:
+            float: Timeout for the next attempt
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.breaker.allow():
+            CIRCUIT_REJECTIONS.inc(self.breaker.name)
+            raise CircuitOpenError(f"{self.breaker.name} is unavailable, circuit breaker is open")
+        return min(self.attempt_timeout, max(give_up_at - time.monotonic(), 0.001))
+
+    def _record_success(self):
+        MODEL_CALLS.inc('success')
+        self.breaker.record_success()
+
+    def _retry_delay(self, error, attempt, give_up_at):
+        """
+        Record a failed attempt and decide whether to try again
+
+        Returns:
+            float: Backoff in seconds before the next attempt
+
+        Raises:
+            Exception: The error itself when it is not retried
+        """
+        transient = is_transient_error(error)
+        MODEL_CALLS.inc('transient_error' if transient else 'error')
+        if not transient:
+            # The request itself was bad (e.g. an unreadable image), the upstream is fine
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if attempt == self.max_attempts or time.monotonic() + delay >= give_up_at:
+            raise error
+
+        logger.warning(f"{self.breaker.name} attempt {attempt} failed ({type(error).__name__}: {str(error)}), "
+                       f"retrying in {delay:.2f}s")
+        MODEL_RETRIES.inc()
+        return delay
+
+    def _submit_to_idle_worker(self, func, timeout):
+        """
+        Returns:
+            Future: func(timeout) running on an idle hedge worker, or None
+                when every worker is busy
+        """
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                return func(timeout)
+            finally:
+                self._hedge_slots.release()
+
+        try:
+            return self._hedge_pool.submit(run)
+        except BaseException:
+            self._hedge_slots.release()
+            raise
+
+    def _attempt(self, func, timeout):
+        if self._hedge_pool is None or self.hedge_delay >= timeout:
+            return func(timeout)
+
+        # A pool that is busy means the upstream is under load already, so
+        # the attempt runs here unhedged rather than waiting for a worker
+        started = time.monotonic()
+        primary = self._submit_to_idle_worker(func, timeout)
+        if primary is None:
+            return func(timeout)
+
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        # The slow request can't be cancelled, it ends at its own timeout
+        pending = {primary}
+        hedge = self._submit_to_idle_worker(func, max(timeout - self.hedge_delay, 0.001))
+        if hedge is not None:
+            MODEL_HEDGES.inc('launched')
+            pending.add(hedge)
+        error = None
+        while pending:
+            remaining = started + timeout - time.monotonic()
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"Model call did not answer within {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        MODEL_HEDGES.inc('won')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _attempt_async(self, func, timeout):
+        if not self.hedge_delay or self.hedge_delay >= timeout:
+            return await asyncio.wait_for(func(timeout), timeout)
+
+        primary = asyncio.ensure_future(asyncio.wait_for(func(timeout), timeout))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done:
+                return primary.result()
+
+            MODEL_HEDGES.inc('launched')
+            hedge_timeout = max(timeout - self.hedge_delay, 0.001)
+            hedge = asyncio.ensure_future(asyncio.wait_for(func(hedge_timeout), hedge_timeout))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            MODEL_HEDGES.inc('won')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Unlike a thread, the slower request can be cancelled here
+            for task in pending:
+                task.cancel()
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_model_call_policy(app):
+    """
+    Return the process-wide policy for Gemini calls
+
+    Args:
+        app (Flask): Application whose config sets the limits
+
+    Returns:
+        ModelCallPolicy: Shared policy, so every request feeds the same circuit breaker
+    """
+    global _policy
+
+    with _policy_lock:
+        if _policy is None:
+            breaker = CircuitBreaker(
+                'gemini',
+                failure_rate=app.config['CIRCUIT_FAILURE_RATE'],
+                window=app.config['CIRCUIT_WINDOW'],
+                min_calls=app.config['CIRCUIT_MIN_CALLS'],
+                reset_timeout=app.config['CIRCUIT_RESET_TIMEOUT']
+            )
+            _policy = ModelCallPolicy(
+                breaker,
+                attempt_timeout=app.config['GEMINI_ATTEMPT_TIMEOUT'],
+                deadline=app.config['GEMINI_DEADLINE'],
+                max_attempts=app.config['GEMINI_MAX_ATTEMPTS'],
+                base_delay=app.config['GEMINI_RETRY_BASE_DELAY'],
+                max_delay=app.config['GEMINI_RETRY_MAX_DELAY'],
+                hedge_delay=app.config['GEMINI_HEDGE_DELAY']
+            )
+        return _policy
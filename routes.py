@@ -1,18 +1,29 @@
 import os
 import logging
 import json
-import base64
 from datetime import datetime
-from flask import render_template, url_for, flash, redirect, request, jsonify, session
+from flask import render_template, url_for, flash, redirect, request, jsonify, session, send_file, abort, Response
 from flask_login import login_user, logout_user, current_user, login_required
 from werkzeug.utils import secure_filename
 from flask_wtf.csrf import generate_csrf
 from app import app, db
-from models import User, ExtractedForm
-from forms import LoginForm, RegistrationForm, TemplateSelectionForm, FormUploadForm
-from gemini_form_extractor import GeminiFormExtractor
+from models import User, ExtractedForm, ExtractionBatch, ExtractionJob, ExportJob
+from forms import LoginForm, RegistrationForm, TemplateSelectionForm, FormUploadForm, BatchUploadForm
+from extraction_jobs import new_job_id, get_job_upload_path, enqueue_extraction_job
+from extraction_cache import get_extraction_cache
+from batch_extraction import create_batch
+from upload_storage import save_data_url, has_camera_upload
+from document_types import EXCEL_MIME_TYPE
+from draft_store import save_draft, load_draft, delete_draft
+from bulk_save import parse_bulk_forms, bulk_insert_forms
+from database import use_replica, reads_from_replica
+from form_listing import list_user_forms, count_user_forms, search_user_forms
+from export_jobs import request_export
 from form_templates import FORM_TEMPLATES
-import tempfile
+from form_normalizer import normalize_form_data
+from extraction_backends import get_extraction_backend, UPLOAD_BACKENDS
+from instrumentation import stage_timer, metrics_enabled, render_metrics, PROMETHEUS_CONTENT_TYPE
+from logging_config import payload_logger
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -22,6 +33,11 @@ logger = logging.getLogger(__name__)
 def inject_csrf_token():
     return dict(csrf_token=generate_csrf())
 
+@app.errorhandler(413)
+def upload_too_large(error):
+    flash('The uploaded file is too large.', 'danger')
+    return redirect(request.url)
+
 @app.route('/')
 @app.route('/index')
 def index():
@@ -74,10 +90,16 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@reads_from_replica
 def dashboard():
-    # Get all the user's extracted forms, ordered by newest first
-    extracted_forms = ExtractedForm.query.filter_by(user_id=current_user.id).order_by(ExtractedForm.created_at.desc()).all()
-    return render_template('dashboard.html', title='Dashboard', extracted_forms=extracted_forms)
+    # Only the five most recent forms are shown, so only those are loaded
+    extracted_forms, _ = list_user_forms(current_user.id, limit=5)
+    return render_template(
+        'dashboard.html',
+        title='Dashboard',
+        extracted_forms=extracted_forms,
+        form_count=count_user_forms(current_user.id)
+    )
 
 @app.route('/template-selection', methods=['GET', 'POST'])
 @login_required
@@ -99,112 +121,224 @@ def form_upload():
         return redirect(url_for('template_selection'))
     
     selected_template = session['selected_template']
+    
+    # Enforce the upload limit before werkzeug starts buffering the body
+    request.max_content_length = app.config['MAX_UPLOAD_SIZE']
+    request.max_form_memory_size = app.config['MAX_UPLOAD_SIZE']
     form = FormUploadForm()
     
-    if form.validate_on_submit() or ('camera_image' in request.form and request.form['camera_image']):
-        temp_dir = tempfile.mkdtemp()
+    if form.validate_on_submit() or has_camera_upload(request):
+        job_id = new_job_id()
         temp_path = ""
         filename = ""
         
         try:
             # Check if we received camera data or file upload
-            if 'camera_image' in request.form and request.form['camera_image']:
+            if has_camera_upload(request):
                 try:
-                    # Handle camera image (base64 encoded)
-                    camera_data = request.form['camera_image']
-                    
-                    # Log data length for debugging
-                    logger.debug(f"Received camera data length: {len(camera_data)}")
-                    
-                    # Remove the data URL prefix if present (e.g., "data:image/jpeg;base64,")
-                    if ',' in camera_data:
-                        logger.debug("Data URL prefix detected, splitting at comma")
-                        camera_data = camera_data.split(',', 1)[1]
-                    else:
-                        logger.debug("No data URL prefix detected")
-                    
-                    # Log data after prefix is removed
-                    logger.debug(f"Camera data length after prefix removal: {len(camera_data)}")
-                    
-                    # Decode base64 data
-                    try:
-                        image_data = base64.b64decode(camera_data)
-                        logger.debug(f"Successfully decoded base64 data, length: {len(image_data)} bytes")
-                    except Exception as decode_error:
-                        logger.error(f"Error decoding base64 data: {str(decode_error)}")
-                        raise
-                    
-                    # Save to temp file
                     filename = f"camera_capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                    temp_path = os.path.join(temp_dir, filename)
+                    temp_path = get_job_upload_path(job_id, filename)
                     
-                    with open(temp_path, 'wb') as f:
-                        f.write(image_data)
+                    camera_file = request.files.get('camera_file')
+                    with stage_timer('file_save'):
+                        if camera_file and camera_file.filename:
+                            # Captures sent as a file part are already spooled by werkzeug
+                            camera_file.save(temp_path)
+                        else:
+                            # Older browsers post the capture as a base64 data URL
+                            logger.debug("Received camera data length: %d", len(request.form['camera_image']))
+                            save_data_url(request.form['camera_image'], temp_path)
                     
-                    logger.debug(f"Saved camera capture to {temp_path}")
+                    logger.debug("Saved camera capture to %s", temp_path)
                 except Exception as camera_error:
                     logger.error(f"Error processing camera image: {str(camera_error)}")
                     flash(f"Error processing camera image: {str(camera_error)}", 'danger')
+                    if temp_path and os.path.exists(temp_path):
+                        os.remove(temp_path)
                     return render_template('form_upload.html', title='Upload Form', form=form, template=selected_template)
                 
             elif form.form_file.data:
                 # Handle regular file upload
                 uploaded_file = form.form_file.data
                 filename = secure_filename(uploaded_file.filename)
-                temp_path = os.path.join(temp_dir, filename)
-                uploaded_file.save(temp_path)
-                logger.debug(f"Saved uploaded file to {temp_path}")
+                temp_path = get_job_upload_path(job_id, filename)
+                with stage_timer('file_save'):
+                    uploaded_file.save(temp_path)
+                logger.debug("Saved uploaded file to %s", temp_path)
             else:
                 flash('No file or camera image provided', 'danger')
                 return render_template('form_upload.html', title='Upload Form', form=form, template=selected_template)
             
-            # Extract data using Google Gemini API
-            api_key = app.config['GOOGLE_API_KEY']
-            
-            logger.debug(f"Using Google Gemini API for extraction")
-            logger.debug(f"API key length: {len(api_key) if api_key else 0}")
-            
-            extractor = GeminiFormExtractor(api_key=api_key)
-            
-            extracted_data = extractor.extract_form_data(temp_path, selected_template)
-            
-            # Store extracted data in session to be used in review page
-            session['extracted_data'] = extracted_data
-            session['uploaded_filename'] = filename
+            # Queue the extraction so this worker is free while the model runs
+            extraction_mode = form.extraction_mode.data if form.extraction_mode.data in UPLOAD_BACKENDS else None
+            enqueue_extraction_job(job_id, current_user.id, selected_template, filename, temp_path, extraction_mode)
             
-            flash('Form data extracted successfully!', 'success')
-            return redirect(url_for('review_data'))
+            return redirect(url_for('extraction_status', job_id=job_id))
             
         except Exception as e:
-            logger.error(f"Error extracting form data: {str(e)}")
+            logger.error(f"Error queueing form extraction: {str(e)}")
             flash(f'Error extracting form data: {str(e)}', 'danger')
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_path):
+            
+            # Clean up the stored upload since no job will consume it
+            if temp_path and os.path.exists(temp_path):
                 os.remove(temp_path)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
     
     return render_template('form_upload.html', title='Upload Form', form=form, template=selected_template)
 
+def _get_user_extraction_job(job_id):
+    """Load an extraction job, returning None if it doesn't belong to the current user"""
+    job = db.session.get(ExtractionJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        return None
+    return job
+
+@app.route('/extraction-status/<job_id>')
+@login_required
+def extraction_status(job_id):
+    job = _get_user_extraction_job(job_id)
+    if job is None:
+        flash('Extraction job not found.', 'danger')
+        return redirect(url_for('template_selection'))
+    
+    if job.status == 'completed':
+        # Hand the result over to the review page via a server-side draft
+        # stored under the job's id, so refreshing this page or coming back
+        # to it reopens the same draft. The job keeps no copy of the result.
+        if job.result_data is not None:
+            save_draft(current_user.id, job.template_type, job.file_name, job.get_result(), draft_id=job.id)
+            job.result_data = None
+            db.session.commit()
+        elif load_draft(job.id, current_user.id) is None:
+            flash('This extraction has already been reviewed.', 'info')
+            return redirect(url_for('view_saved_forms'))
+        
+        session['draft_id'] = job.id
+        session['selected_template'] = job.template_type
+        
+        flash('Form data extracted successfully!', 'success')
+        return redirect(url_for('review_data'))
+    
+    if job.status == 'failed':
+        flash(f'Error extracting form data: {job.error}', 'danger')
+        return redirect(url_for('form_upload'))
+    
+    return render_template('extraction_status.html', title='Extracting Data', job=job)
+
+@app.route('/api/extraction-jobs/<job_id>')
+@login_required
+def extraction_job_api(job_id):
+    job = _get_user_extraction_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Extraction job not found'}), 404
+    
+    return jsonify({
+        'jobId': job.id,
+        'status': job.status,
+        'templateType': job.template_type,
+        'fileName': job.file_name,
+        'error': job.error,
+        'statusUrl': url_for('extraction_status', job_id=job.id)
+    })
+
+@app.route('/api/extraction-cache/stats')
+@login_required
+def extraction_cache_stats():
+    cache = get_extraction_cache(app)
+    if cache is None:
+        return jsonify({'enabled': False})
+    
+    return jsonify({'enabled': True, **cache.stats()})
+
+@app.route('/api/extraction-backend/health')
+@login_required
+def extraction_backend_health():
+    health = get_extraction_backend(app).health_check()
+    return jsonify(health), 200 if health['healthy'] else 503
+
+@app.route('/metrics')
+def metrics():
+    # Scraped by Prometheus, which can't log in, so an optional bearer token guards it instead
+    if not metrics_enabled():
+        abort(404)
+
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        abort(401)
+
+    return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/batch-upload', methods=['GET', 'POST'])
+@login_required
+def batch_upload():
+    request.max_content_length = app.config['BATCH_MAX_UPLOAD_SIZE']
+    form = BatchUploadForm()
+    
+    if form.validate_on_submit():
+        try:
+            batch = create_batch(current_user.id, form.template.data, form.form_files.data)
+        except Exception as e:
+            logger.error(f"Error creating extraction batch: {str(e)}")
+            flash(f'Error uploading batch: {str(e)}', 'danger')
+            return render_template('batch_upload.html', title='Batch Upload', form=form)
+        
+        if batch is None:
+            flash('No supported form files were found in the upload.', 'warning')
+            return render_template('batch_upload.html', title='Batch Upload', form=form)
+        
+        flash(f'{batch.total} forms queued for extraction.', 'success')
+        return redirect(url_for('batch_status', batch_id=batch.id))
+    
+    return render_template('batch_upload.html', title='Batch Upload', form=form)
+
+def _get_user_batch(batch_id):
+    """Load an extraction batch, returning None if it doesn't belong to the current user"""
+    batch = db.session.get(ExtractionBatch, batch_id)
+    if batch is None or batch.user_id != current_user.id:
+        return None
+    return batch
+
+@app.route('/batch-status/<batch_id>')
+@login_required
+def batch_status(batch_id):
+    batch = _get_user_batch(batch_id)
+    if batch is None:
+        flash('Batch not found.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    jobs = batch.jobs.order_by(ExtractionJob.file_name).all()
+    return render_template('batch_status.html', title='Batch Progress', batch=batch, jobs=jobs)
+
+@app.route('/api/batches/<batch_id>')
+@login_required
+def batch_api(batch_id):
+    batch = _get_user_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    
+    return jsonify({
+        'batchId': batch.id,
+        'status': batch.status,
+        'templateType': batch.template_type,
+        'total': batch.total,
+        'completed': batch.completed,
+        'failed': batch.failed
+    })
+
 @app.route('/review-data', methods=['GET', 'POST'])
 @login_required
 def review_data():
-    # Check if extracted data is available in session
-    if 'extracted_data' not in session or 'selected_template' not in session:
+    # Check if extracted data is waiting for review
+    draft = load_draft(session.get('draft_id'), current_user.id)
+    if draft is None:
+        session.pop('draft_id', None)
         flash('No extracted data to review. Please upload a form first.', 'warning')
         return redirect(url_for('template_selection'))
     
-    # Get the template structure for the selected template
-    template_type = session['selected_template']
+    # Get the template structure for the draft's template
+    template_type = draft.template_type
     template = FORM_TEMPLATES.get(template_type, {})
     
     if request.method == 'POST':
-        # Debug: Log all form data received
-        logger.debug("FORM DATA RECEIVED:")
-        for key, value in request.form.items():
-            logger.debug(f"  {key}: {value}")
-            
         # Get the updated form data from the submitted form
         updated_data = {}
         
@@ -228,51 +362,49 @@ def review_data():
                     alternate_field_id = f"{section_name} {field_name}"
                     field_value = request.form.get(alternate_field_id, "")
                     if field_value:
-                        logger.debug(f"Found value using alternate ID: {alternate_field_id}")
-                
-                # Debug this specific field
-                logger.debug(f"Field: {field_id}, Value from form: '{field_value}'")
+                        logger.debug("Found value using alternate ID: %s", alternate_field_id)
                 
                 # Store the form value 
                 section_data[field_name] = field_value
                 
             updated_data[section_name] = section_data
             
-        # Log data before saving
-        logger.debug(f"Saving updated form data: {updated_data}")
+        # Log data before saving (sampled, the payload covers every field)
+        payload_logger.info("Saving updated form data: %s", updated_data, extra={'route': 'review_data'})
         
         # Save the extracted form data to the database
         extracted_form = ExtractedForm(
             user_id=current_user.id,
-            template_type=session['selected_template'],
-            file_name=session['uploaded_filename']
+            template_type=draft.template_type,
+            file_name=draft.file_name
         )
         extracted_form.set_data(updated_data)
         
         db.session.add(extracted_form)
         db.session.commit()
         
-        # Clear the session data
-        session.pop('extracted_data', None)
+        # Clear the draft and session data
+        delete_draft(draft.id)
+        session.pop('draft_id', None)
         session.pop('selected_template', None)
-        session.pop('uploaded_filename', None)
         
         flash('Form data saved successfully!', 'success')
         return redirect(url_for('dashboard'))
     
     # For GET requests, pass the template data to the template
-    extracted_data = session['extracted_data']
-    logger.debug(f"Displaying data for review: {extracted_data}")
+    extracted_data = draft.get_data()
+    payload_logger.info("Displaying data for review: %s", extracted_data, extra={'route': 'review_data'})
     
     return render_template(
         'review_data.html', 
         title='Review Data', 
-        template_type=session['selected_template'],
+        template_type=draft.template_type,
         extracted_data=extracted_data
     )
 
 @app.route('/view-form/<int:form_id>')
 @login_required
+@reads_from_replica
 def view_form(form_id):
     # Get the form data from the database
     extracted_form = ExtractedForm.query.get_or_404(form_id)
@@ -282,35 +414,8 @@ def view_form(form_id):
         flash('You do not have permission to view this form.', 'danger')
         return redirect(url_for('dashboard'))
     
-    # Get form data and ensure it's in the proper format for the template
-    form_data = extracted_form.get_data()
-    
-    # Log form data for debugging
-    logger.debug(f"Original form data retrieved: {form_data}")
-    
-    # Ensure all sections are dictionaries for consistency
-    # Add missing fields from template if not present
-    template_type = extracted_form.template_type
-    template = FORM_TEMPLATES.get(template_type, {})
-    
-    # Create a complete form structure with empty values if fields are missing
-    complete_form_data = {}
-    
-    for section_name, fields_info in template.items():
-        section_data = {}
-        # Initialize with empty data for all fields from template
-        for field_info in fields_info:
-            field_name = field_info["field"]
-            section_data[field_name] = ""
-            
-        # If section exists in saved data, use those values
-        if section_name in form_data and isinstance(form_data[section_name], dict):
-            for field_name, value in form_data[section_name].items():
-                section_data[field_name] = value
-                
-        complete_form_data[section_name] = section_data
-    
-    logger.debug(f"Complete form data with template fields: {complete_form_data}")
+    # Fill in every template field, overlaying the saved values
+    complete_form_data = normalize_form_data(extracted_form.template_type, extracted_form.get_data())
     
     return render_template(
         'review_data.html', 
@@ -323,6 +428,7 @@ def view_form(form_id):
 
 @app.route('/export-form/<int:form_id>/<format>')
 @login_required
+@reads_from_replica
 def export_form(form_id, format):
     # Get the form data from the database
     extracted_form = ExtractedForm.query.get_or_404(form_id)
@@ -332,50 +438,10 @@ def export_form(form_id, format):
         flash('You do not have permission to export this form.', 'danger')
         return redirect(url_for('dashboard'))
     
-    # For debugging: Print raw data from database
-    raw_data = extracted_form.extracted_data
-    logger.debug(f"Raw data from DB: {raw_data}")
-    
-    # Get the form data
-    form_data = extracted_form.get_data()
-    logger.debug(f"Parsed JSON data: {form_data}")
-    
     template_type = extracted_form.template_type
-    logger.debug(f"Template type: {template_type}")
-    
-    # Ensure all sections are dictionaries for consistency
-    # Add missing fields from template if not present
-    template = FORM_TEMPLATES.get(template_type, {})
     
-    # Create a complete form structure with empty values if fields are missing
-    complete_form_data = {}
-    
-    # Debug: Log template structure
-    logger.debug(f"Template structure: {template.keys()}")
-    
-    for section_name, fields_info in template.items():
-        section_data = {}
-        logger.debug(f"Processing section: {section_name} with {len(fields_info)} fields")
-        
-        # Initialize with empty data for all fields from template
-        for field_info in fields_info:
-            field_name = field_info["field"]
-            section_data[field_name] = ""
-            logger.debug(f"Initialized field: {field_name}")
-            
-        # If section exists in saved data, use those values
-        if section_name in form_data and isinstance(form_data[section_name], dict):
-            logger.debug(f"Found section {section_name} in form data with {len(form_data[section_name])} fields")
-            for field_name, value in form_data[section_name].items():
-                section_data[field_name] = value
-                logger.debug(f"Set field {field_name} = '{value}'")
-        else:
-            logger.debug(f"Section {section_name} not found in form data or not a dictionary")
-                
-        complete_form_data[section_name] = section_data
-    
-    # Final debug: Log complete data being sent
-    logger.debug(f"Complete data being sent: {complete_form_data}")
+    # Fill in every template field, overlaying the saved values
+    complete_form_data = normalize_form_data(template_type, extracted_form.get_data())
     
     # Return the data to be handled by client-side export functions
     if format == 'json':
@@ -386,10 +452,6 @@ def export_form(form_id, format):
             'fileName': extracted_form.file_name,
             'extractedData': complete_form_data
         }
-        logger.debug(f"JSON response keys: {data.keys()}")
-        logger.debug(f"JSON extractedData sections: {data['extractedData'].keys()}")
-        logger.debug(f"Sample data from first section: {list(data['extractedData'].values())[0] if data['extractedData'] else 'No data'}")
-        
         return jsonify(data)
     elif format == 'excel':
         # Server-side Excel generation
@@ -398,13 +460,7 @@ def export_form(form_id, format):
         import openpyxl
         from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
         
-        # Debugging information
-        logger.debug(f"Generating Excel for form {form_id} - Template: {template_type}")
-        logger.debug(f"Number of sections: {len(complete_form_data)}")
-        for section_name, fields in complete_form_data.items():
-            logger.debug(f"Section {section_name} has {len(fields)} fields")
-            for field, value in fields.items():
-                logger.debug(f"  {field}: {value}")
+        logger.debug("Generating Excel for form %s - Template: %s", form_id, template_type)
         
         # Create an in-memory output file
         output = io.BytesIO()
@@ -510,7 +566,7 @@ def export_form(form_id, format):
                 section_sheet.column_dimensions['A'].width = 30
                 section_sheet.column_dimensions['B'].width = 50
                 
-                logger.debug(f"Added sheet {safe_section_name} with {len(fields)} fields")
+                logger.debug("Added sheet %s with %d fields", safe_section_name, len(fields))
             except Exception as e:
                 logger.error(f"Error creating sheet {safe_section_name}: {str(e)}")
                 # Continue with next section on error
@@ -604,83 +660,29 @@ def export_all_forms(format):
     """
     logger.debug("Starting export-all-forms")
     
-    # Get all the user's extracted forms
-    extracted_forms = ExtractedForm.query.filter_by(user_id=current_user.id).order_by(ExtractedForm.created_at.desc()).all()
-    logger.debug(f"Found {len(extracted_forms)} forms to export")
-    
-    if not extracted_forms:
+    if not count_user_forms(current_user.id):
         flash('No forms to export.', 'warning')
         return redirect(url_for('dashboard'))
     
-    # Group forms by template type
-    forms_by_template = {}
-    
-    for form in extracted_forms:
-        template_type = form.template_type
-        logger.debug(f"Processing form ID: {form.id}, Template: {template_type}, File: {form.file_name}")
-        
-        # Initialize entry for this template type if it doesn't exist
-        if template_type not in forms_by_template:
-            forms_by_template[template_type] = []
-            logger.debug(f"Created new template group: {template_type}")
-            
-        # Get raw form data for debugging
-        raw_data = form.extracted_data
-        logger.debug(f"Raw data from DB for form {form.id}: {raw_data[:100]}...")
-            
-        # Get form data
-        form_data = form.get_data()
-        logger.debug(f"Parsed JSON data for form {form.id}: {str(form_data)[:200]}...")
-        
-        # Ensure form data follows the template structure
-        template = FORM_TEMPLATES.get(template_type, {})
-        logger.debug(f"Template sections for {template_type}: {template.keys()}")
-        
-        complete_form_data = {}
-        
-        # Process each section
-        for section_name, fields_info in template.items():
-            section_data = {}
-            logger.debug(f"Processing section: {section_name} with {len(fields_info)} fields")
-            
-            # Initialize with empty data for all fields from template
-            for field_info in fields_info:
-                field_name = field_info["field"]
-                section_data[field_name] = ""
-                
-            # If section exists in saved data, use those values
-            if section_name in form_data and isinstance(form_data[section_name], dict):
-                logger.debug(f"Found section {section_name} in form data with {len(form_data[section_name])} fields")
-                for field_name, value in form_data[section_name].items():
-                    section_data[field_name] = value
-                    logger.debug(f"Set field {field_name} = '{value}'")
-            else:
-                logger.debug(f"Section {section_name} not found in form data or not a dictionary")
-                    
-            complete_form_data[section_name] = section_data
-            
-        # Verify data is correctly populated
-        logger.debug(f"Processed form {form.id} has {len(complete_form_data)} sections")
-        for section, fields in complete_form_data.items():
-            logger.debug(f"Section {section} has {len(fields)} fields")
-            for field, value in fields.items():
-                if value:  # Only log non-empty values to reduce log size
-                    logger.debug(f"Field {field} = '{value}'")
-            
-        # Add form metadata
-        form_info = {
-            'formId': form.id,
-            'fileName': form.file_name,
-            'createdAt': form.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'extractedData': complete_form_data
-        }
-        
-        # Add to the template group
-        forms_by_template[template_type].append(form_info)
-        logger.debug(f"Added form {form.id} to {template_type} group")
-    
     # Return the data based on format
     if format == 'json':
+        # Get all the user's extracted forms
+        with use_replica():
+            extracted_forms = ExtractedForm.query.filter_by(user_id=current_user.id).order_by(ExtractedForm.created_at.desc()).all()
+        logger.debug("Found %d forms to export", len(extracted_forms))
+        
+        # Group forms by template type
+        forms_by_template = {}
+        
+        for form in extracted_forms:
+            # Add form metadata and the data in its template structure
+            forms_by_template.setdefault(form.template_type, []).append({
+                'formId': form.id,
+                'fileName': form.file_name,
+                'createdAt': form.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'extractedData': normalize_form_data(form.template_type, form.get_data())
+            })
+        
         # For client-side Excel export, we'll still provide the JSON
         data = {
             'userId': current_user.id,
@@ -689,305 +691,164 @@ def export_all_forms(format):
             'formsByTemplate': forms_by_template
         }
         
-        # Final verification
-        for template_type, forms in forms_by_template.items():
-            logger.debug(f"Template {template_type} has {len(forms)} forms")
-            # Log details of first form as a sample
-            if forms:
-                sample_form = forms[0]
-                logger.debug(f"Sample form ID: {sample_form['formId']}")
-                logger.debug(f"Sample form extracted_data sections: {sample_form['extractedData'].keys()}")
-                # Log some field values from the first section
-                sample_section = list(sample_form['extractedData'].keys())[0]
-                logger.debug(f"Sample section {sample_section} data: {sample_form['extractedData'][sample_section]}")
+        logger.debug("Exporting %d forms in %d templates as JSON", len(extracted_forms), len(forms_by_template))
         
         return jsonify(data)
     elif format == 'excel':
-        # Server-side Excel generation for all forms
-        import io
-        from flask import send_file
-        import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill
-        
-        # Create an in-memory output file
-        output = io.BytesIO()
-        
-        # Create Excel workbook directly with openpyxl for better formatting control
-        workbook = openpyxl.Workbook()
-        
-        # Create the main summary sheet
-        summary_sheet = workbook.active
-        summary_sheet.title = 'Summary'
-        
-        # Add title and basic info
-        summary_sheet['A1'] = "FormOCR - All Forms Export"
-        summary_sheet['A1'].font = Font(size=16, bold=True)
-        
-        summary_sheet['A2'] = "User:"
-        summary_sheet['B2'] = current_user.username
-        
-        summary_sheet['A3'] = "Export Date:"
-        summary_sheet['B3'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Add templates included section
-        summary_sheet['A5'] = "Templates Included:"
-        summary_sheet['A5'].font = Font(bold=True)
-        
-        # List template types
-        row = 6
-        for idx, (template_type, forms) in enumerate(forms_by_template.items()):
-            form_count = len(forms)
-            summary_sheet[f'A{row}'] = f"{idx + 1}. {template_type} ({form_count} forms)"
-            row += 1
-        
-        # Process each template type
-        for template_type, forms in forms_by_template.items():
-            if not forms:
-                continue  # Skip empty templates
-                
-            # Create template summary sheet
-            safe_template_summary = f"{template_type[:25]}_Summary"[:31].replace('/', '-').replace('\\', '-')
-            template_summary_sheet = workbook.create_sheet(title=safe_template_summary)
-            
-            # Add title
-            template_summary_sheet['A1'] = f"{template_type} Forms Summary"
-            template_summary_sheet['A1'].font = Font(size=14, bold=True)
-            
-            # Add headers
-            template_summary_sheet['A3'] = "Form ID"
-            template_summary_sheet['B3'] = "File Name"
-            template_summary_sheet['C3'] = "Created Date"
-            
-            # Style headers
-            for cell in template_summary_sheet['3:3']:
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
-            
-            # Add forms data
-            row = 4
-            for form in forms:
-                template_summary_sheet[f'A{row}'] = form['formId']
-                template_summary_sheet[f'B{row}'] = form['fileName']
-                template_summary_sheet[f'C{row}'] = form['createdAt']
-                row += 1
-            
-            # Adjust column widths
-            template_summary_sheet.column_dimensions['A'].width = 10
-            template_summary_sheet.column_dimensions['B'].width = 30
-            template_summary_sheet.column_dimensions['C'].width = 20
-            
-            # Get template structure from the first form
-            template_structure = forms[0]['extractedData']
-            
-            # Create a detailed combined sheet showing all forms' data 
-            safe_template_details = f"{template_type[:20]}_Details"[:31].replace('/', '-').replace('\\', '-')
-            details_sheet = workbook.create_sheet(title=safe_template_details)
-            
-            # Add title
-            details_sheet['A1'] = f"{template_type} - All Forms Data"
-            details_sheet['A1'].font = Font(size=14, bold=True)
-            
-            # Add form data
-            row = 3
-            for form in forms:
-                # Add form header
-                details_sheet[f'A{row}'] = f"Form ID: {form['formId']}"
-                details_sheet[f'B{row}'] = f"File: {form['fileName']}"
-                details_sheet[f'C{row}'] = f"Date: {form['createdAt']}"
-                details_sheet[f'A{row}'].font = Font(bold=True)
-                row += 2
-                
-                # Add sections and fields
-                for section, fields in form['extractedData'].items():
-                    # Section header
-                    details_sheet[f'A{row}'] = section
-                    details_sheet[f'A{row}'].font = Font(bold=True)
-                    row += 1
-                    
-                    # Field headers
-                    details_sheet[f'A{row}'] = "Field"
-                    details_sheet[f'B{row}'] = "Value"
-                    details_sheet[f'A{row}'].font = Font(bold=True)
-                    details_sheet[f'B{row}'].font = Font(bold=True)
-                    row += 1
-                    
-                    # Field values
-                    for field, value in fields.items():
-                        details_sheet[f'A{row}'] = field
-                        details_sheet[f'B{row}'] = value or ''
-                        row += 1
-                    
-                    row += 1  # Add space after section
-                
-                row += 2  # Add space between forms
-            
-            # Adjust column widths
-            details_sheet.column_dimensions['A'].width = 30
-            details_sheet.column_dimensions['B'].width = 50
-            
-            # For each section, create a separate sheet with all forms in one table
-            for section_name in template_structure.keys():
-                # Get all unique fields across all forms for this section
-                all_fields = set()
-                for form in forms:
-                    form_section = form['extractedData'].get(section_name, {})
-                    all_fields.update(form_section.keys())
-                
-                safe_template = template_type[:12].replace('/', '-').replace('\\', '-')
-                safe_section = section_name[:12].replace('/', '-').replace('\\', '-')
-                sheet_name = f"{safe_template}-{safe_section}"[:31]
-                section_sheet = workbook.create_sheet(title=sheet_name)
-                
-                # Add title
-                section_sheet['A1'] = f"{template_type} - {section_name}"
-                section_sheet['A1'].font = Font(size=14, bold=True)
-                
-                # Add headers for data table
-                section_sheet['A3'] = "Form ID"
-                section_sheet['B3'] = "File Name" 
-                section_sheet['C3'] = "Created Date"
-                col = 4
-                
-                # Import get_column_letter from openpyxl.utils directly
-                from openpyxl.utils import get_column_letter
-                
-                # Add field names as column headers
-                for field in sorted(all_fields):
-                    column_letter = get_column_letter(col)
-                    section_sheet[f'{column_letter}3'] = field
-                    col += 1
-                
-                # Style headers
-                for cell in section_sheet['3:3']:
-                    if cell.value:  # Only style cells that have values
-                        cell.font = Font(bold=True)
-                        cell.fill = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
-                
-                # Add form data
-                row = 4
-                for form in forms:
-                    section_sheet[f'A{row}'] = form['formId']
-                    section_sheet[f'B{row}'] = form['fileName']
-                    section_sheet[f'C{row}'] = form['createdAt']
-                    
-                    # Add values for each field
-                    col = 4
-                    form_section = form['extractedData'].get(section_name, {})
-                    for field in sorted(all_fields):
-                        column_letter = get_column_letter(col)
-                        section_sheet[f'{column_letter}{row}'] = form_section.get(field, '')
-                        col += 1
-                    
-                    row += 1
-                
-                # Adjust column widths
-                section_sheet.column_dimensions['A'].width = 10
-                section_sheet.column_dimensions['B'].width = 25
-                section_sheet.column_dimensions['C'].width = 20
-                
-                # Adjust field columns based on field name length
-                col = 4
-                for field in sorted(all_fields):
-                    column_letter = get_column_letter(col)
-                    section_sheet.column_dimensions[column_letter].width = min(30, max(15, len(field) * 1.2))
-                    col += 1
-            
-            # Create a consolidated sheet with all sections for this template
-            safe_template_consol = template_type[:25].replace('/', '-').replace('\\', '-')
-            consol_sheet = workbook.create_sheet(title=safe_template_consol)
-            
-            # Add title
-            consol_sheet['A1'] = f"{template_type} - All Data"
-            consol_sheet['A1'].font = Font(size=14, bold=True)
-            
-            # Add headers
-            consol_sheet['A3'] = "Form ID"
-            consol_sheet['B3'] = "File Name"
-            consol_sheet['C3'] = "Created Date"
-            
-            # Add section-field headers
-            col = 4
-            all_headers = []
-            
-            for section in template_structure.keys():
-                section_fields = set()
-                for form in forms:
-                    form_section = form['extractedData'].get(section, {})
-                    section_fields.update(form_section.keys())
-                
-                # Import get_column_letter if not already imported
-                from openpyxl.utils import get_column_letter
-                
-                for field in sorted(section_fields):
-                    column_letter = get_column_letter(col)
-                    header = f"{section} - {field}"
-                    consol_sheet[f'{column_letter}3'] = header
-                    all_headers.append((column_letter, header))
-                    col += 1
-            
-            # Style headers
-            for cell in consol_sheet['3:3']:
-                if cell.value:  # Only style cells that have values
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
-            
-            # Add form data
-            row = 4
-            for form in forms:
-                consol_sheet[f'A{row}'] = form['formId']
-                consol_sheet[f'B{row}'] = form['fileName']
-                consol_sheet[f'C{row}'] = form['createdAt']
-                
-                # Add values for each section-field
-                for column_letter, header in all_headers:
-                    # Parse section and field from header
-                    parts = header.split(' - ', 1)
-                    if len(parts) == 2:
-                        section, field = parts
-                        
-                        # Get value from form data
-                        if section in form['extractedData']:
-                            form_section = form['extractedData'][section]
-                            value = form_section.get(field, '')
-                            consol_sheet[f'{column_letter}{row}'] = value
-                
-                row += 1
-            
-            # Adjust column widths
-            consol_sheet.column_dimensions['A'].width = 10
-            consol_sheet.column_dimensions['B'].width = 25
-            consol_sheet.column_dimensions['C'].width = 20
-            
-            # Adjust field columns based on field name length
-            for column_letter, header in all_headers:
-                consol_sheet.column_dimensions[column_letter].width = min(20, max(15, len(header) * 0.8))
-                
-        # Save workbook to output
-        workbook.save(output)
-        
-        # Reset the file pointer
-        output.seek(0)
-        
-        # Create filename
-        file_name = f"All_Forms_Export_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
-        
-        # Return the Excel file for download
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            download_name=file_name,
-            as_attachment=True
-        )
+        # Server-side Excel generation runs as a background export job, and
+        # an unchanged export is reused instead of being built again
+        export_job = request_export(current_user.id)
+        return redirect(url_for('export_status', job_id=export_job.id))
     else:
         flash('Invalid export format.', 'danger')
         return redirect(url_for('dashboard'))
 
+def _get_user_export_job(job_id):
+    """Load an export job, returning None if it doesn't belong to the current user"""
+    job = db.session.get(ExportJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        return None
+    return job
+
+def _export_job_ready(job):
+    return job.status == 'completed' and job.expires_at > datetime.utcnow() and os.path.exists(job.file_path)
+
+@app.route('/export-status/<job_id>')
+@login_required
+def export_status(job_id):
+    job = _get_user_export_job(job_id)
+    if job is None:
+        flash('Export not found or expired.', 'danger')
+        return redirect(url_for('view_saved_forms'))
+    
+    if job.status == 'failed':
+        flash(f'Error exporting forms: {job.error}', 'danger')
+        return redirect(url_for('view_saved_forms'))
+    
+    ready = _export_job_ready(job)
+    if job.status == 'completed' and not ready:
+        flash('This export is no longer available, please export again.', 'warning')
+        return redirect(url_for('view_saved_forms'))
+    
+    return render_template('export_status.html', title='Exporting Forms', job=job, ready=ready)
+
+@app.route('/api/export-jobs/<job_id>')
+@login_required
+def export_job_api(job_id):
+    job = _get_user_export_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    
+    return jsonify({
+        'jobId': job.id,
+        'status': job.status,
+        'formCount': job.form_count,
+        'error': job.error,
+        'expiresAt': job.expires_at.isoformat() if job.expires_at else None,
+        'downloadUrl': url_for('download_export', job_id=job.id) if _export_job_ready(job) else None,
+        'statusUrl': url_for('export_status', job_id=job.id)
+    })
+
+@app.route('/exports/<job_id>/download')
+@login_required
+def download_export(job_id):
+    job = _get_user_export_job(job_id)
+    if job is None or not _export_job_ready(job):
+        flash('This export is no longer available, please export again.', 'warning')
+        return redirect(url_for('view_saved_forms'))
+    
+    file_name = f"All_Forms_Export_{job.created_at.strftime('%Y-%m-%d')}.xlsx"
+    return send_file(
+        job.file_path,
+        mimetype=EXCEL_MIME_TYPE,
+        download_name=file_name,
+        as_attachment=True
+    )
+
 @app.route('/view-saved-forms')
 @login_required
+@reads_from_replica
 def view_saved_forms():
-    # Get all the user's extracted forms, ordered by newest first
-    extracted_forms = ExtractedForm.query.filter_by(user_id=current_user.id).order_by(ExtractedForm.created_at.desc()).all()
-    return render_template('view_saved_forms.html', title='Saved Forms', extracted_forms=extracted_forms)
+    # Get one page of the user's extracted forms, ordered by newest first
+    cursor = request.args.get('cursor')
+    extracted_forms, next_cursor = list_user_forms(
+        current_user.id,
+        cursor=cursor,
+        limit=app.config['SAVED_FORMS_PAGE_SIZE']
+    )
+    return render_template(
+        'view_saved_forms.html',
+        title='Saved Forms',
+        extracted_forms=extracted_forms,
+        next_cursor=next_cursor,
+        is_first_page=not cursor
+    )
+
+@app.route('/api/forms/count')
+@login_required
+@reads_from_replica
+def forms_count_api():
+    template_type = request.args.get('template')
+    return jsonify({
+        'count': count_user_forms(current_user.id, template_type),
+        'templateType': template_type
+    })
+
+@app.route('/api/forms/search')
+@login_required
+@reads_from_replica
+def forms_search_api():
+    # e.g. ?template=Bank Account&section=Personal Details&field=Nationality&value=Indian
+    section = request.args.get('section')
+    field = request.args.get('field')
+    value = request.args.get('value')
+    if not section or not field or value is None:
+        return jsonify({'error': 'section, field and value are required'}), 400
+
+    template_type = request.args.get('template')
+    forms, next_cursor = search_user_forms(
+        current_user.id,
+        section,
+        field,
+        value,
+        template_type=template_type,
+        cursor=request.args.get('cursor'),
+        limit=app.config['SAVED_FORMS_PAGE_SIZE']
+    )
+    return jsonify({
+        'forms': [
+            {
+                'id': form.id,
+                'templateType': form.template_type,
+                'fileName': form.file_name,
+                'createdAt': form.created_at.isoformat(),
+                'extractedData': form.get_data()
+            }
+            for form in forms
+        ],
+        'nextCursor': next_cursor
+    })
+
+@app.route('/api/forms/bulk', methods=['POST'])
+@login_required
+def forms_bulk_save_api():
+    # Body: {"forms": [{"templateType": ..., "fileName": ..., "extractedData": {...}}, ...]}
+    # Only application/json is accepted: browsers preflight it cross-site, so
+    # the session cookie can't be used for CSRF against this endpoint
+    if not request.is_json:
+        return jsonify({'error': 'Send the forms as application/json'}), 415
+
+    try:
+        forms = parse_bulk_forms(request.get_json(silent=True), app.config['BULK_SAVE_MAX_FORMS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # All forms are saved in one transaction, or none of them
+    form_ids = bulk_insert_forms(current_user.id, forms)
+    db.session.commit()
+    logger.info(f"Bulk saved {len(form_ids)} forms for user {current_user.id}")
+
+    return jsonify({'formIds': form_ids, 'count': len(form_ids)}), 201
 
 @app.route('/delete-form/<int:form_id>', methods=['POST'])
 @login_required
@@ -1000,7 +861,9 @@ def delete_form(form_id):
         flash('You do not have permission to delete this form.', 'danger')
         return redirect(url_for('dashboard'))
     
-    # Delete the form
+    # Delete the form. Batch jobs that saved it are unlinked here as well,
+    # since tables created before the ON DELETE rule was added lack it.
+    ExtractionJob.query.filter_by(form_id=form_id).update({'form_id': None}, synchronize_session=False)
     db.session.delete(extracted_form)
     db.session.commit()
     
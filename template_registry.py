@@ -0,0 +1,138 @@
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Pattern, Tuple
+
+from form_templates import FORM_TEMPLATES
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    """
+    Everything an extraction needs from one form template, built once
+
+    Attributes:
+        template_type (str): Type of form template
+        sections (tuple): (section name, tuple of field names) pairs in template order
+        fields (Mapping): Section name -> tuple of field names
+        prompt (str): Extraction prompt sent to the model
+        field_patterns (Mapping): (section, field) -> compiled regex from the
+            template, matching the field's value in raw form text
+        response_schema (dict): JSON schema of the expected model output, one
+            string property per field; treat as read-only
+        response_fields (Mapping): Field name -> tuple of (section, field)
+            pairs with that name, for reading "Field Name: value" lines
+    """
+
+    template_type: str
+    sections: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    fields: Mapping[str, Tuple[str, ...]]
+    prompt: str
+    field_patterns: Mapping[Tuple[str, str], Pattern]
+    response_schema: dict
+    response_fields: Mapping[str, Tuple[Tuple[str, str], ...]]
+
+    def new_result(self):
+        """
+        Build an empty result for this template
+
+        Returns:
+            dict: Section name -> {field name: ""}, a fresh copy on every call
+        """
+        return {section_name: dict.fromkeys(fields, "") for section_name, fields in self.sections}
+
+
+def _build_prompt(template_type, sections):
+    prompt = f"Extract information from this {template_type} form. "
+    prompt += "For each of the following fields, provide the exact value as written in the form. "
+    prompt += "If a field is not found, respond with 'NOT_FOUND' for that field.\n\n"
+
+    for section, fields in sections:
+        prompt += f"Section: {section}\n"
+        for field in fields:
+            prompt += f"- {field}\n"
+        prompt += "\n"
+
+    prompt += "Format your response as JSON with sections as the top-level keys and field names as nested keys."
+    prompt += "Example format: { 'Section Name': { 'Field Name': 'Value' } }"
+
+    return prompt
+
+
+def _build_response_schema(sections):
+    return {
+        "type": "object",
+        "properties": {
+            section: {
+                "type": "object",
+                "properties": {field: {"type": "string"} for field in fields},
+                "required": list(fields)
+            }
+            for section, fields in sections
+        },
+        "required": [section for section, _ in sections]
+    }
+
+
+def compile_template(template_type, template):
+    """
+    Compile a FORM_TEMPLATES entry into a CompiledTemplate
+
+    Args:
+        template_type (str): Type of form template
+        template (dict): Section name -> list of {"field", "regex"} dicts
+
+    Returns:
+        CompiledTemplate: Immutable compiled template
+    """
+    sections = tuple(
+        (section_name, tuple(field_info["field"] for field_info in fields_info))
+        for section_name, fields_info in template.items()
+    )
+
+    field_patterns = {}
+    for section_name, fields_info in template.items():
+        for field_info in fields_info:
+            if field_info.get("regex"):
+                field_patterns[(section_name, field_info["field"])] = re.compile(field_info["regex"])
+
+    response_fields = {}
+    for section_name, fields in sections:
+        for field_name in fields:
+            response_fields.setdefault(field_name, []).append((section_name, field_name))
+
+    return CompiledTemplate(
+        template_type=template_type,
+        sections=sections,
+        fields=MappingProxyType(dict(sections)),
+        prompt=_build_prompt(template_type, sections),
+        field_patterns=MappingProxyType(field_patterns),
+        response_schema=_build_response_schema(sections),
+        response_fields=MappingProxyType({name: tuple(pairs) for name, pairs in response_fields.items()})
+    )
+
+
+_REGISTRY = MappingProxyType({
+    template_type: compile_template(template_type, template)
+    for template_type, template in FORM_TEMPLATES.items()
+})
+
+
+def get_compiled_template(template_type):
+    """
+    Look up the compiled form of a template
+
+    Args:
+        template_type (str): Type of form template
+
+    Returns:
+        CompiledTemplate: Compiled template
+
+    Raises:
+        ValueError: If the template type is unknown
+    """
+    try:
+        return _REGISTRY[template_type]
+    except KeyError:
+        raise ValueError(f"Invalid template type: {template_type}") from None
+
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads its configuration when app.py is imported, so point it at a
+# throwaway SQLite database and the stub backend before anything imports it
+_work_dir = tempfile.mkdtemp(prefix='formdigitizer_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_work_dir, 'test.db')}"
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['EXTRACTION_BACKEND'] = 'stub'
+os.environ['LOG_LEVEL'] = 'WARNING'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app
+    from app import db
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def user(app):
+    from app import db
+    from models import User
+
+    with app.app_context():
+        username = f"user{User.query.count()}"
+        user = User(username=username, email=f"{username}@example.com")
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user)
+        session['_fresh'] = True
+    return client
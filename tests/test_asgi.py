@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def async_client(app, user, monkeypatch):
+    from starlette.testclient import TestClient
+    import asgi
+
+    monkeypatch.setattr(asgi, '_session_user', lambda cookies: SimpleNamespace(id=user))
+    return TestClient(asgi.application)
+
+
+def post_form(async_client, **params):
+    return async_client.post(
+        '/api/async/extract',
+        params={'templateType': 'Biodata', **params},
+        content=b'\xff\xd8\xff\xe0 not really a jpeg',
+        headers={'Content-Type': 'image/jpeg'}
+    )
+
+
+def test_unknown_backend_is_a_server_error(app, async_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXTRACTION_BACKEND', 'missing')
+
+    response = post_form(async_client)
+
+    assert response.status_code == 503
+    assert 'Unknown extraction backend' in response.json()['error']
+
+
+def test_missing_api_key_is_a_server_error(app, async_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'GOOGLE_API_KEY', '')
+
+    response = post_form(async_client, extractionMode='gemini')
+
+    assert response.status_code == 503
+    assert 'GOOGLE_API_KEY' in response.json()['error']
@@ -0,0 +1,200 @@
+import io
+import os
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+
+def zip_upload(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename='forms.zip')
+
+
+def upload_folder_files(app):
+    folder = app.config['UPLOAD_FOLDER']
+    return set(os.listdir(folder)) if os.path.isdir(folder) else set()
+
+
+@pytest.fixture
+def batch_limits(app):
+    saved = {
+        key: app.config[key]
+        for key in ('BATCH_MAX_FILES', 'BATCH_MAX_UNZIPPED_SIZE', 'MAX_UPLOAD_SIZE', 'BATCH_COMMIT_SIZE')
+    }
+    yield app.config
+    app.config.update(saved)
+
+
+def test_refuses_archive_with_too_many_forms(app, user, batch_limits):
+    from batch_extraction import create_batch
+
+    batch_limits['BATCH_MAX_FILES'] = 2
+    before = upload_folder_files(app)
+    with app.app_context(), pytest.raises(ValueError, match='at most 2 forms'):
+        create_batch(user, 'Biodata', [zip_upload([(f"form{i}.jpg", b'x') for i in range(3)])])
+    assert upload_folder_files(app) == before
+
+
+def test_refuses_archive_that_unpacks_too_large(app, user, batch_limits):
+    from batch_extraction import create_batch
+
+    batch_limits['BATCH_MAX_UNZIPPED_SIZE'] = 1024 * 1024
+    before = upload_folder_files(app)
+    # Compresses to a few kilobytes
+    members = [(f"form{i}.jpg", b'\0' * (600 * 1024)) for i in range(2)]
+    with app.app_context(), pytest.raises(ValueError, match='unpack to at most 1 MB'):
+        create_batch(user, 'Biodata', [zip_upload(members)])
+    assert upload_folder_files(app) == before
+
+
+def test_batches_share_one_rate_limiter(app):
+    from batch_extraction import get_batch_rate_limiter
+
+    assert get_batch_rate_limiter(app) is get_batch_rate_limiter(app)
+
+
+def test_batches_run_outside_the_job_pool(app, user, monkeypatch):
+    import threading
+    import batch_extraction
+    from job_queue import get_executor
+
+    ran_on = []
+    monkeypatch.setattr(batch_extraction, 'run_batch', lambda batch_id: ran_on.append(threading.current_thread().name))
+    with app.app_context():
+        batch_extraction.create_batch(user, 'Biodata', [zip_upload([('form.jpg', b'x')])])
+    get_executor(app, 'batches').submit(lambda: None).result()
+
+    assert ran_on and ran_on[0].startswith('batches-worker')
+
+
+@pytest.fixture
+def foreign_keys(app):
+    from sqlalchemy import event
+    from app import db
+
+    def enable(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+    with app.app_context():
+        engine = db.engine
+    engine.dispose()
+    event.listen(engine, 'connect', enable)
+    yield
+    event.remove(engine, 'connect', enable)
+    engine.dispose()
+
+
+def test_deleting_a_batch_saved_form_unlinks_its_job(app, client, user, foreign_keys):
+    from app import db
+    from models import ExtractedForm, ExtractionJob
+
+    with app.app_context():
+        form = ExtractedForm(user_id=user, template_type='Biodata', file_name='form.jpg', extracted_data={})
+        db.session.add(form)
+        db.session.flush()
+        job = ExtractionJob(
+            id=os.urandom(16).hex(), user_id=user, form_id=form.id, template_type='Biodata',
+            file_name='form.jpg', file_path='/tmp/form.jpg', status='completed'
+        )
+        db.session.add(job)
+        db.session.commit()
+        form_id, job_id = form.id, job.id
+
+    response = client.post(f'/delete-form/{form_id}')
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(ExtractedForm, form_id) is None
+        assert db.session.get(ExtractionJob, job_id).form_id is None
+
+
+def queue_batch(app, user, monkeypatch, count):
+    import batch_extraction
+
+    submitted = []
+    monkeypatch.setattr(batch_extraction, 'submit_job', lambda app, func, batch_id, pool: submitted.append(batch_id))
+    with app.app_context():
+        batch = batch_extraction.create_batch(
+            user, 'Biodata', [zip_upload([(f"form{i}.jpg", b'x') for i in range(count)])]
+        )
+        return batch.id, submitted
+
+
+def test_batch_that_stops_midway_is_finished(app, user, monkeypatch, batch_limits):
+    import batch_extraction
+    from app import db
+    from models import ExtractionBatch
+
+    class StoppingBackend:
+        def extract_many(self, items, **kwargs):
+            yield 0, {'Personal Information': {'Name': 'Asha'}}, None
+            raise RuntimeError('worker pool broke')
+
+    batch_limits['BATCH_COMMIT_SIZE'] = 1
+    monkeypatch.setattr(batch_extraction, 'get_extraction_backend', lambda app: StoppingBackend())
+    batch_id, _ = queue_batch(app, user, monkeypatch, 3)
+
+    with app.app_context():
+        batch_extraction.run_batch(batch_id)
+
+        batch = db.session.get(ExtractionBatch, batch_id)
+        assert batch.status == 'finished'
+        assert (batch.completed, batch.failed) == (1, 2)
+        assert batch.jobs.filter_by(status='queued').count() == 0
+        assert all(not os.path.exists(job.file_path) for job in batch.jobs)
+
+
+def test_resume_requeues_batches_whose_worker_stopped(app, user, monkeypatch):
+    from datetime import datetime, timedelta
+    import batch_extraction
+    from app import db
+    from models import ExtractionBatch
+
+    stale_id, _ = queue_batch(app, user, monkeypatch, 2)
+    live_id, submitted = queue_batch(app, user, monkeypatch, 2)
+    submitted.clear()
+
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.get(ExtractionBatch, stale_id).status = 'running'
+        db.session.get(ExtractionBatch, stale_id).started_at = now - timedelta(seconds=app.config['JOB_TIMEOUT'] + 60)
+        db.session.get(ExtractionBatch, live_id).status = 'running'
+        db.session.get(ExtractionBatch, live_id).started_at = now
+        db.session.commit()
+
+        batch_extraction.resume_pending_batches()
+
+        assert stale_id in submitted
+        assert live_id not in submitted
+        assert db.session.get(ExtractionBatch, stale_id).status == 'queued'
+        assert db.session.get(ExtractionBatch, live_id).status == 'running'
+
+
+def test_batch_item_failing_without_message_records_its_type(app, user, monkeypatch):
+    import batch_extraction
+    from app import db
+    from models import ExtractionBatch
+
+    class EmptyError(Exception):
+        pass
+
+    class FailingBackend:
+        def extract_many(self, items, **kwargs):
+            for index in range(len(items)):
+                yield index, None, EmptyError()
+
+    monkeypatch.setattr(batch_extraction, 'get_extraction_backend', lambda app: FailingBackend())
+    batch_id, _ = queue_batch(app, user, monkeypatch, 1)
+
+    with app.app_context():
+        batch_extraction.run_batch(batch_id)
+
+        batch = db.session.get(ExtractionBatch, batch_id)
+        job = batch.jobs.one()
+        assert (job.status, job.error, job.form_id) == ('failed', 'EmptyError', None)
+        assert (batch.completed, batch.failed) == (0, 1)
@@ -0,0 +1,41 @@
+import pytest
+
+from form_templates import FORM_TEMPLATES
+
+TEMPLATE_TYPE = next(iter(FORM_TEMPLATES))
+SECTION = next(iter(FORM_TEMPLATES[TEMPLATE_TYPE]))
+
+
+def bulk_body(extracted_data):
+    return {'forms': [{'templateType': TEMPLATE_TYPE, 'fileName': 'form.jpg', 'extractedData': extracted_data}]}
+
+
+def test_saves_forms_and_returns_ids(app, client, user):
+    from app import db
+    from models import ExtractedForm
+
+    response = client.post('/api/forms/bulk', json=bulk_body({SECTION: {'Name': 'Asha', 'Notes': None}}))
+
+    assert response.status_code == 201
+    assert response.json['count'] == 1
+    with app.app_context():
+        form = db.session.get(ExtractedForm, response.json['formIds'][0])
+        assert form.user_id == user
+        assert form.extracted_data[SECTION]['Name'] == 'Asha'
+
+
+@pytest.mark.parametrize('extracted_data', [
+    {SECTION: {'Name': {'First': 'Asha'}}},
+    {SECTION: {'Name': ['Asha']}},
+    {SECTION: {'Age': 30}},
+    {SECTION: ['Asha']},
+    {SECTION: 'Asha'},
+])
+def test_rejects_nested_values(app, client, user, extracted_data):
+    from models import ExtractedForm
+
+    response = client.post('/api/forms/bulk', json=bulk_body(extracted_data))
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert ExtractedForm.query.filter_by(user_id=user).count() == 0
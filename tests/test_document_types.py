@@ -0,0 +1,31 @@
+import pytest
+
+from document_types import iter_pdf_pages
+
+
+def write_pdf(path, page_count):
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, 'wb') as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_splits_pdf_into_pages(tmp_path):
+    assert len(list(iter_pdf_pages(write_pdf(tmp_path / 'form.pdf', 2)))) == 2
+
+
+def test_pdf_without_pages_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='PDF has no pages'):
+        list(iter_pdf_pages(write_pdf(tmp_path / 'empty.pdf', 0)))
+
+
+def test_merging_no_pages_is_rejected():
+    from gemini_form_extractor import GeminiFormExtractor
+
+    extractor = GeminiFormExtractor.__new__(GeminiFormExtractor)
+    with pytest.raises(ValueError, match='PDF has no pages'):
+        extractor._merge_page_results([])
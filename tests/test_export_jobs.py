@@ -0,0 +1,59 @@
+import uuid
+
+
+class EmptyError(Exception):
+    pass
+
+
+def test_failed_export_records_the_error_type(app, user, monkeypatch, tmp_path, caplog):
+    import excel_export
+    from app import db
+    from models import ExportJob
+    from export_jobs import run_export_job
+
+    def fail(*args, **kwargs):
+        raise EmptyError()
+
+    monkeypatch.setattr(excel_export, 'write_forms_workbook', fail)
+    monkeypatch.setitem(app.config, 'EXPORT_FOLDER', str(tmp_path))
+
+    with app.app_context():
+        job = ExportJob(id=uuid.uuid4().hex, user_id=user, max_form_id=1, form_count=1, status='queued')
+        db.session.add(job)
+        db.session.commit()
+
+        run_export_job(job.id)
+
+        job = db.session.get(ExportJob, job.id)
+        assert job.status == 'failed'
+        assert job.error == 'EmptyError'
+
+    failures = [record for record in caplog.records if record.name == 'export_jobs']
+    assert failures and failures[-1].exc_info is not None
+
+
+def test_export_left_running_by_a_stopped_worker_is_not_reused(app, user, monkeypatch):
+    from datetime import datetime, timedelta
+    import export_jobs
+    from app import db
+    from models import ExportJob, ExtractedForm
+
+    monkeypatch.setattr(export_jobs, 'submit_job', lambda app, func, job_id: None)
+
+    with app.app_context():
+        form = ExtractedForm(user_id=user, template_type='Biodata', file_name='form.jpg', extracted_data={})
+        db.session.add(form)
+        db.session.commit()
+        stale = ExportJob(
+            id=uuid.uuid4().hex, user_id=user, max_form_id=form.id, form_count=1, status='running',
+            started_at=datetime.utcnow() - timedelta(seconds=app.config['JOB_TIMEOUT'] + 60)
+        )
+        db.session.add(stale)
+        db.session.commit()
+        stale_id = stale.id
+
+        job = export_jobs.request_export(user)
+
+        assert job.id != stale_id
+        assert job.status == 'queued'
+        assert db.session.get(ExportJob, stale_id).status == 'failed'
@@ -0,0 +1,59 @@
+import pytest
+
+from template_registry import get_compiled_template
+
+
+class FakeLocalExtractor:
+    def __init__(self, fill):
+        self.fill = fill
+
+    def extract_form_data(self, file_path, template_type, request_timeout=None):
+        compiled_template = get_compiled_template(template_type)
+        result = compiled_template.new_result()
+        for section_name, fields in compiled_template.sections:
+            for field_name in fields:
+                result[section_name][field_name] = 'local' if self.fill else ''
+        return result
+
+
+class FakeGeminiExtractor:
+    def extract_form_data(self, file_path, template_type, request_timeout=None, rate_limiter=None):
+        compiled_template = get_compiled_template(template_type)
+        result = compiled_template.new_result()
+        for section_name, fields in compiled_template.sections:
+            for field_name in fields:
+                result[section_name][field_name] = 'gemini'
+        return result
+
+
+@pytest.fixture
+def local_first(app, monkeypatch):
+    import extraction_backends
+
+    def no_gemini(self):
+        raise ValueError("API key must be a valid string")
+
+    monkeypatch.setattr(extraction_backends.GeminiBackend, 'get_extractor', no_gemini)
+    monkeypatch.setitem(app.config, 'LOCAL_FIRST_MIN_FILL_RATIO', 1.0)
+    return extraction_backends.LocalFirstBackend(app)
+
+
+def test_local_first_needs_no_gemini_when_local_fills_every_field(local_first, monkeypatch):
+    import extraction_backends
+
+    monkeypatch.setattr(extraction_backends, 'get_local_extractor', lambda app: FakeLocalExtractor(fill=True))
+
+    result = local_first.extract('/tmp/form.jpg', 'Biodata')
+
+    assert all(value == 'local' for fields in result.values() for value in fields.values())
+
+
+def test_local_first_builds_gemini_when_escalating(local_first, monkeypatch):
+    import extraction_backends
+
+    monkeypatch.setattr(extraction_backends, 'get_local_extractor', lambda app: FakeLocalExtractor(fill=False))
+    monkeypatch.setattr(local_first.gemini, 'get_extractor', FakeGeminiExtractor)
+
+    result = local_first.extract('/tmp/form.jpg', 'Biodata')
+
+    assert all(value == 'gemini' for fields in result.values() for value in fields.values())
@@ -0,0 +1,37 @@
+import pytest
+
+from extraction_cache import ExtractionCache
+
+BASE_KEY = (b'digest', 'Biodata', 'prompt', 'gemini-1.5-flash', '', '')
+
+
+@pytest.mark.parametrize('position, value', [
+    (3, 'gemini-1.5-pro'),
+    (4, '{"type": "object"}'),
+    (5, 'max_dimension=1000'),
+])
+def test_key_changes_with_the_extraction_config(position, value):
+    changed = list(BASE_KEY)
+    changed[position] = value
+
+    assert ExtractionCache.make_key(*changed) != ExtractionCache.make_key(*BASE_KEY)
+
+
+def test_evicts_every_few_writes(app, monkeypatch):
+    from app import db
+    from models import ExtractionCacheEntry
+
+    cache = ExtractionCache(max_entries=2, evict_every=3)
+    evictions = []
+    original_evict = cache._evict
+    monkeypatch.setattr(cache, '_evict', lambda: evictions.append(1) or original_evict())
+
+    with app.app_context():
+        ExtractionCacheEntry.query.delete()
+        db.session.commit()
+        for index in range(6):
+            cache.set(f"key{index}", 'Biodata', {'Section': {'Field': str(index)}})
+        remaining = ExtractionCacheEntry.query.count()
+
+    assert len(evictions) == 2
+    assert remaining == 2
@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime, timedelta
+
+
+def add_job(app, user_id, status, started_at=None):
+    from app import db
+    from models import ExtractionJob
+
+    with app.app_context():
+        job = ExtractionJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            template_type='Biodata',
+            file_name='form.jpg',
+            file_path='/tmp/form.jpg',
+            status=status,
+            started_at=started_at
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def test_resume_requeues_jobs_whose_worker_stopped(app, user, monkeypatch):
+    import extraction_jobs
+    from app import db
+    from models import ExtractionJob
+
+    submitted = []
+    monkeypatch.setattr(extraction_jobs, 'submit_job', lambda app, func, job_id: submitted.append(job_id))
+
+    now = datetime.utcnow()
+    stale = add_job(app, user, 'running', now - timedelta(seconds=app.config['JOB_TIMEOUT'] + 60))
+    live = add_job(app, user, 'running', now)
+
+    with app.app_context():
+        extraction_jobs.resume_pending_jobs()
+
+        assert stale in submitted
+        assert live not in submitted
+        assert db.session.get(ExtractionJob, stale).status == 'queued'
+        assert db.session.get(ExtractionJob, live).status == 'running'
@@ -0,0 +1,62 @@
+import uuid
+
+from form_templates import FORM_TEMPLATES
+
+TEMPLATE_TYPE = next(iter(FORM_TEMPLATES))
+SECTION = next(iter(FORM_TEMPLATES[TEMPLATE_TYPE]))
+
+
+def completed_job(app, user_id):
+    from app import db
+    from models import ExtractionJob
+
+    with app.app_context():
+        job = ExtractionJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            template_type=TEMPLATE_TYPE,
+            file_name='form.jpg',
+            file_path='/tmp/form.jpg',
+            status='completed'
+        )
+        job.set_result({SECTION: {'Name': 'Asha'}})
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def test_revisiting_a_completed_job_reuses_its_draft(app, client, user):
+    from app import db
+    from models import ExtractionJob, ExtractionDraft
+
+    job_id = completed_job(app, user)
+
+    for _ in range(3):
+        response = client.get(f'/extraction-status/{job_id}')
+        assert response.status_code == 302
+        assert response.location.endswith('/review-data')
+        with client.session_transaction() as session:
+            assert session['draft_id'] == job_id
+
+    with app.app_context():
+        assert db.session.query(ExtractionDraft).filter_by(user_id=user).count() == 1
+        assert db.session.get(ExtractionDraft, job_id).get_data()[SECTION]['Name'] == 'Asha'
+        assert db.session.get(ExtractionJob, job_id).result_data is None
+
+
+def test_reviewed_job_does_not_recreate_a_draft(app, client, user):
+    from app import db
+    from models import ExtractionDraft
+    from draft_store import delete_draft
+
+    job_id = completed_job(app, user)
+    client.get(f'/extraction-status/{job_id}')
+    with app.app_context():
+        delete_draft(job_id)
+
+    response = client.get(f'/extraction-status/{job_id}')
+
+    assert response.status_code == 302
+    assert not response.location.endswith('/review-data')
+    with app.app_context():
+        assert db.session.get(ExtractionDraft, job_id) is None
@@ -0,0 +1,58 @@
+import json
+import logging
+import threading
+
+from test_document_types import write_pdf
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self.acquired += 1
+
+
+class FakeResponse:
+    text = json.dumps({})
+
+
+class FakeModel:
+    def generate_content(self, contents, generation_config=None, request_options=None):
+        return FakeResponse()
+
+
+def make_extractor():
+    from gemini_form_extractor import GeminiFormExtractor
+
+    extractor = GeminiFormExtractor.__new__(GeminiFormExtractor)
+    extractor.logger = logging.getLogger('gemini_form_extractor')
+    extractor.cache = None
+    extractor.preprocessor = None
+    extractor.pdf_page_concurrency = 2
+    extractor.call_policy = None
+    extractor.json_mode = True
+    extractor.model_name = 'test-model'
+    extractor.gemini_model = FakeModel()
+    return extractor
+
+
+def test_rate_limiter_is_acquired_once_per_pdf_page(tmp_path):
+    limiter = CountingLimiter()
+
+    make_extractor().extract_form_data(write_pdf(tmp_path / 'form.pdf', 3), 'Biodata', rate_limiter=limiter)
+
+    assert limiter.acquired == 3
+
+
+def test_importing_the_extractor_does_not_build_the_app():
+    import os
+    import sys
+    import subprocess
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys, gemini_form_extractor; print('app' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == 'False'
@@ -0,0 +1,22 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from logging_config import configure_logging, payload_logger
+
+
+@pytest.fixture
+def production_logging(app):
+    configure_logging(SimpleNamespace(config={'LOG_PROFILE': 'production', 'LOG_PAYLOAD_SAMPLE_RATE': 0.01}))
+    yield
+    configure_logging(app)
+
+
+def test_payloads_are_sampled_under_the_production_profile(production_logging, caplog):
+    for index in range(200):
+        payload_logger.info("Raw response: %s", index, extra={'route': 'test_payload'})
+
+    payloads = [record.getMessage() for record in caplog.records if record.name == payload_logger.name]
+    assert payloads == ["Raw response: 0", "Raw response: 100"]
+    assert logging.getLogger().getEffectiveLevel() == logging.INFO
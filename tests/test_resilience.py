@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, ModelCallPolicy
+
+
+def open_breaker():
+    breaker = CircuitBreaker('test', failure_rate=0.5, window=2, min_calls=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    return breaker
+
+
+def test_cancelled_half_open_trial_is_released():
+    breaker = open_breaker()
+    policy = ModelCallPolicy(breaker, attempt_timeout=5, deadline=5)
+
+    async def hang(timeout):
+        await asyncio.sleep(60)
+
+    async def answer(timeout):
+        return 'ok'
+
+    async def scenario():
+        trial = asyncio.create_task(policy.call_async(hang))
+        await asyncio.sleep(0.01)
+        assert breaker.state == 'half_open'
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        return await policy.call_async(answer)
+
+    assert asyncio.run(scenario()) == 'ok'
+    assert breaker.state == 'closed'
+
+
+def hedging_policy(**kwargs):
+    breaker = CircuitBreaker('test', failure_rate=0.5, window=10, min_calls=10, reset_timeout=30)
+    return ModelCallPolicy(breaker, hedge_delay=0.01, **kwargs)
+
+
+def test_hedged_call_runs_inline_when_hedge_workers_are_busy():
+    import threading
+
+    policy = hedging_policy(hedge_workers=1, attempt_timeout=5, deadline=5)
+    started = threading.Event()
+    release = threading.Event()
+
+    def occupy(timeout):
+        started.set()
+        return release.wait(5)
+
+    busy = threading.Thread(target=policy.call, args=(occupy,))
+    busy.start()
+    try:
+        started.wait(5)
+        ran_on = policy.call(lambda timeout: threading.current_thread().name)
+    finally:
+        release.set()
+        busy.join()
+
+    assert ran_on == threading.current_thread().name
+
+
+def test_hedged_call_gives_up_at_the_attempt_timeout():
+    import time
+
+    policy = hedging_policy(hedge_workers=2, attempt_timeout=0.2, deadline=0.2, max_attempts=1)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        # Ignores its timeout, like a request stuck in a slow connection
+        policy.call(lambda timeout: time.sleep(1))
+    assert time.monotonic() - started < 0.5
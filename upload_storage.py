@@ -0,0 +1,57 @@
+import base64
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Must be a multiple of 4 so every chunk is a complete run of base64 quanta
+DATA_URL_CHUNK_SIZE = 64 * 1024
+
+
+def save_data_url(data_url, file_path, chunk_size=DATA_URL_CHUNK_SIZE):
+    """
+    Decode a base64 data URL (e.g. a canvas capture) straight into a file
+
+    The payload is decoded a chunk at a time so the decoded image is never
+    held in memory next to the encoded string.
+
+    Args:
+        data_url (str): "data:<mime>;base64,<payload>" or a bare base64 payload
+        file_path (str): Destination path
+        chunk_size (int): Number of base64 characters decoded per write
+
+    Returns:
+        int: Number of bytes written
+    """
+    # Skip the data URL prefix if present (e.g., "data:image/jpeg;base64,")
+    start = 0
+    if data_url.startswith('data:'):
+        start = data_url.find(',') + 1
+        if start == 0:
+            raise ValueError("Malformed data URL: missing ',' separator")
+
+    written = 0
+    with open(file_path, 'wb') as f:
+        for offset in range(start, len(data_url), chunk_size):
+            chunk = base64.b64decode(data_url[offset:offset + chunk_size])
+            f.write(chunk)
+            written += len(chunk)
+
+    logger.debug("Decoded %d base64 characters into %d bytes at %s", len(data_url) - start, written, file_path)
+    return written
+
+
+def has_camera_upload(request):
+    """
+    Check whether a form submission carries a camera capture
+
+    Captures arrive as a 'camera_file' file part from current browsers, or
+    as a base64 'camera_image' field from older ones.
+
+    Args:
+        request (Request): Incoming Flask request
+
+    Returns:
+        bool: True if a camera capture was submitted
+    """
+    camera_file = request.files.get('camera_file')
+    return bool(camera_file and camera_file.filename) or bool(request.form.get('camera_image'))